@@ -1,12 +1,19 @@
 import cv2
 import matplotlib.pyplot as plt
 from matplotlib.backend_bases import MouseButton
+from matplotlib.widgets import LassoSelector, RectangleSelector
 import numpy as np
 
+from lab_filter import RobustLabFilter
+from lab_regions import LabIntegral, RegionSampler
+
 # 支持中文
 plt.rcParams["font.sans-serif"] = ["SimHei"]  # 用来正常显示中文标签
 plt.rcParams["axes.unicode_minus"] = False  # 用来正常显示负号
 
+# 少于该数量的取样不做马氏距离过滤（协方差估计不可靠）
+MIN_ROBUST_SAMPLES = 10
+
 
 def rgb_to_lab(image_rgb):
     """
@@ -16,10 +23,12 @@ def rgb_to_lab(image_rgb):
     return image_lab
 
 
-def on_click(event, image_rgb, image_lab, lab_values):
+def on_click(event, image_rgb, image_lab, lab_values, state=None):
     """
-    处理鼠标点击事件，保存点击点的 Lab 数值
+    处理鼠标点击事件，保存点击点的 Lab 数值（仅单点模式）
     """
+    if state is not None and state["mode"] != "point":
+        return
     if (
         event.button is MouseButton.LEFT
         and event.xdata is not None
@@ -38,19 +47,83 @@ def on_click(event, image_rgb, image_lab, lab_values):
         lab_values.append(lab)
 
 
-def filter_lab_values(lab_values):
+def add_region(stats, description, sampler, lab_values):
+    """
+    添加一个框选 / 套索区域：区域内全部像素的均值作为一个取样值，并输出当前的合并估计
+    """
+    if not sampler.add(stats, description):
+        print("区域内没有像素。\n")
+        return
+    lab_values.append(stats.mean)
+    print(f"{description}: {stats.count} 个像素")
+    print("区域 Lab 均值: L={:.2f}, a={:.2f}, b={:.2f}".format(*stats.mean))
+    print("区域标准差:    L={:.2f}, a={:.2f}, b={:.2f}".format(*stats.std))
+    print(sampler.format() + "\n")
+
+
+def on_rectangle(eclick, erelease, integral, sampler, lab_values):
+    """
+    处理矩形框选，积分图 O(1) 统计框内像素
+    """
+    x0, y0 = int(round(eclick.xdata)), int(round(eclick.ydata))
+    x1, y1 = int(round(erelease.xdata)), int(round(erelease.ydata))
+    stats = integral.rect_stats(x0, y0, x1 + 1, y1 + 1)
+    add_region(stats, f"矩形 ({x0}, {y0})-({x1}, {y1})", sampler, lab_values)
+
+
+def on_lasso(vertices, integral, sampler, lab_values):
+    """
+    处理套索选择，按扫描线用积分图统计区域内像素
+    """
+    stats = integral.polygon_stats(vertices)
+    add_region(stats, f"套索（{len(vertices)} 个顶点）", sampler, lab_values)
+
+
+def on_key(event, state, selectors, sampler, lab_values):
+    """
+    切换取样方式：1 单点，2 矩形，3 套索；z 撤销最后一个取样
+    （p / r / l 等字母键被 Matplotlib 默认快捷键占用）
+    """
+    modes = {"1": "point", "2": "rectangle", "3": "lasso"}
+    if event.key in modes:
+        state["mode"] = modes[event.key]
+        for name, selector in selectors.items():
+            selector.set_active(name == state["mode"])
+        print(f"取样方式: {state['mode']}\n")
+    elif event.key == "z" and lab_values:
+        lab_values.pop()
+        # 区域取样同时从区域合并估计中撤销
+        if state["kinds"].pop() != "point":
+            sampler.remove_last()
+        print(f"已撤销，剩余 {len(lab_values)} 个取样\n")
+
+
+def filter_lab_values(lab_values, threshold=3.0, center="mean"):
     """
     过滤掉不合理的 Lab 数据（例如，离群点）
+
+    取样足够多时按到稳健中心的马氏距离剔除（见 lab_filter.RobustLabFilter）；
+    取样很少时协方差估计不可靠，仍按到均值的欧氏距离（平均距离加两倍标准差）剔除。
+
+    Args:
+        lab_values: Lab 值列表（N × 3）
+        threshold: 马氏距离阈值
+        center: 中心估计方式（"mean"、"median" 或 "mcd"）
+
+    Returns:
+        (过滤后的 Lab 值, 每个取样是否保留的 bool 数组)
     """
-    lab_values = np.array(lab_values)
+    lab_values = np.asarray(lab_values, dtype=np.float64).reshape(-1, 3)
+    if len(lab_values) >= MIN_ROBUST_SAMPLES:
+        good_indices = RobustLabFilter(threshold, center, warmup=len(lab_values)).update(
+            lab_values
+        )
+        return lab_values[good_indices], good_indices
     mean_lab = np.mean(lab_values, axis=0)
-    std_lab = np.std(lab_values, axis=0)
     # 计算每个点到平均值的欧氏距离
     distances = np.linalg.norm(lab_values - mean_lab, axis=1)
-    mean_distance = np.mean(distances)
-    std_distance = np.std(distances)
     # 设置距离阈值（过滤掉超出平均距离两倍标准差的点）
-    threshold_distance = mean_distance + 2 * std_distance
+    threshold_distance = distances.mean() + 2 * distances.std()
     # 保留在阈值内的点
     good_indices = distances <= threshold_distance
     filtered_lab_values = lab_values[good_indices]
@@ -73,19 +146,64 @@ def main():
     # 转换为 Lab 色彩空间
     image_lab = rgb_to_lab(image_rgb)
 
-    # 初始化列表来保存点击的 Lab 值
+    # 初始化列表来保存点击的 Lab 值（区域取样保存区域均值）
     lab_values = []
 
+    # Lab 积分图：任意矩形 / 套索区域的统计都不需要遍历像素
+    integral = LabIntegral(image_lab)
+    sampler = RegionSampler()
+    state = {"mode": "point", "kinds": []}
+
+    def record(kind, handler):
+        # 记录每个取样的类型，撤销时据此同步区域估计
+        def wrapper(*args):
+            count = len(lab_values)
+            handler(*args)
+            if len(lab_values) > count:
+                state["kinds"].append(kind)
+
+        return wrapper
+
     # 使用 Matplotlib 显示图像
     fig, ax = plt.subplots()
     ax.imshow(image_rgb)
-    ax.set_title("点击图像查看 RGB 和 Lab 数值")
+    ax.set_title("点击取样（1 单点 / 2 矩形 / 3 套索 / z 撤销）")
     ax.axis("off")  # 隐藏坐标轴
 
     # 连接鼠标点击事件
     fig.canvas.mpl_connect(
         "button_press_event",
-        lambda event: on_click(event, image_rgb, image_lab, lab_values),
+        record(
+            "point", lambda event: on_click(event, image_rgb, image_lab, lab_values, state)
+        ),
+    )
+
+    # 矩形框选和套索（需保持引用，否则会被回收）
+    selectors = {
+        "rectangle": RectangleSelector(
+            ax,
+            record(
+                "rectangle",
+                lambda eclick, erelease: on_rectangle(
+                    eclick, erelease, integral, sampler, lab_values
+                ),
+            ),
+            useblit=True,
+            button=[MouseButton.LEFT],
+            interactive=False,
+        ),
+        "lasso": LassoSelector(
+            ax,
+            record("lasso", lambda verts: on_lasso(verts, integral, sampler, lab_values)),
+            useblit=True,
+            button=[MouseButton.LEFT],
+        ),
+    }
+    for selector in selectors.values():
+        selector.set_active(False)
+    fig.canvas.mpl_connect(
+        "key_press_event",
+        lambda event: on_key(event, state, selectors, sampler, lab_values),
     )
 
     plt.show()
@@ -95,6 +213,10 @@ def main():
         print("未检测到任何点击。")
         return
 
+    # 区域取样的合并结果（按像素统计）
+    if len(sampler):
+        print(sampler.format())
+
     # 过滤掉不合理的数据
     filtered_lab_values, good_indices = filter_lab_values(lab_values)
 
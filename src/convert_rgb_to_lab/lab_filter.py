@@ -0,0 +1,225 @@
+"""Lab 取样的流式稳健过滤
+
+功能说明：
+filter_lab_values 每次都把全部取样转成数组、重新计算均值和距离的标准差。区域取样和批量统计
+会产生上百万个取样，这里提供分块处理的增量估计：不需要一次性保存全部取样。
+
+主要特性：
+- Welford / Chan 分块合并更新均值和协方差，数值稳定
+- 马氏距离剔除：距离当前稳健估计超过 threshold 的取样不参与统计
+- 只由阈值内取样估计的协方差偏小，按截断正态分布校正，清洁数据上的剔除比例稳定在
+  阈值对应的理论值（threshold=3 时约 3%）
+- 初始估计取自前 warmup 个取样，中心可选：
+  - mean：均值 + 协方差，迭代剔除后重新估计
+  - median：逐通道中位数，协方差用中位数附近的样本估计
+  - mcd：最小协方差行列式（FastMCD 的 C-step 迭代），对离群点最稳健
+- 初始化之后，参考估计随已接受的取样不断更新；final_lab_value 与原先的
+  "过滤后取平均" 含义相同
+"""
+
+import math
+
+import numpy as np
+
+CENTER_MODES = ("mean", "median", "mcd")
+
+# 自由度为 3 的卡方分布的中位数
+_CHI2_3_MEDIAN = 2.366
+
+# 协方差正则项，避免取样很少或颜色单一时矩阵奇异
+_RIDGE = 1e-3
+
+
+class WelfordCov:
+    """均值和协方差的增量估计（支持整块更新）"""
+
+    def __init__(self, dim=3):
+        self.count = 0
+        self.mean = np.zeros(dim)
+        self.m2 = np.zeros((dim, dim))  # Σ (x - mean)(x - mean)ᵀ
+
+    def update(self, chunk):
+        """合并一块取样（N × dim）"""
+        chunk = np.asarray(chunk, dtype=np.float64).reshape(-1, len(self.mean))
+        n = len(chunk)
+        if not n:
+            return
+        mean = chunk.mean(axis=0)
+        centered = chunk - mean
+        self.merge_stats(n, mean, centered.T @ centered)
+
+    def merge_stats(self, n, mean, m2):
+        """按 Chan 等人的公式合并另一组统计量"""
+        total = self.count + n
+        delta = mean - self.mean
+        self.m2 += m2 + np.outer(delta, delta) * (self.count * n / total)
+        self.mean = self.mean + delta * (n / total)
+        self.count = total
+
+    @property
+    def cov(self):
+        return self.m2 / max(self.count, 1)
+
+
+def _chi2_cdf_3_5(x):
+    """自由度 3 和 5 的卡方分布在 x 处的累积概率（奇数自由度有闭式解）"""
+    tail = math.exp(-x / 2) * math.sqrt(2 * x / math.pi)
+    cdf3 = math.erf(math.sqrt(x / 2)) - tail
+    return cdf3, cdf3 - tail * x / 3
+
+
+def truncation_factor(threshold):
+    """截断协方差的一致性校正系数
+
+    三维正态分布只保留马氏距离 ≤ threshold 的样本时，协方差缩小为原来的
+    P(χ²₅ ≤ t²) / P(χ²₃ ≤ t²)；乘以其倒数还原（threshold=3 时约 1.09）。
+    """
+    cdf3, cdf5 = _chi2_cdf_3_5(threshold**2)
+    return cdf3 / cdf5 if cdf5 > 0 else 1.0
+
+
+def _mahalanobis_sq(values, center, cov):
+    inv = np.linalg.inv(cov + np.eye(len(center)) * _RIDGE)
+    d = values - center
+    return np.einsum("ij,jk,ik->i", d, inv, d)
+
+
+def _mcd(values, rng, starts=10, steps=20):
+    """简化的 FastMCD：多个随机初始子集做 C-step 迭代，取协方差行列式最小的结果"""
+    n, dim = values.shape
+    h = (n + dim + 1) // 2
+    best = None
+    for _ in range(starts):
+        subset = rng.choice(n, size=min(dim + 1, n), replace=False)
+        center, cov = values[subset].mean(axis=0), np.cov(values[subset].T, bias=True)
+        for _ in range(steps):
+            keep = np.argsort(_mahalanobis_sq(values, center, cov))[:h]
+            new_center = values[keep].mean(axis=0)
+            new_cov = np.cov(values[keep].T, bias=True)
+            converged = np.allclose(new_center, center) and np.allclose(new_cov, cov)
+            center, cov = new_center, new_cov
+            if converged:
+                break
+        det = np.linalg.det(cov + np.eye(dim) * _RIDGE)
+        if best is None or det < best[0]:
+            best = (det, center, cov)
+    return best[1], best[2]
+
+
+class RobustLabFilter:
+    """分块输入 Lab 取样的稳健过滤器
+
+    用法:
+        lab_filter = RobustLabFilter(threshold=3.0, center="mcd")
+        for chunk in chunks:
+            lab_filter.update(chunk)
+        final_lab = lab_filter.final_lab_value()
+
+    Args:
+        threshold: 马氏距离阈值（各向同性正态分布下 3.0 约保留 97% 的取样）
+        center: 初始估计方式，见 CENTER_MODES
+        warmup: 初始估计使用的取样数；此前的取样先缓存，估计完成后再过滤
+        seed: mcd 随机初始子集的种子
+    """
+
+    def __init__(self, threshold=3.0, center="mean", warmup=256, seed=0):
+        if center not in CENTER_MODES:
+            raise ValueError(f"不支持的中心估计方式: {center}")
+        self.threshold = threshold
+        self._consistency = truncation_factor(threshold)
+        self.center_mode = center
+        self.warmup = warmup
+        self.accepted = WelfordCov()
+        self.rejected = 0
+        self.center = None
+        self.cov = None
+        self._buffer = []
+        self._buffered = 0
+        self._rng = np.random.default_rng(seed)
+
+    def _initialize(self, values):
+        """由缓存的取样得到初始稳健估计"""
+        if self.center_mode == "mcd" and len(values) > 4:
+            center, cov = _mcd(values, self._rng)
+        elif self.center_mode == "median":
+            center = np.median(values, axis=0)
+            # 用离中位数最近的一半取样估计协方差
+            near = np.argsort(np.abs(values - center).sum(axis=1))[: max(len(values) // 2, 2)]
+            cov = np.cov(values[near].T, bias=True)
+        else:
+            center, cov = values.mean(axis=0), np.cov(values.T, bias=True)
+            # 迭代剔除：用剔除后的取样重新估计，直到不再变化
+            for _ in range(10):
+                keep = _mahalanobis_sq(values, center, cov) <= self.threshold**2
+                if keep.sum() < 2:
+                    break
+                new_center = values[keep].mean(axis=0)
+                new_cov = np.cov(values[keep].T, bias=True) * self._consistency
+                if np.allclose(new_center, center) and np.allclose(new_cov, cov):
+                    break
+                center, cov = new_center, new_cov
+        if self.center_mode != "mean" and len(values) > 4:
+            # 稳健估计的协方差只覆盖较集中的一半取样，偏小；按距离平方的中位数
+            # 与卡方分布中位数之比校正（MCD 的一致性校正）
+            d2 = _mahalanobis_sq(values, center, cov)
+            cov = cov * max(np.median(d2) / _CHI2_3_MEDIAN, 1e-6)
+        self.center, self.cov = center, cov
+
+    def _filter(self, values):
+        keep = _mahalanobis_sq(values, self.center, self.cov) <= self.threshold**2
+        self.accepted.update(values[keep])
+        self.rejected += int((~keep).sum())
+        # 已接受的取样足够多后，参考估计随之更新（median 模式保持稳健中心不变）。
+        # 已接受的取样都在阈值内，协方差偏小，按截断正态分布校正，否则阈值会越收越紧
+        if self.accepted.count >= self.warmup:
+            if self.center_mode != "median":
+                self.center = self.accepted.mean.copy()
+            self.cov = self.accepted.cov * self._consistency
+        return keep
+
+    def update(self, chunk):
+        """输入一块取样
+
+        Args:
+            chunk: N × 3 的 Lab 取样
+
+        Returns:
+            本块每个取样是否保留（bool 数组）；仍在缓存初始取样时返回 None
+        """
+        values = np.asarray(chunk, dtype=np.float64).reshape(-1, 3)
+        if self.center is None:
+            self._buffer.append(values)
+            self._buffered += len(values)
+            if self._buffered < self.warmup:
+                return None
+            return self.flush()[-len(values) :]
+        return self._filter(values)
+
+    def flush(self):
+        """用已缓存的取样完成初始估计并过滤它们，返回这些取样是否保留"""
+        if self.center is not None or not self._buffer:
+            return np.zeros(0, dtype=bool)
+        values = np.concatenate(self._buffer)
+        self._buffer = []
+        self._initialize(values)
+        return self._filter(values)
+
+    def final_lab_value(self):
+        """过滤后的最终 Lab 值（median 模式为稳健中心，其余为保留取样的均值）"""
+        self.flush()
+        if self.center_mode == "median":
+            return self.center
+        return self.accepted.mean
+
+    @property
+    def count(self):
+        """保留的取样数"""
+        return self.accepted.count
+
+
+def filter_chunks(chunks, threshold=3.0, center="mean", warmup=256):
+    """过滤分块输入的取样（如逐帧的区域像素），返回最终 Lab 值和过滤器"""
+    lab_filter = RobustLabFilter(threshold, center, warmup)
+    for chunk in chunks:
+        lab_filter.update(chunk)
+    return lab_filter.final_lab_value(), lab_filter
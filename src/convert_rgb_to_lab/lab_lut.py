@@ -0,0 +1,221 @@
+"""Lab 颜色阈值分割引擎（预计算三维查找表）
+
+功能说明：
+用 convert_rgb_to_lab.py 得到目标 Lab 值后，线上按颜色阈值分割：每帧先 cv2.cvtColor 转 Lab，
+再逐像素比较范围，需要两遍遍历。这里预先对 BGR 颜色空间（量化到每通道 2^bits 级）计算
+"该颜色是否在阈值内"，得到一个三维查找表；每帧只需按像素的 BGR 值查表一次。
+
+主要特性：
+- 阈值可以是 Lab 上下界（与 cv2.inRange 相同，包含边界），也可以是到目标均值的
+  马氏距离（均值 / 协方差取自 filter_lab_values 过滤后的样本）
+- bits=6（64³）等量化表每格取格子中心颜色，建表快；bits=8 为全精度表，结果与
+  cvtColor + inRange 完全一致。查表前统一展开为按 24 位颜色索引的表（16 MB，
+  可选按位压缩为 2 MB），每帧只需一次按位与和一次 np.take
+- 建表时按 B 通道分块调用 cvtColor，内存占用有上限
+- benchmark 对比查表与 cvtColor + 范围判断两种方式的吞吐量
+"""
+
+import sys
+import time
+
+import cv2
+import numpy as np
+
+
+def _grid_predicate(bits, predicate):
+    """对量化后的每个 BGR 颜色计算 predicate(Lab 数组) → bool 表（levels³，按 B、G、R 排列）"""
+    levels = 1 << bits
+    step = 256 // levels
+    centers = (np.arange(levels) * step + step // 2).astype(np.uint8)
+    table = np.empty((levels, levels, levels), dtype=bool)
+    gg, rr = np.meshgrid(centers, centers, indexing="ij")
+    plane = np.empty((levels, levels, 3), dtype=np.uint8)
+    plane[..., 1] = gg
+    plane[..., 2] = rr
+    # 每次转换一个 B 平面（levels² 个颜色）
+    for i, b in enumerate(centers):
+        plane[..., 0] = b
+        table[i] = predicate(cv2.cvtColor(plane, cv2.COLOR_BGR2LAB))
+    return table
+
+
+class LabLUT:
+    """BGR → 掩码的三维查找表
+
+    Args:
+        grid: levels × levels × levels 的 bool 数组（按 B、G、R 索引）
+        bits: 每通道量化位数（1-8）
+        packed: 是否按位压缩常驻内存的表（2 MB，查表多几次位运算；默认展开为 16 MB 的
+            uint8 表，查表最快）
+    """
+
+    def __init__(self, grid, bits, packed=False):
+        self.bits = bits
+        grid = np.ascontiguousarray(grid, dtype=bool)
+        self._grid_bits = np.packbits(grid.ravel())
+        # 量化表展开为按完整 24 位颜色索引的表：查表时不需要再做量化
+        repeat = 1 << (8 - bits)
+        full = grid
+        if repeat > 1:
+            full = full.repeat(repeat, 0).repeat(repeat, 1).repeat(repeat, 2)
+        # 下标布局与 BGRA 像素按 uint32 读取后的字节序一致（小端序为 r、g、b）
+        if sys.byteorder == "little":
+            full = full.transpose(2, 1, 0)
+        flat = np.ascontiguousarray(full).ravel()
+        if packed:
+            self.packed = np.packbits(flat)
+            self.table = None
+        else:
+            self.packed = None
+            self.table = flat.astype(np.uint8) * np.uint8(255)
+
+    @classmethod
+    def from_bounds(cls, lower, upper, bits=6, packed=False):
+        """由 Lab 上下界（包含边界，OpenCV 8 位 Lab 取值）建表"""
+        lower = np.asarray(lower, dtype=np.uint8)
+        upper = np.asarray(upper, dtype=np.uint8)
+
+        def predicate(lab):
+            return np.all((lab >= lower) & (lab <= upper), axis=-1)
+
+        return cls(_grid_predicate(bits, predicate), bits, packed)
+
+    @classmethod
+    def from_mahalanobis(cls, mean, cov, threshold=3.0, bits=6, packed=False):
+        """由到均值的马氏距离建表：距离 ≤ threshold 的颜色为前景"""
+        mean = np.asarray(mean, dtype=np.float64)
+        # 协方差接近奇异（如样本很少）时加一个小的对角项
+        cov = np.asarray(cov, dtype=np.float64) + np.eye(3) * 1e-3
+        inv = np.linalg.inv(cov)
+        limit = threshold**2
+
+        def predicate(lab):
+            d = lab.reshape(-1, 3).astype(np.float64) - mean
+            d2 = np.einsum("ij,jk,ik->i", d, inv, d)
+            return (d2 <= limit).reshape(lab.shape[:-1])
+
+        return cls(_grid_predicate(bits, predicate), bits, packed)
+
+    @classmethod
+    def from_samples(cls, lab_values, threshold=3.0, bits=6, packed=False):
+        """由 Lab 样本（如 filter_lab_values 过滤后的点）的均值和协方差建表"""
+        values = np.asarray(lab_values, dtype=np.float64).reshape(-1, 3)
+        cov = np.cov(values.T, bias=True) if len(values) > 1 else np.zeros((3, 3))
+        return cls.from_mahalanobis(values.mean(axis=0), cov, threshold, bits, packed)
+
+    def index(self, frame_bgr):
+        """每个像素的 24 位颜色下标（uint32）
+
+        BGR 补一个通道转为 BGRA 后按 uint32 读取，每个像素只需一次按位与即可得到下标。
+        """
+        bgra = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2BGRA)
+        value = bgra.view(np.uint32)[..., 0]
+        if sys.byteorder == "little":
+            return value & np.uint32(0xFFFFFF)
+        return value >> np.uint32(8)
+
+    def apply(self, frame_bgr):
+        """对一帧 BGR 图像分割
+
+        Returns:
+            uint8 掩码（前景 255，背景 0）
+        """
+        idx = self.index(frame_bgr)
+        if self.table is not None:
+            return np.take(self.table, idx)
+        byte = np.take(self.packed, idx >> np.uint32(3))
+        shift = (np.uint32(7) - (idx & np.uint32(7))).astype(np.uint8)
+        return ((byte >> shift) & np.uint8(1)) * np.uint8(255)
+
+    def save(self, path):
+        """保存为 .npz（只保存量化表，按位压缩）"""
+        np.savez_compressed(path, bits=self.bits, grid=self._grid_bits)
+
+    @classmethod
+    def load(cls, path, packed=False):
+        with np.load(path) as f:
+            bits = int(f["bits"])
+            levels = 1 << bits
+            grid = np.unpackbits(f["grid"])[: levels**3].astype(bool)
+        return cls(grid.reshape(levels, levels, levels), bits, packed)
+
+
+def threshold_cvtcolor(frame_bgr, lower, upper):
+    """对照方式：cvtColor 转 Lab 后用 inRange 判断范围"""
+    lab = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2LAB)
+    return cv2.inRange(lab, np.asarray(lower, np.uint8), np.asarray(upper, np.uint8))
+
+
+def benchmark(lut, frame_bgr, lower, upper, repeat=50):
+    """对比查表与 cvtColor + inRange 的吞吐量
+
+    Returns:
+        {"lut_ms": 每帧毫秒, "cvtcolor_ms": 每帧毫秒, "agreement": 两种结果一致的像素比例}
+    """
+
+    def timeit(fn):
+        fn()
+        start = time.perf_counter()
+        for _ in range(repeat):
+            result = fn()
+        return (time.perf_counter() - start) / repeat * 1000, result
+
+    lut_ms, lut_mask = timeit(lambda: lut.apply(frame_bgr))
+    cvt_ms, cvt_mask = timeit(lambda: threshold_cvtcolor(frame_bgr, lower, upper))
+    return {
+        "lut_ms": lut_ms,
+        "cvtcolor_ms": cvt_ms,
+        "agreement": float(np.mean(lut_mask == cvt_mask)),
+    }
+
+
+# ==================== 主程序入口 ====================
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Lab 颜色阈值查找表",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+使用示例:
+  # 由 Lab 范围建表并在一张图像上对比吞吐量
+  python lab_lut.py --lower 40 120 110 --upper 90 140 135 --bits 8 -i 4.jpg -o lut.npz
+
+  # 由目标 Lab 均值和标准差（马氏距离 3）建表
+  python lab_lut.py --mean 65 129 121 --std 7 1 1.5 --threshold 3 -o lut.npz
+        """,
+    )
+    parser.add_argument("--lower", nargs=3, type=int, help="Lab 下界")
+    parser.add_argument("--upper", nargs=3, type=int, help="Lab 上界")
+    parser.add_argument("--mean", nargs=3, type=float, help="目标 Lab 均值（马氏距离）")
+    parser.add_argument("--std", nargs=3, type=float, help="各通道标准差（马氏距离）")
+    parser.add_argument("--threshold", type=float, default=3.0, help="马氏距离阈值")
+    parser.add_argument("--bits", type=int, default=6, help="每通道量化位数（默认 6，最大 8）")
+    parser.add_argument("--packed", action="store_true", help="按位压缩常驻内存的表")
+    parser.add_argument("-i", "--image", default=None, help="用于对比吞吐量的图像")
+    parser.add_argument("-o", "--output", default=None, help="查找表保存路径（.npz）")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.mean and args.std:
+        lut = LabLUT.from_mahalanobis(
+            args.mean, np.diag(np.square(args.std)), args.threshold, args.bits, args.packed
+        )
+        lower = np.clip(np.subtract(args.mean, np.multiply(args.std, args.threshold)), 0, 255)
+        upper = np.clip(np.add(args.mean, np.multiply(args.std, args.threshold)), 0, 255)
+    elif args.lower and args.upper:
+        lut = LabLUT.from_bounds(args.lower, args.upper, args.bits, args.packed)
+        lower, upper = args.lower, args.upper
+    else:
+        parser.error("请指定 --lower/--upper 或 --mean/--std")
+    print(f"建表耗时: {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    if args.output:
+        lut.save(args.output)
+    if args.image:
+        frame = cv2.imread(args.image)
+        result = benchmark(lut, frame, lower, upper)
+        print(
+            f"查表: {result['lut_ms']:.2f} ms/帧，cvtColor + 范围判断: "
+            f"{result['cvtcolor_ms']:.2f} ms/帧，结果一致像素: {result['agreement']:.2%}"
+        )
@@ -0,0 +1,289 @@
+"""批量 Lab 颜色统计
+
+功能说明：
+convert_rgb_to_lab.py 只能在一张图像上逐个点击像素取值。调颜色阈值时需要统计成千上万帧，
+这里提供非交互的批量模式：对一组图像（可限定 ROI 或掩码）统计 Lab 值的均值、稳健均值、
+分位数和三维直方图。
+
+主要特性：
+- 流式累加：每张图像只把计数、和、叉积和、直方图累加到 LabAccumulator，
+  内存占用与图像数量无关
+- Lab 为 8 位整数（OpenCV 的 L、a、b 都缩放到 0-255），每个通道的 256 级边缘直方图
+  即可精确给出分位数、中位数和截尾均值
+- 三维直方图（默认每通道 32 级）可用于查看颜色分布或生成阈值查找表
+- 线程池并行读取和转换图像（OpenCV 解码和颜色转换时释放 GIL），在途任务数有上限
+"""
+
+import json
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import cv2
+import numpy as np
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff")
+
+# 默认输出的分位数
+PERCENTILES = (1, 5, 25, 50, 75, 95, 99)
+
+
+class LabAccumulator:
+    """Lab 像素的流式统计
+
+    Args:
+        bins: 三维直方图每个通道的级数（须整除 256）
+    """
+
+    def __init__(self, bins=32):
+        if 256 % bins:
+            raise ValueError("bins 必须整除 256")
+        self.bins = bins
+        self.count = 0
+        self.sum = np.zeros(3, dtype=np.float64)
+        self.outer = np.zeros((3, 3), dtype=np.float64)  # Σ x xᵀ
+        self.marginal = np.zeros((3, 256), dtype=np.int64)
+        self.histogram = np.zeros((bins, bins, bins), dtype=np.int64)
+
+    def update(self, pixels):
+        """累加一批像素
+
+        Args:
+            pixels: N × 3 的 uint8 Lab 像素
+        """
+        pixels = np.asarray(pixels, dtype=np.uint8).reshape(-1, 3)
+        if not len(pixels):
+            return
+        values = pixels.astype(np.float64)
+        self.count += len(pixels)
+        self.sum += values.sum(axis=0)
+        self.outer += values.T @ values
+        for c in range(3):
+            self.marginal[c] += np.bincount(pixels[:, c], minlength=256)
+        shift = 8 - int(np.log2(self.bins))
+        q = (pixels >> shift).astype(np.int64)
+        index = (q[:, 0] * self.bins + q[:, 1]) * self.bins + q[:, 2]
+        self.histogram += np.bincount(index, minlength=self.bins**3).reshape(
+            self.histogram.shape
+        )
+
+    def merge(self, other):
+        """合并另一个累加器（如各线程的部分结果）"""
+        self.count += other.count
+        self.sum += other.sum
+        self.outer += other.outer
+        self.marginal += other.marginal
+        self.histogram += other.histogram
+
+    @property
+    def mean(self):
+        return self.sum / max(self.count, 1)
+
+    @property
+    def cov(self):
+        """协方差矩阵（总体协方差）"""
+        mean = self.mean
+        return self.outer / max(self.count, 1) - np.outer(mean, mean)
+
+    @property
+    def std(self):
+        return np.sqrt(np.maximum(np.diag(self.cov), 0))
+
+    def percentile(self, q):
+        """各通道的第 q 百分位数（0-100），精确到整数级"""
+        cdf = np.cumsum(self.marginal, axis=1)
+        target = q / 100 * max(self.count - 1, 0)
+        return np.array([int(np.searchsorted(cdf[c], target, side="right")) for c in range(3)])
+
+    @property
+    def median(self):
+        return self.percentile(50)
+
+    def trimmed_mean(self, proportion=0.1):
+        """各通道的截尾均值：去掉两端各 proportion 比例的像素后取平均"""
+        levels = np.arange(256, dtype=np.float64)
+        result = np.zeros(3)
+        lo_n, hi_n = proportion * self.count, (1 - proportion) * self.count
+        for c in range(3):
+            cdf = np.cumsum(self.marginal[c])
+            # 每一级落在 [lo_n, hi_n] 之间的像素数
+            kept = np.clip(np.minimum(cdf, hi_n) - np.maximum(cdf - self.marginal[c], lo_n), 0, None)
+            result[c] = (kept * levels).sum() / max(kept.sum(), 1)
+        return result
+
+    def summary(self, percentiles=PERCENTILES, trim=0.1):
+        """汇总为可写入 JSON 的字典"""
+        return {
+            "count": int(self.count),
+            "mean": self.mean.round(3).tolist(),
+            "std": self.std.round(3).tolist(),
+            "cov": self.cov.round(3).tolist(),
+            "median": self.median.tolist(),
+            "trimmed_mean": self.trimmed_mean(trim).round(3).tolist(),
+            "trim": trim,
+            "percentiles": {str(q): self.percentile(q).tolist() for q in percentiles},
+        }
+
+    def format(self, percentiles=PERCENTILES):
+        """格式化为文本报告"""
+        if not self.count:
+            return "没有统计到任何像素"
+
+        def row(values):
+            return "L={:.2f}, a={:.2f}, b={:.2f}".format(*values)
+
+        lines = [
+            f"像素数: {self.count}",
+            f"均值:     {row(self.mean)}",
+            f"标准差:   {row(self.std)}",
+            f"中位数:   {row(self.median)}",
+            f"截尾均值: {row(self.trimmed_mean())}",
+        ]
+        for q in percentiles:
+            lines.append(f"P{q:<3}     {row(self.percentile(q))}")
+        return "\n".join(lines)
+
+
+def image_lab_pixels(image_path, mask_path=None, roi=None):
+    """读取一张图像中参与统计的 Lab 像素
+
+    Args:
+        image_path: 图像路径
+        mask_path: 掩码路径（非 0 像素参与统计），None 表示全部像素
+        roi: (x, y, w, h)，只统计该矩形内的像素，None 表示整张图像
+
+    Returns:
+        N × 3 的 uint8 Lab 像素；图像无法读取时返回 None
+    """
+    image = cv2.imread(image_path, cv2.IMREAD_COLOR)
+    if image is None:
+        return None
+    mask = None
+    if mask_path is not None:
+        mask = cv2.imread(mask_path, cv2.IMREAD_GRAYSCALE)
+        if mask is None or mask.shape != image.shape[:2]:
+            return None
+    if roi is not None:
+        x, y, w, h = roi
+        image = image[y : y + h, x : x + w]
+        if mask is not None:
+            mask = mask[y : y + h, x : x + w]
+    # 只转换需要的区域
+    lab = cv2.cvtColor(image, cv2.COLOR_BGR2LAB)
+    if mask is None:
+        return lab.reshape(-1, 3)
+    return lab[mask != 0]
+
+
+def collect_lab_stats(jobs, bins=32, max_workers=None, progress_callback=None):
+    """并行统计一批图像的 Lab 值
+
+    Args:
+        jobs: [(图像路径, 掩码路径或 None, ROI 或 None)]
+        bins: 三维直方图每个通道的级数
+        max_workers: 线程数
+        progress_callback: 进度回调，参数为 (已完成图像数, 总图像数)
+
+    Returns:
+        (LabAccumulator, [无法读取的图像路径])
+    """
+    jobs = list(jobs)
+    max_workers = max_workers or min(32, (os.cpu_count() or 4) * 2)
+    total = LabAccumulator(bins)
+    failed = []
+
+    def run(job):
+        pixels = image_lab_pixels(*job)
+        if pixels is None:
+            return job[0], None
+        acc = LabAccumulator(bins)
+        acc.update(pixels)
+        return job[0], acc
+
+    done_count = 0
+
+    def collect(done):
+        nonlocal done_count
+        for future in done:
+            path, acc = future.result()
+            if acc is None:
+                failed.append(path)
+            else:
+                total.merge(acc)
+            done_count += 1
+        if progress_callback:
+            progress_callback(done_count, len(jobs))
+
+    # 在途任务数有上限，部分结果随完成随合并，内存不随图像数量增长
+    window = max_workers * 2
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = set()
+        for job in jobs:
+            pending.add(executor.submit(run, job))
+            if len(pending) >= window:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            collect(done)
+    return total, failed
+
+
+def collect_jobs(image_dir, mask_dir=None, roi=None):
+    """列出文件夹中的图像；指定掩码文件夹时按文件名（无扩展名）匹配 .png 掩码"""
+    jobs = []
+    for name in sorted(os.listdir(image_dir)):
+        stem, ext = os.path.splitext(name)
+        if ext.lower() not in IMAGE_EXTENSIONS:
+            continue
+        mask_path = None
+        if mask_dir is not None:
+            mask_path = os.path.join(mask_dir, f"{stem}.png")
+            if not os.path.exists(mask_path):
+                continue
+        jobs.append((os.path.join(image_dir, name), mask_path, roi))
+    return jobs
+
+
+# ==================== 主程序入口 ====================
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="批量 Lab 颜色统计",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+使用示例:
+  # 统计每帧固定矩形区域
+  python lab_stats.py -i E:/frames --roi 600 400 80 60 -o lab_stats.json
+
+  # 按掩码统计（掩码与图像同名，.png，非 0 像素参与统计），保存三维直方图
+  python lab_stats.py -i E:/frames --mask-dir E:/masks -o lab_stats.json --histogram hist.npy
+        """,
+    )
+    parser.add_argument("-i", "--images", required=True, help="图像文件夹")
+    parser.add_argument("--mask-dir", default=None, help="掩码文件夹（与图像同名的 .png）")
+    parser.add_argument(
+        "--roi", nargs=4, type=int, default=None, metavar=("X", "Y", "W", "H"), help="统计区域"
+    )
+    parser.add_argument("--bins", type=int, default=32, help="三维直方图每通道级数（默认 32）")
+    parser.add_argument("-o", "--output", default=None, help="统计结果 JSON")
+    parser.add_argument("--histogram", default=None, help="三维直方图保存路径（.npy）")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="线程数")
+    args = parser.parse_args()
+
+    jobs = collect_jobs(args.images, args.mask_dir, args.roi)
+    stats, failed = collect_lab_stats(
+        jobs,
+        bins=args.bins,
+        max_workers=args.workers,
+        progress_callback=lambda done, total: print(f"\r{done}/{total}", end="", flush=True),
+    )
+    print()
+    print(stats.format())
+    for path in failed:
+        print(f"无法读取: {path}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(stats.summary(), f, ensure_ascii=False, indent=2)
+    if args.histogram:
+        np.save(args.histogram, stats.histogram)
@@ -0,0 +1,166 @@
+"""多图合成增强算子：马赛克 / MixUp / 复制粘贴
+
+功能说明：
+在单图增强之前，把多张图像（及其 YOLO 标签）合成为一个新样本。
+样本统一用 (图像, 标签) 表示，标签格式同 augment_engine.read_yolo_label：
+[(类别ID, 归一化坐标)]，检测框 4 个值，分割多边形 2n 个值。
+
+主要特性：
+- 输出画布按线程预分配并复用，合成时不为每个样本分配新画布
+  （返回的图像就是复用的画布，调用方需在下一次合成前写盘或拷贝）
+- 复制粘贴用 cv2.fillPoly 把多边形（检测框视为矩形）栅格化为掩码，
+  与 generate_mask.py 的做法一致，再用 cv2.copyTo 按掩码粘贴
+- 标签随图像一起变换、裁剪，合成后面积过小的目标被丢弃
+"""
+
+import threading
+
+import cv2
+import numpy as np
+
+# MixUp 混合比例 r ~ Beta(alpha, alpha)
+MIXUP_ALPHA = 32.0
+# 复制粘贴时伙伴图像中每个目标被选中的概率
+COPY_PASTE_PROB = 0.5
+# 合成后宽或高小于该像素数的目标被丢弃
+MIN_BOX_PIXELS = 2
+
+
+def label_points(coords):
+    """标签坐标 → (k, 2) 归一化点集（检测框展开为四个角点）"""
+    if len(coords) == 4:
+        cx, cy, bw, bh = coords
+        x1, y1, x2, y2 = cx - bw / 2, cy - bh / 2, cx + bw / 2, cy + bh / 2
+        return np.array([[x1, y1], [x2, y1], [x2, y2], [x1, y2]], dtype=np.float32)
+    return coords.reshape(-1, 2)
+
+
+def _place_labels(labels, src_size, offset, region, canvas_size):
+    """把标签从源图像坐标搬到画布坐标
+
+    Args:
+        labels: 源图像的标签
+        src_size: 源图像（缩放后）的 (宽, 高)
+        offset: 画布坐标 = 源像素坐标 + offset
+        region: 画布上的有效区域 (x0, y0, x1, y1)，坐标裁剪到该区域
+        canvas_size: 画布 (宽, 高)
+    """
+    x0, y0, x1, y1 = region
+    src = np.array(src_size, dtype=np.float32)
+    canvas = np.array(canvas_size, dtype=np.float32)
+    out = []
+    for cls, coords in labels:
+        pts = label_points(coords) * src + offset
+        pts[:, 0] = np.clip(pts[:, 0], x0, x1)
+        pts[:, 1] = np.clip(pts[:, 1], y0, y1)
+        x_min, y_min = pts.min(axis=0)
+        x_max, y_max = pts.max(axis=0)
+        if x_max - x_min < MIN_BOX_PIXELS or y_max - y_min < MIN_BOX_PIXELS:
+            continue
+        if len(coords) == 4:
+            box = np.array(
+                [(x_min + x_max) / 2, (y_min + y_max) / 2, x_max - x_min, y_max - y_min],
+                dtype=np.float32,
+            )
+            out.append((cls, box / np.tile(canvas, 2)))
+        else:
+            out.append((cls, (pts / canvas).astype(np.float32).ravel()))
+    return out
+
+
+class Compositor:
+    """多图合成算子
+
+    画布按线程缓存：同一线程内相同尺寸的画布只分配一次。
+
+    Args:
+        fill: 马赛克空白区域的填充灰度值
+    """
+
+    def __init__(self, fill=114):
+        self.fill = fill
+        self._local = threading.local()
+
+    def _buffer(self, name, shape):
+        """取出当前线程名为 name 的画布，尺寸不符时重新分配"""
+        buffers = self._local.__dict__.setdefault("buffers", {})
+        buffer = buffers.get(name)
+        if buffer is None or buffer.shape != tuple(shape):
+            buffer = np.empty(shape, dtype=np.uint8)
+            buffers[name] = buffer
+        return buffer
+
+    def owns(self, image):
+        """判断图像是否是当前线程复用的画布（需要保留时应先拷贝）"""
+        buffers = self._local.__dict__.get("buffers", {})
+        return any(image is buffer for buffer in buffers.values())
+
+    def mosaic(self, samples, rng):
+        """4 图马赛克，输出尺寸与第一张图像相同
+
+        随机选择拼接中心，四张图像分别按"覆盖"方式缩放填满各自象限，
+        裁掉远离拼接中心的一侧。
+        """
+        h, w = samples[0][0].shape[:2]
+        canvas = self._buffer("mosaic", (h, w, 3))
+        canvas.fill(self.fill)
+        xc = int(rng.uniform(0.25, 0.75) * w)
+        yc = int(rng.uniform(0.25, 0.75) * h)
+        regions = [(0, 0, xc, yc), (xc, 0, w, yc), (0, yc, xc, h), (xc, yc, w, h)]
+
+        labels = []
+        for (image, image_labels), (x0, y0, x1, y1) in zip(samples, regions):
+            qw, qh = x1 - x0, y1 - y0
+            if qw <= 0 or qh <= 0:
+                continue
+            ih, iw = image.shape[:2]
+            scale = max(qw / iw, qh / ih)
+            rw, rh = max(qw, round(iw * scale)), max(qh, round(ih * scale))
+            resized = cv2.resize(image, (rw, rh), interpolation=cv2.INTER_LINEAR)
+            # 左/上象限保留右/下部分，使图像内容靠近拼接中心
+            cx = rw - qw if x0 == 0 else 0
+            cy = rh - qh if y0 == 0 else 0
+            canvas[y0:y1, x0:x1] = resized[cy : cy + qh, cx : cx + qw]
+            if image_labels:
+                labels += _place_labels(
+                    image_labels, (rw, rh), (x0 - cx, y0 - cy), (x0, y0, x1, y1), (w, h)
+                )
+        return canvas, labels
+
+    def mixup(self, sample, partner, rng, alpha=MIXUP_ALPHA):
+        """MixUp：按 Beta 分布的比例混合两张图像，标签取并集"""
+        image, labels = sample
+        partner_image, partner_labels = partner
+        h, w = image.shape[:2]
+        if partner_image.shape[:2] != (h, w):
+            partner_image = cv2.resize(partner_image, (w, h), interpolation=cv2.INTER_LINEAR)
+        ratio = rng.beta(alpha, alpha)
+        canvas = self._buffer("mixup", image.shape)
+        cv2.addWeighted(image, ratio, partner_image, 1.0 - ratio, 0, dst=canvas)
+        return canvas, list(labels or []) + list(partner_labels or [])
+
+    def copy_paste(self, sample, partner, rng, prob=COPY_PASTE_PROB):
+        """复制粘贴：把伙伴图像中随机选中的目标按掩码粘贴到当前图像上"""
+        image, labels = sample
+        partner_image, partner_labels = partner
+        h, w = image.shape[:2]
+        canvas = self._buffer("copy_paste", image.shape)
+        np.copyto(canvas, image)
+
+        chosen = [row for row in partner_labels or [] if rng.random() < prob]
+        if not chosen:
+            return canvas, list(labels or [])
+        if partner_image.shape[:2] != (h, w):
+            partner_image = cv2.resize(partner_image, (w, h), interpolation=cv2.INTER_LINEAR)
+
+        mask = self._buffer("copy_paste_mask", (h, w))
+        mask.fill(0)
+        size = np.array([w, h], dtype=np.float32)
+        polygons = [np.round(label_points(coords) * size).astype(np.int32) for _, coords in chosen]
+        cv2.fillPoly(mask, polygons, color=255)
+        cv2.copyTo(partner_image, mask, canvas)
+        return canvas, list(labels or []) + chosen
+
+
+# 模块级共享实例：画布按线程隔离，多线程 / 多进程下都可直接使用
+compositor = Compositor()
@@ -0,0 +1,498 @@
+"""数据增强并行执行引擎
+
+功能说明：
+供 enhance_dataset_UI_mix.py 等增强工具调用的无界面增强核心。
+
+主要组成：
+- AugmentParams: 增强参数的不可变快照。在 GUI 线程中从滑块读取一次，
+  之后只读地传给工作线程，工作线程不再访问任何 Qt 控件
+- augment_sample / augment_image: 按参数快照对单张图像（及其 YOLO 标签）执行增强链
+- compose_and_augment: 先执行多图合成（马赛克 / MixUp / 复制粘贴，见 augment_compose.py），
+  再执行单图增强链
+- run_plan: 使用线程池精确执行增强计划（见 augment_planner.py），输出文件名确定，
+  重复执行会覆盖同名文件而不是追加
+- run_augmentation: 每张图像固定增强次数的快捷入口（内部生成均匀计划后调用 run_plan）
+
+OpenCV 的 imread/imwrite/resize/warpAffine 会释放 GIL，线程池即可用满多核。
+"""
+
+import os
+import shutil
+import time
+import zlib
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Callable, FrozenSet, Optional
+
+import cv2
+import numpy as np
+
+from augment_compose import compositor
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg")
+
+# 带滑块参数的增强操作（flip 没有参数）
+SLIDER_NAMES = ("scale", "rotate", "brightness", "translate", "noise")
+
+# 需要伙伴图像的多图合成操作，按此顺序执行
+COMPOSE_OPERATIONS = ("mosaic", "mixup", "copy_paste")
+
+
+@dataclass(frozen=True)
+class AugmentParams:
+    """增强参数快照（只读，可安全地跨线程共享）
+
+    Attributes:
+        operations: 启用的增强操作名称集合
+        scale: 缩放百分比（50 表示缩小一半）
+        rotate: 旋转角度
+        brightness: 亮度，50 为不变
+        translate: 平移量，50 为不平移
+        noise: 噪声强度（百分比）
+    """
+
+    operations: FrozenSet[str] = frozenset()
+    scale: int = 50
+    rotate: int = 50
+    brightness: int = 50
+    translate: int = 50
+    noise: int = 2
+
+    @classmethod
+    def from_widgets(cls, operations, sliders):
+        """在 GUI 线程中读取复选框和滑块，生成参数快照
+
+        Args:
+            operations: {操作名: 是否启用}
+            sliders: {操作名: QSlider}
+        """
+        values = {name: sliders[name].value() for name in SLIDER_NAMES if name in sliders}
+        enabled = frozenset(op for op, checked in operations.items() if checked)
+        return cls(operations=enabled, **values)
+
+    def to_dict(self):
+        """转换为可写入计划文件的字典"""
+        data = {name: getattr(self, name) for name in SLIDER_NAMES}
+        data["operations"] = sorted(self.operations)
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        """从计划文件中的字典恢复参数快照"""
+        values = {name: int(data[name]) for name in SLIDER_NAMES if name in data}
+        return cls(operations=frozenset(data.get("operations", ())), **values)
+
+
+def read_yolo_label(label_path):
+    """读取 YOLO 标签文件
+
+    Returns:
+        [(类别ID, 归一化坐标数组)]，检测框为 4 个值 (cx, cy, w, h)，
+        分割多边形为 2n 个值 (x1, y1, x2, y2, ...)
+    """
+    rows = []
+    with open(label_path, "r", encoding="utf-8") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) < 5:
+                continue
+            rows.append((int(float(parts[0])), np.array(parts[1:], dtype=np.float32)))
+    return rows
+
+
+def write_yolo_label(label_path, rows):
+    """写入 YOLO 标签文件（格式同 read_yolo_label 的返回值）"""
+    lines = [
+        f"{cls} " + " ".join(f"{v:.6f}" for v in coords) for cls, coords in rows
+    ]
+    with open(label_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + ("\n" if lines else ""))
+
+
+def transform_labels(rows, M, w, h):
+    """用 2x3 仿射矩阵变换 YOLO 标签（输出图像尺寸与输入相同）
+
+    检测框变换四个角点后取外接矩形，多边形逐点变换；
+    坐标裁剪到 [0, 1]，变换后面积为 0 的目标被丢弃。
+    """
+    M = np.asarray(M, dtype=np.float32)
+    size = np.array([w, h], dtype=np.float32)
+    out = []
+    for cls, coords in rows:
+        is_box = len(coords) == 4
+        if is_box:
+            cx, cy, bw, bh = coords
+            x1, y1, x2, y2 = cx - bw / 2, cy - bh / 2, cx + bw / 2, cy + bh / 2
+            pts = np.array([[x1, y1], [x2, y1], [x2, y2], [x1, y2]], dtype=np.float32)
+        else:
+            pts = coords.reshape(-1, 2)
+        pts = (pts * size) @ M[:, :2].T + M[:, 2]
+        pts = np.clip(pts / size, 0.0, 1.0)
+
+        x_min, y_min = pts.min(axis=0)
+        x_max, y_max = pts.max(axis=0)
+        if x_max - x_min <= 0 or y_max - y_min <= 0:
+            continue
+        if is_box:
+            box = [(x_min + x_max) / 2, (y_min + y_max) / 2, x_max - x_min, y_max - y_min]
+            out.append((cls, np.array(box, dtype=np.float32)))
+        else:
+            out.append((cls, pts.astype(np.float32).ravel()))
+    return out
+
+
+def augment_sample(image, labels, params, rng=None):
+    """按参数快照对单张图像及其标签执行增强链
+
+    Args:
+        image: BGR 图像
+        labels: read_yolo_label 的返回值，None 表示没有标签
+        params: AugmentParams 参数快照
+        rng: numpy 随机数生成器，默认新建一个（各线程应使用独立的生成器）
+
+    Returns:
+        (增强后的图像, 变换后的标签)
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    operations = params.operations
+
+    # 缩放不改变归一化坐标，标签无需处理
+    if "scale" in operations:
+        scale_factor = params.scale / 100.0
+        image = cv2.resize(image, None, fx=scale_factor, fy=scale_factor)
+
+    if "rotate" in operations:
+        angle = params.rotate
+        h, w = image.shape[:2]
+        center = (w // 2, h // 2)
+        M = cv2.getRotationMatrix2D(center, angle, 1.0)
+        image = cv2.warpAffine(image, M, (w, h))
+        if labels:
+            labels = transform_labels(labels, M, w, h)
+
+    if "flip" in operations:
+        h, w = image.shape[:2]
+        image = cv2.flip(image, 1)
+        if labels:
+            labels = transform_labels(labels, [[-1, 0, w], [0, 1, 0]], w, h)
+
+    if "brightness" in operations:
+        brightness_change = params.brightness - 50
+        image = cv2.convertScaleAbs(image, alpha=1, beta=brightness_change)
+
+    if "translate" in operations:
+        tx = params.translate - 50
+        ty = params.translate - 50
+        h, w = image.shape[:2]
+        M = np.float32([[1, 0, tx], [0, 1, ty]])
+        image = cv2.warpAffine(image, M, (w, h))
+        if labels:
+            labels = transform_labels(labels, M, w, h)
+
+    if "noise" in operations:
+        noise_strength = max(params.noise / 100.0, 0)
+        noise = rng.normal(0, 25 * noise_strength, image.shape).astype(np.uint8)
+        image = cv2.add(image, noise)
+
+    return image, labels
+
+
+def augment_image(image, params, rng=None):
+    """按参数快照对单张图像执行增强链（不处理标签）"""
+    return augment_sample(image, None, params, rng)[0]
+
+
+def needs_partners(params):
+    """参数中是否启用了多图合成操作"""
+    return any(op in params.operations for op in COMPOSE_OPERATIONS)
+
+
+def partner_loader(samples, input_dir, label_dir, rng, attempts=10):
+    """生成伙伴样本读取函数：每次调用随机读取一张图像及其标签
+
+    Args:
+        samples: [(图像文件名, 标签文件名或 None)]
+    """
+
+    def load():
+        for _ in range(attempts):
+            image_name, label_name = samples[int(rng.integers(len(samples)))]
+            image = cv2.imread(os.path.join(input_dir, image_name))
+            if image is None:
+                continue
+            labels = read_yolo_label(os.path.join(label_dir, label_name)) if label_name else []
+            return image, labels
+        raise IOError(f"连续 {attempts} 次未能读取伙伴图像")
+
+    return load
+
+
+def compose_and_augment(image, labels, params, rng, load_partner):
+    """先执行多图合成，再执行单图增强链
+
+    Args:
+        load_partner: 无参可调用对象，每次返回一个伙伴样本 (图像, 标签)
+
+    Returns:
+        (增强后的图像, 变换后的标签)；启用合成时图像可能是复用的画布，
+        需要在下一次调用前写盘或拷贝
+    """
+    operations = params.operations
+    if "mosaic" in operations:
+        partners = [load_partner() for _ in range(3)]
+        image, labels = compositor.mosaic([(image, labels)] + partners, rng)
+    if "mixup" in operations:
+        image, labels = compositor.mixup((image, labels), load_partner(), rng)
+    if "copy_paste" in operations:
+        image, labels = compositor.copy_paste((image, labels), load_partner(), rng)
+    return augment_sample(image, labels, params, rng)
+
+
+def list_samples(input_dir, label_dir=None):
+    """列出目录中的图像及其同名 YOLO 标签
+
+    每个目录只做一次 scandir，按图像文件名排序保证结果稳定。
+
+    Args:
+        input_dir: 图像目录
+        label_dir: 标签目录，默认与图像目录相同（混合文件夹）
+
+    Returns:
+        [(图像文件名, 标签文件名或 None)]
+    """
+    label_dir = label_dir or input_dir
+    with os.scandir(input_dir) as entries:
+        images = sorted(
+            entry.name
+            for entry in entries
+            if entry.is_file() and entry.name.lower().endswith(IMAGE_EXTENSIONS)
+        )
+    if not os.path.isdir(label_dir):
+        return [(name, None) for name in images]
+    with os.scandir(label_dir) as entries:
+        labels = {
+            entry.name[:-4]: entry.name
+            for entry in entries
+            if entry.is_file() and entry.name.endswith(".txt")
+        }
+    return [(name, labels.get(os.path.splitext(name)[0])) for name in images]
+
+
+class ProgressThrottle:
+    """按时间间隔节流的进度上报器
+
+    每次 update 都会更新计数，但回调最多每 min_interval 秒触发一次，
+    最后一次（done == total）总会触发，保证进度条走到 100%。
+    """
+
+    def __init__(self, callback, total, min_interval=0.1):
+        self.callback = callback
+        self.total = max(total, 1)
+        self.min_interval = min_interval
+        self._last_emit = 0.0
+        self._last_percent = -1
+
+    def update(self, done):
+        percent = int(done / self.total * 100)
+        now = time.monotonic()
+        if done < self.total and now - self._last_emit < self.min_interval:
+            return
+        if percent == self._last_percent:
+            return
+        self._last_emit = now
+        self._last_percent = percent
+        self.callback(percent)
+
+
+def bounded_map(executor, fn, items, window):
+    """向线程池提交任务，同时在途任务数不超过 window
+
+    避免一次性为几十万个文件创建 Future；结果按完成顺序产出。
+    """
+    pending = set()
+    for item in items:
+        pending.add(executor.submit(fn, item))
+        if len(pending) >= window:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            yield future.result()
+
+
+def shared_stems(filenames):
+    """与其他图像同名（不含扩展名、不区分大小写）的文件名集合，如 a.jpg 和 a.png 的 "a" """
+    counts = Counter(os.path.splitext(name)[0].lower() for name in filenames)
+    return {stem for stem, count in counts.items() if count > 1}
+
+
+def output_stem(filename, shared=()):
+    """输出文件名（无扩展名）
+
+    与其他图像同名时带上扩展名（a.jpg → a_jpg），否则标签都写成 a*.txt，
+    后写入的会覆盖先写入的。
+
+    Args:
+        filename: 输入图像文件名
+        shared: shared_stems 的结果
+    """
+    stem, ext = os.path.splitext(filename)
+    if stem.lower() in shared:
+        return f"{stem}_{ext[1:].lower()}"
+    return stem
+
+
+def augmented_name(filename, j, shared=()):
+    """增强结果的确定性文件名：{原文件名}_aug{序号}{扩展名}（同名图像见 output_stem）"""
+    ext = os.path.splitext(filename)[1]
+    return f"{output_stem(filename, shared)}_aug{j:03d}{ext}"
+
+
+def _sample_rng(seed, filename, j):
+    """每个输出样本独立且可复现的随机数生成器"""
+    return np.random.default_rng([seed, zlib.crc32(filename.encode("utf-8")), j])
+
+
+def _execute_item(task):
+    """执行计划中的一项：可选复制原图 + 生成 count 张增强图（连同标签）
+
+    Returns:
+        写入输出目录的图像数量
+    """
+    item, input_dir, label_dir, output_dir, preserve_originals, params, seed, pool, shared = task
+    filename = item["image"]
+    label_name = item.get("label")
+    file_path = os.path.join(input_dir, filename)
+    label_path = os.path.join(label_dir, label_name) if label_name else None
+    written = 0
+
+    if preserve_originals:
+        # 同名图像（a.jpg / a.png）的原图和标签改用带扩展名的文件名，标签不会互相覆盖
+        stem = output_stem(filename, shared)
+        shutil.copy2(file_path, os.path.join(output_dir, stem + os.path.splitext(filename)[1]))
+        if label_path:
+            shutil.copy2(label_path, os.path.join(output_dir, stem + ".txt"))
+        written += 1
+
+    count = item["count"]
+    if count <= 0:
+        return written
+
+    image = cv2.imread(file_path)
+    if image is None:
+        print(f"Error reading image {file_path}")
+        return written
+    labels = read_yolo_label(label_path) if label_path else None
+    compose = needs_partners(params)
+    if compose and labels is None:
+        # 合成会带入伙伴图像的目标，即使本图没有标签也要输出标签文件
+        labels = []
+
+    for j in range(count):
+        rng = _sample_rng(seed, filename, j)
+        if compose:
+            load_partner = partner_loader(pool, input_dir, label_dir, rng)
+            augmented_image, augmented_labels = compose_and_augment(
+                image, labels, params, rng, load_partner
+            )
+        else:
+            augmented_image, augmented_labels = augment_sample(image, labels, params, rng)
+        out_name = augmented_name(filename, j, shared)
+        cv2.imwrite(os.path.join(output_dir, out_name), augmented_image)
+        if augmented_labels is not None:
+            label_out = os.path.splitext(out_name)[0] + ".txt"
+            write_yolo_label(os.path.join(output_dir, label_out), augmented_labels)
+        written += 1
+    return written
+
+
+def run_plan(
+    plan,
+    output_dir,
+    params,
+    preserve_originals=False,
+    max_workers=None,
+    progress_callback: Optional[Callable[[int], None]] = None,
+    progress_interval=0.1,
+):
+    """并行、精确地执行增强计划
+
+    Args:
+        plan: augment_planner.build_plan 生成（或 load_plan 读取）的计划
+        output_dir: 输出目录（不存在时自动创建）
+        params: AugmentParams 参数快照
+        preserve_originals: 是否同时复制原图（及标签）
+        max_workers: 线程数，默认 CPU 核数
+        progress_callback: 进度回调，参数为 0-100 的百分比
+        progress_interval: 进度回调的最小间隔（秒）
+
+    Returns:
+        本次写入的图像总数
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    input_dir = plan["input_dir"]
+    label_dir = plan.get("label_dir") or input_dir
+    seed = plan.get("seed", 0)
+
+    # 多图合成的伙伴从计划中的全部样本里选取
+    pool = [(item["image"], item.get("label")) for item in plan["items"]]
+    shared = shared_stems(item["image"] for item in plan["items"])
+    tasks = [
+        (item, input_dir, label_dir, output_dir, preserve_originals, params, seed, pool, shared)
+        for item in plan["items"]
+        if item["count"] > 0 or preserve_originals
+    ]
+    max_workers = max_workers or os.cpu_count() or 4
+    throttle = None
+    if progress_callback:
+        throttle = ProgressThrottle(progress_callback, len(tasks), progress_interval)
+
+    written = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for done, count in enumerate(
+            bounded_map(executor, _execute_item, tasks, max_workers * 4), 1
+        ):
+            written += count
+            if throttle:
+                throttle.update(done)
+    if progress_callback and not tasks:
+        progress_callback(100)
+    return written
+
+
+def run_augmentation(
+    input_dir,
+    output_dir,
+    params,
+    augment_per_image=5,
+    preserve_originals=False,
+    max_workers=None,
+    progress_callback: Optional[Callable[[int], None]] = None,
+    progress_interval=0.1,
+):
+    """每张图像固定增强 augment_per_image 次（同名 YOLO 标签存在时一并变换）
+
+    Returns:
+        本次写入的图像总数
+    """
+    count = max(0, int(augment_per_image))
+    plan = {
+        "input_dir": input_dir,
+        "items": [
+            {"image": image, "label": label, "count": count}
+            for image, label in list_samples(input_dir)
+        ],
+    }
+    return run_plan(
+        plan,
+        output_dir,
+        params,
+        preserve_originals=preserve_originals,
+        max_workers=max_workers,
+        progress_callback=progress_callback,
+        progress_interval=progress_interval,
+    )
@@ -0,0 +1,273 @@
+"""内存中的增强数据加载器（不写任何中间文件）
+
+功能说明：
+把 augment_engine 的增强链包装成数据集 / 批次迭代器，训练或基准测试时
+直接在内存中按需生成增强样本，不再先把增强图像写到磁盘再读回来。
+
+主要组成：
+- AugmentedDataset: 类 torch Dataset 接口（__len__ / __getitem__），
+  可以直接交给 torch.utils.data.DataLoader 使用
+- AugmentedBatchLoader: 不依赖 torch 的批次迭代器，多进程生成样本，
+  在途批次数有上限（预取），不会无限占用内存
+- collate_batch: 把样本组合为批次，targets 为 (N, 6) 数组
+  [批内序号, 类别, cx, cy, w, h]，与 Ultralytics 的批次格式一致
+
+使用示例：
+    params = AugmentParams(operations=frozenset({"flip", "brightness"}))
+    dataset = AugmentedDataset("E:/data", params, imgsz=640, repeats=3)
+    with AugmentedBatchLoader(dataset, batch_size=16, num_workers=8) as loader:
+        for batch in loader:
+            images, targets = batch["images"], batch["targets"]
+
+命令行基准测试：
+    python augment_loader.py -i E:/data --ops flip brightness --imgsz 640 --batch 16
+"""
+
+import multiprocessing
+import os
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+from augment_compose import compositor
+from augment_engine import (
+    AugmentParams,
+    augment_sample,
+    compose_and_augment,
+    list_samples,
+    needs_partners,
+    partner_loader,
+    read_yolo_label,
+)
+
+
+class AugmentedDataset:
+    """按索引在内存中生成增强样本的数据集
+
+    Args:
+        input_dir: 图像目录
+        params: AugmentParams 参数快照
+        label_dir: YOLO 标签目录，默认与图像目录相同
+        repeats: 每张图像在一个 epoch 中出现的次数（相当于增强倍数）
+        imgsz: 输出尺寸，指定后统一缩放为 imgsz x imgsz 以便堆叠成批；
+            None 表示保持增强后的原始尺寸
+        seed: 随机种子
+    """
+
+    def __init__(self, input_dir, params, label_dir=None, repeats=1, imgsz=None, seed=0):
+        self.input_dir = input_dir
+        self.label_dir = label_dir or input_dir
+        self.params = params
+        self.repeats = max(1, int(repeats))
+        self.imgsz = imgsz
+        self.seed = seed
+        self.epoch = 0
+        self.samples = list_samples(input_dir, self.label_dir)
+
+    def __len__(self):
+        return len(self.samples) * self.repeats
+
+    def set_epoch(self, epoch):
+        """切换 epoch，使每个 epoch 的随机增强结果不同但可复现"""
+        self.epoch = epoch
+
+    def load(self, index, epoch=None):
+        """读取并增强第 index 个样本
+
+        Returns:
+            字典 {"image": BGR 图像, "labels": [(类别, 坐标)], "file": 图像文件名}
+        """
+        epoch = self.epoch if epoch is None else epoch
+        image_name, label_name = self.samples[index % len(self.samples)]
+        image = cv2.imread(os.path.join(self.input_dir, image_name))
+        if image is None:
+            raise IOError(f"无法读取图像: {image_name}")
+        labels = read_yolo_label(os.path.join(self.label_dir, label_name)) if label_name else []
+
+        rng = np.random.default_rng([self.seed, epoch, index])
+        if needs_partners(self.params):
+            load_partner = partner_loader(self.samples, self.input_dir, self.label_dir, rng)
+            image, labels = compose_and_augment(image, labels, self.params, rng, load_partner)
+        else:
+            image, labels = augment_sample(image, labels, self.params, rng)
+        if self.imgsz:
+            # 直接缩放不改变归一化坐标
+            image = cv2.resize(image, (self.imgsz, self.imgsz), interpolation=cv2.INTER_LINEAR)
+        elif compositor.owns(image):
+            # 复用的合成画布会被下一个样本覆盖
+            image = image.copy()
+        return {"image": image, "labels": labels or [], "file": image_name}
+
+    def __getitem__(self, index):
+        if index < 0 or index >= len(self):
+            raise IndexError(index)
+        return self.load(index)
+
+
+def labels_to_boxes(labels):
+    """把标签转换为 (N, 5) 的 [类别, cx, cy, w, h] 数组（多边形取外接框）"""
+    boxes = np.zeros((len(labels), 5), dtype=np.float32)
+    for i, (cls, coords) in enumerate(labels):
+        if len(coords) == 4:
+            boxes[i, 1:] = coords
+        else:
+            pts = coords.reshape(-1, 2)
+            x_min, y_min = pts.min(axis=0)
+            x_max, y_max = pts.max(axis=0)
+            boxes[i, 1:] = ((x_min + x_max) / 2, (y_min + y_max) / 2, x_max - x_min, y_max - y_min)
+        boxes[i, 0] = cls
+    return boxes
+
+
+def collate_batch(samples):
+    """把样本列表组合为批次
+
+    Returns:
+        {"images": (B, H, W, 3) 数组（尺寸不一致时为列表）,
+         "targets": (N, 6) [批内序号, 类别, cx, cy, w, h],
+         "labels": 每个样本的原始标签列表（分割任务使用）,
+         "files": 文件名列表}
+    """
+    images = [s["image"] for s in samples]
+    if len({img.shape for img in images}) == 1:
+        images = np.stack(images)
+
+    targets = []
+    for batch_index, sample in enumerate(samples):
+        boxes = labels_to_boxes(sample["labels"])
+        if len(boxes):
+            column = np.full((len(boxes), 1), batch_index, dtype=np.float32)
+            targets.append(np.hstack([column, boxes]))
+    targets = np.concatenate(targets) if targets else np.zeros((0, 6), dtype=np.float32)
+
+    return {
+        "images": images,
+        "targets": targets,
+        "labels": [s["labels"] for s in samples],
+        "files": [s["file"] for s in samples],
+    }
+
+
+# 工作进程中的数据集（由进程池初始化函数设置，避免每个任务都重新序列化）
+_worker_dataset = None
+
+
+def _init_worker(dataset):
+    global _worker_dataset
+    _worker_dataset = dataset
+    # 每个进程只用单线程 OpenCV，避免与进程并行互相抢占
+    cv2.setNumThreads(1)
+
+
+def _load_batch(task):
+    epoch, indices = task
+    return collate_batch([_worker_dataset.load(i, epoch) for i in indices])
+
+
+class AugmentedBatchLoader:
+    """多进程、带预取的增强批次迭代器
+
+    Args:
+        dataset: AugmentedDataset
+        batch_size: 批大小
+        shuffle: 每个 epoch 是否打乱
+        num_workers: 工作进程数，0 表示在当前进程中生成
+        prefetch: 每个工作进程预取的批次数
+        drop_last: 是否丢弃最后不满一批的数据
+    """
+
+    def __init__(
+        self, dataset, batch_size=16, shuffle=True, num_workers=None, prefetch=2, drop_last=False
+    ):
+        self.dataset = dataset
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.num_workers = (os.cpu_count() or 1) if num_workers is None else num_workers
+        self.prefetch = max(1, prefetch)
+        self.drop_last = drop_last
+        self.epoch = 0
+        self._pool = None
+
+    def __len__(self):
+        n = len(self.dataset)
+        return n // self.batch_size if self.drop_last else -(-n // self.batch_size)
+
+    def _batches(self):
+        n = len(self.dataset)
+        if self.shuffle:
+            order = np.random.default_rng([self.dataset.seed, self.epoch]).permutation(n)
+        else:
+            order = np.arange(n)
+        for start in range(0, len(self) * self.batch_size, self.batch_size):
+            yield self.epoch, order[start : start + self.batch_size].tolist()
+
+    def __iter__(self):
+        self.dataset.set_epoch(self.epoch)
+        if self.num_workers <= 0:
+            for task in self._batches():
+                yield collate_batch([self.dataset.load(i, task[0]) for i in task[1]])
+        else:
+            if self._pool is None:
+                self._pool = multiprocessing.Pool(
+                    self.num_workers, initializer=_init_worker, initargs=(self.dataset,)
+                )
+            # 在途任务数有上限，按提交顺序产出，保证批次顺序确定
+            pending = deque()
+            window = self.num_workers * self.prefetch
+            for task in self._batches():
+                pending.append(self._pool.apply_async(_load_batch, (task,)))
+                if len(pending) >= window:
+                    yield pending.popleft().get()
+            while pending:
+                yield pending.popleft().get()
+        self.epoch += 1
+
+    def close(self):
+        """关闭工作进程池"""
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def benchmark(loader, epochs=1):
+    """遍历加载器并统计吞吐量（图像/秒）"""
+    images = 0
+    start = time.perf_counter()
+    for _ in range(epochs):
+        for batch in loader:
+            images += len(batch["files"])
+    elapsed = time.perf_counter() - start
+    return images, elapsed
+
+
+# ==================== 主程序入口 ====================
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="内存增强加载器吞吐量测试")
+    parser.add_argument("-i", "--input", required=True, help="图像目录")
+    parser.add_argument("-l", "--labels", default=None, help="YOLO 标签目录（默认同图像目录）")
+    parser.add_argument("--ops", nargs="*", default=["flip", "brightness"], help="启用的增强操作")
+    parser.add_argument("--imgsz", type=int, default=640, help="输出尺寸")
+    parser.add_argument("--batch", type=int, default=16, help="批大小")
+    parser.add_argument("--workers", type=int, default=None, help="工作进程数")
+    parser.add_argument("--repeats", type=int, default=1, help="每个 epoch 的增强倍数")
+    parser.add_argument("--epochs", type=int, default=1, help="测试的 epoch 数")
+    args = parser.parse_args()
+
+    params = AugmentParams(operations=frozenset(args.ops))
+    dataset = AugmentedDataset(
+        args.input, params, label_dir=args.labels, repeats=args.repeats, imgsz=args.imgsz
+    )
+    with AugmentedBatchLoader(dataset, batch_size=args.batch, num_workers=args.workers) as loader:
+        images, elapsed = benchmark(loader, args.epochs)
+    print(f"共生成 {images} 张增强图像，耗时 {elapsed:.2f}s，{images / max(elapsed, 1e-9):.1f} 张/秒")
@@ -0,0 +1,304 @@
+"""按目标数量生成类别均衡的增强计划
+
+功能说明：
+读取 YOLO 标签统计类别直方图，计算每张图像需要生成的增强次数，
+让稀有类别在增强后向目标分布靠拢，并输出可复现的计划文件（JSON），
+交给 augment_engine.run_plan 精确执行。
+
+分配方法：
+1. 每张图像归入它所含类别中最稀有的那一类（按包含该类别的图像数判断）
+2. 对各类别分组做"注水"分配：找到水位 L，使每组增强后的图像数尽量接近
+   L * 目标占比，且新增总数恰好等于预算（每张图像可设上限）
+3. 组内按该类别实例数从多到少、再按文件名排序，均摊整数配额
+
+命令行用法：
+  # 生成计划
+  python augment_planner.py -i E:/data --total 5000 --plan plan.json
+  # 生成并执行计划
+  python augment_planner.py -i E:/data --total 5000 --plan plan.json -o E:/enhance --ops flip brightness
+"""
+
+import json
+import os
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from augment_engine import AugmentParams, list_samples, run_plan
+
+PLAN_FILENAME = "augment_plan.json"
+PLAN_VERSION = 1
+
+# 没有任何标签的图像所在分组
+BACKGROUND = -1
+
+
+def read_label_classes(label_path):
+    """读取标签文件中每个目标的类别ID（只解析每行第一个字段）"""
+    classes = []
+    with open(label_path, "r", encoding="utf-8") as f:
+        for line in f:
+            parts = line.split(maxsplit=1)
+            if parts:
+                classes.append(int(float(parts[0])))
+    return classes
+
+
+def load_class_counts(samples, label_dir, max_workers=None):
+    """并行读取所有标签，返回每张图像的 {类别ID: 实例数}
+
+    Args:
+        samples: list_samples 的返回值
+        label_dir: 标签目录
+    """
+
+    def count(sample):
+        label = sample[1]
+        if not label:
+            return Counter()
+        return Counter(read_label_classes(os.path.join(label_dir, label)))
+
+    max_workers = max_workers or min(32, (os.cpu_count() or 4) * 4)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(count, samples))
+
+
+def class_histogram(per_image_counts):
+    """汇总类别直方图
+
+    Returns:
+        (实例直方图 {类别: 实例数}, 图像直方图 {类别: 包含该类别的图像数})
+    """
+    instances = Counter()
+    images = Counter()
+    for counts in per_image_counts:
+        instances.update(counts)
+        images.update(counts.keys())
+    return instances, images
+
+
+def _water_fill(sizes, shares, caps, budget, iterations=100):
+    """二分求水位，返回每组的连续配额
+
+    配额 q_k = clip(L * share_k - size_k, 0, cap_k)，使 sum(q_k) 尽量等于 budget。
+    """
+
+    def total(level):
+        return sum(
+            min(cap, max(0.0, level * share - size))
+            for size, share, cap in zip(sizes, shares, caps)
+        )
+
+    high = 1.0
+    while total(high) < budget and high < 1e15:
+        high *= 2
+    low = 0.0
+    for _ in range(iterations):
+        mid = (low + high) / 2
+        if total(mid) < budget:
+            low = mid
+        else:
+            high = mid
+    return [
+        min(cap, max(0.0, high * share - size))
+        for size, share, cap in zip(sizes, shares, caps)
+    ]
+
+
+def _round_quotas(quotas, caps, budget):
+    """最大余数法取整，保证总和等于 min(budget, sum(caps))"""
+    floors = [min(int(q), cap) for q, cap in zip(quotas, caps)]
+    remaining = min(budget, sum(caps)) - sum(floors)
+    order = sorted(
+        range(len(quotas)), key=lambda k: (quotas[k] - floors[k]), reverse=True
+    )
+    while remaining > 0:
+        progressed = False
+        for k in order:
+            if remaining == 0:
+                break
+            if floors[k] < caps[k]:
+                floors[k] += 1
+                remaining -= 1
+                progressed = True
+        if not progressed:
+            break
+    return floors
+
+
+def _spread(quota, members, cap):
+    """把整数配额均摊到组内图像（members 已按优先级排序）"""
+    counts = [0] * len(members)
+    if not members:
+        return counts
+    base, extra = divmod(quota, len(members))
+    for i in range(len(members)):
+        counts[i] = min(cap, base + (1 if i < extra else 0))
+    # 上限导致的剩余配额继续分给还有余量的图像
+    leftover = quota - sum(counts)
+    i = 0
+    while leftover > 0 and any(c < cap for c in counts):
+        if counts[i] < cap:
+            counts[i] += 1
+            leftover -= 1
+        i = (i + 1) % len(counts)
+    return counts
+
+
+def build_plan(
+    input_dir,
+    augment_total,
+    label_dir=None,
+    balance=True,
+    target_distribution=None,
+    max_per_image=None,
+    seed=0,
+):
+    """生成增强计划
+
+    Args:
+        input_dir: 图像目录
+        augment_total: 需要新增的增强图像总数
+        label_dir: YOLO 标签目录，默认与图像目录相同
+        balance: True=按类别均衡分配，False=在所有图像上均匀分配
+        target_distribution: {类别ID: 权重} 目标分布，默认各类别均等
+        max_per_image: 单张图像的增强次数上限，None 表示不限制
+        seed: 随机种子，写入计划，保证执行结果可复现
+
+    Returns:
+        计划字典，items 中每项为 {"image", "label", "count", "group"}
+    """
+    label_dir = label_dir or input_dir
+    samples = list_samples(input_dir, label_dir)
+    if balance:
+        per_image = load_class_counts(samples, label_dir)
+    else:
+        per_image = [Counter()] * len(samples)
+    instances, images_per_class = class_histogram(per_image)
+
+    # 1. 每张图像归入其最稀有的类别；没有任何标签时所有图像同属一组
+    groups = {}
+    group_of = [BACKGROUND] * len(samples)
+    for index, counts in enumerate(per_image):
+        if counts and images_per_class:
+            key = min(counts, key=lambda c: (images_per_class[c], c))
+        else:
+            key = BACKGROUND
+        group_of[index] = key
+        groups.setdefault(key, []).append(index)
+    if images_per_class and BACKGROUND in groups:
+        # 有标注数据时，背景图不参与增强
+        background = groups.pop(BACKGROUND)
+    else:
+        background = []
+
+    # 2. 组间注水分配
+    keys = sorted(groups)
+    if target_distribution:
+        weights = [float(target_distribution.get(k, 0.0)) for k in keys]
+    else:
+        weights = [1.0] * len(keys)
+    weight_sum = sum(weights) or 1.0
+    shares = [w / weight_sum for w in weights]
+    sizes = [len(groups[k]) for k in keys]
+    cap = max_per_image if max_per_image is not None else max(augment_total, 0)
+    caps = [cap * size if share > 0 else 0 for size, share in zip(sizes, shares)]
+    quotas = _water_fill(sizes, shares, caps, augment_total) if keys else []
+    quotas = _round_quotas(quotas, caps, max(augment_total, 0))
+
+    # 3. 组内分配
+    counts = [0] * len(samples)
+    for key, quota in zip(keys, quotas):
+        members = sorted(
+            groups[key],
+            key=lambda i: (-per_image[i].get(key, 0), samples[i][0]),
+        )
+        for index, count in zip(members, _spread(quota, members, cap)):
+            counts[index] = count
+
+    expected = Counter(instances)
+    for index, count in enumerate(counts):
+        for cls, n in per_image[index].items():
+            expected[cls] += n * count
+
+    return {
+        "version": PLAN_VERSION,
+        "input_dir": os.path.abspath(input_dir),
+        "label_dir": os.path.abspath(label_dir),
+        "seed": seed,
+        "augment_total": sum(counts),
+        "balance": balance,
+        "class_histogram": {str(k): instances[k] for k in sorted(instances)},
+        "expected_histogram": {str(k): expected[k] for k in sorted(expected)},
+        "background_images": len(background),
+        "items": [
+            {
+                "image": image,
+                "label": label,
+                "count": counts[index],
+                "group": group_of[index],
+            }
+            for index, (image, label) in enumerate(samples)
+        ],
+    }
+
+
+def save_plan(plan, plan_path):
+    """保存计划文件（JSON）"""
+    with open(plan_path, "w", encoding="utf-8") as f:
+        json.dump(plan, f, ensure_ascii=False, indent=1)
+
+
+def load_plan(plan_path):
+    """读取计划文件"""
+    with open(plan_path, "r", encoding="utf-8") as f:
+        plan = json.load(f)
+    if plan.get("version") != PLAN_VERSION:
+        raise ValueError(f"不支持的计划文件版本: {plan.get('version')}")
+    return plan
+
+
+def format_plan_summary(plan):
+    """生成计划的文字摘要（类别直方图：原始 → 预计）"""
+    lines = [
+        f"图像数: {len(plan['items'])}，新增增强图像: {plan['augment_total']}",
+    ]
+    for cls, before in plan["class_histogram"].items():
+        after = plan["expected_histogram"].get(cls, before)
+        lines.append(f"  类别 {cls}: {before} → {after}")
+    return "\n".join(lines)
+
+
+# ==================== 主程序入口 ====================
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="生成（并执行）类别均衡的增强计划")
+    parser.add_argument("-i", "--input", required=True, help="图像目录")
+    parser.add_argument("-l", "--labels", default=None, help="YOLO 标签目录（默认同图像目录）")
+    parser.add_argument("--total", type=int, required=True, help="新增增强图像总数")
+    parser.add_argument("--plan", default=PLAN_FILENAME, help="计划文件路径")
+    parser.add_argument("--uniform", action="store_true", help="不做类别均衡，均匀分配")
+    parser.add_argument("--max-per-image", type=int, default=None, help="单张图像增强次数上限")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    parser.add_argument("-o", "--output", default=None, help="输出目录（指定时立即执行计划）")
+    parser.add_argument("--ops", nargs="*", default=[], help="启用的增强操作")
+    parser.add_argument("--keep-originals", action="store_true", help="同时复制原图")
+    args = parser.parse_args()
+
+    params = AugmentParams(operations=frozenset(args.ops))
+    plan = build_plan(
+        args.input,
+        args.total,
+        label_dir=args.labels,
+        balance=not args.uniform,
+        max_per_image=args.max_per_image,
+        seed=args.seed,
+    )
+    plan["params"] = params.to_dict()
+    save_plan(plan, args.plan)
+    print(format_plan_summary(plan))
+    print(f"计划已保存: {args.plan}")
+
+    if args.output:
+        written = run_plan(plan, args.output, params, preserve_originals=args.keep_originals)
+        print(f"已写入 {written} 张图像到 {args.output}")
@@ -19,11 +19,16 @@ from PyQt5.QtWidgets import (
 from PyQt5.QtGui import QImage, QPixmap
 from PyQt5.QtCore import Qt
 
+from augment_engine import AugmentParams
+from preview_renderer import PreviewController
+
 
 class AugmentationApp(QWidget):
     def __init__(self):
         super().__init__()
         self.sliders = {}
+        # 预览：缩略代理图 + 防抖 + 后台渲染
+        self.preview = PreviewController(self.show_preview, parent=self)
         self.initUI()
         self.original_image = None
         self.current_image_path = None
@@ -82,6 +87,7 @@ class AugmentationApp(QWidget):
             slider.valueChanged.connect(
                 lambda value, label=slider_value_label: label.setText(f"值: {value}")
             )
+            slider.valueChanged.connect(self.update_preview)
 
         self.preview_layout.addWidget(QLabel("噪声强度:"))
         noise_slider = QSlider(Qt.Horizontal)
@@ -96,6 +102,7 @@ class AugmentationApp(QWidget):
         noise_slider.valueChanged.connect(
             lambda value: noise_value_label.setText(f"值: {value}")
         )
+        noise_slider.valueChanged.connect(self.update_preview)
 
         self.preview_button = QPushButton("预览增强效果")
         self.preview_button.clicked.connect(self.select_random_image)
@@ -126,40 +133,6 @@ class AugmentationApp(QWidget):
         self.output_dir = QFileDialog.getExistingDirectory(self, "选择输出文件夹")
         print(f"输出文件夹: {self.output_dir}")
 
-    def augment_image_for_preview(self, image, operations):
-        if operations.get("scale"):
-            scale_factor = self.sliders["scale"].value() / 100.0
-            image = cv2.resize(image, None, fx=scale_factor, fy=scale_factor)
-
-        if operations.get("rotate"):
-            angle = self.sliders["rotate"].value()
-            h, w = image.shape[:2]
-            center = (w // 2, h // 2)
-            M = cv2.getRotationMatrix2D(center, angle, 1.0)
-            image = cv2.warpAffine(image, M, (w, h))
-
-        if operations.get("flip"):
-            image = cv2.flip(image, 1)
-
-        if operations.get("brightness"):
-            brightness_change = self.sliders["brightness"].value() - 50
-            image = cv2.convertScaleAbs(image, alpha=1, beta=brightness_change)
-
-        if operations.get("translate"):
-            tx = self.sliders["translate"].value() - 50
-            ty = self.sliders["translate"].value() - 50
-            M = np.float32([[1, 0, tx], [0, 1, ty]])
-            image = cv2.warpAffine(image, M, (image.shape[1], image.shape[0]))
-
-        if operations.get("noise"):
-            noise_strength = max(self.sliders["noise"].value() / 100.0, 0)
-            noise = np.random.normal(0, 25 * noise_strength, image.shape).astype(
-                np.uint8
-            )
-            image = cv2.add(image, noise)
-
-        return image
-
     def augment_image(self, image, operations):
         if operations.get("scale"):
             scale_factor = self.sliders["scale"].value() / 100.0
@@ -234,6 +207,7 @@ class AugmentationApp(QWidget):
                 self.input_dir, random.choice(os.listdir(self.input_dir))
             )
             self.original_image = cv2.imread(self.current_image_path)
+            self.preview.set_image(self.original_image)
             print(f"选择随机图像: {self.current_image_path}")  # 调试信息
             self.update_preview()
 
@@ -243,22 +217,27 @@ class AugmentationApp(QWidget):
                 op: checkbox.isChecked()
                 for op, checkbox in self.preview_options.items()
             }
-            augmented_image = self.augment_image_for_preview(
-                self.original_image.copy(), preview_operations
+            self.preview.schedule(
+                AugmentParams.from_widgets(preview_operations, self.sliders)
             )
 
-            height, width, channel = augmented_image.shape
-            bytes_per_line = 3 * width
-            qt_image = QImage(
-                augmented_image.data,
-                width,
-                height,
-                bytes_per_line,
-                QImage.Format_RGB888,
-            ).rgbSwapped()
-            self.scene.clear()
-            self.scene.addPixmap(QPixmap.fromImage(qt_image))
-            self.view.setScene(self.scene)
+    def show_preview(self, augmented_image):
+        height, width, channel = augmented_image.shape
+        bytes_per_line = augmented_image.strides[0]
+        qt_image = QImage(
+            augmented_image.data,
+            width,
+            height,
+            bytes_per_line,
+            QImage.Format_RGB888,
+        ).rgbSwapped()
+        self.scene.clear()
+        self.scene.addPixmap(QPixmap.fromImage(qt_image))
+        self.view.setScene(self.scene)
+
+    def closeEvent(self, event):
+        self.preview.shutdown()
+        super().closeEvent(event)
 
 
 if __name__ == "__main__":
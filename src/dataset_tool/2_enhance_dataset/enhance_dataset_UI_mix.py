@@ -1,10 +1,7 @@
 import sys
 import os
 import cv2
-import numpy as np
 import random
-import shutil
-import math
 from PyQt5.QtWidgets import (
     QApplication,
     QWidget,
@@ -24,125 +21,91 @@ from PyQt5.QtWidgets import (
 from PyQt5.QtGui import QImage, QPixmap
 from PyQt5.QtCore import Qt, QThread, pyqtSignal, QObject
 
+from augment_engine import (
+    AugmentParams,
+    list_samples,
+    run_augmentation,
+    run_plan,
+)
+from augment_planner import PLAN_FILENAME, build_plan, format_plan_summary, save_plan
+from preview_renderer import PreviewController
+
 
 class Worker(QObject):
+    """增强工作对象（运行在 QThread 中）
+
+    只持有参数快照，不访问任何 Qt 控件；实际处理交给 augment_engine 的线程池，
+    进度信号按时间节流，避免高吞吐时信号淹没 GUI 事件循环。
+    """
+
     finished = pyqtSignal()
     progress = pyqtSignal(int)
 
-    def __init__(self, input_dir, output_dir, operations, sliders):
+    # 进度信号的最小间隔（秒），即每秒最多 10 次
+    PROGRESS_INTERVAL = 0.1
+
+    def __init__(self, input_dir, output_dir, params):
         super().__init__()
         self.input_dir = input_dir
         self.output_dir = output_dir
-        self.operations = operations
-        self.sliders = sliders
+        self.params = params
         # new parameters (will be set after construction by caller)
         self.preserve_originals = False
         self.augment_per_image = 5
         self.target_total = 0
-
-    def augment_image(self, image):
-        if self.operations.get("scale"):
-            scale_factor = self.sliders["scale"].value() / 100.0
-            image = cv2.resize(image, None, fx=scale_factor, fy=scale_factor)
-
-        if self.operations.get("rotate"):
-            angle = self.sliders["rotate"].value()
-            h, w = image.shape[:2]
-            center = (w // 2, h // 2)
-            M = cv2.getRotationMatrix2D(center, angle, 1.0)
-            image = cv2.warpAffine(image, M, (w, h))
-
-        if self.operations.get("flip"):
-            image = cv2.flip(image, 1)
-
-        if self.operations.get("brightness"):
-            brightness_change = self.sliders["brightness"].value() - 50
-            image = cv2.convertScaleAbs(image, alpha=1, beta=brightness_change)
-
-        if self.operations.get("translate"):
-            tx = self.sliders["translate"].value() - 50
-            ty = self.sliders["translate"].value() - 50
-            M = np.float32([[1, 0, tx], [0, 1, ty]])
-            image = cv2.warpAffine(image, M, (image.shape[1], image.shape[0]))
-
-        if self.operations.get("noise"):
-            noise_strength = max(self.sliders["noise"].value() / 100.0, 0)
-            noise = np.random.normal(0, 25 * noise_strength, image.shape).astype(
-                np.uint8
-            )
-            image = cv2.add(image, noise)
-
-        return image
+        self.balance_classes = True
+        self.max_workers = None
 
     def enhance_dataset(self):
-        if not os.path.exists(self.output_dir):
-            os.makedirs(self.output_dir)
-
-        input_files = [
-            f
-            for f in os.listdir(self.input_dir)
-            if f.lower().endswith((".png", ".jpg", ".jpeg"))
-        ]
-
-        # current count in output folder (helps when resuming or preserving originals)
-        current_count = len(
-            [f for f in os.listdir(self.output_dir) if f.lower().endswith((".png", ".jpg", ".jpeg"))]
-        )
-
-        for i, filename in enumerate(input_files):
-            file_path = os.path.join(self.input_dir, filename)
-            image = cv2.imread(file_path)
-
-            if image is None:
-                print(f"Error reading image {file_path}")
-                continue
-
-            # copy original if requested
-            if self.preserve_originals:
-                dest = os.path.join(self.output_dir, filename)
-                base, ext = os.path.splitext(filename)
-                if not os.path.exists(dest):
-                    shutil.copy2(file_path, dest)
-                    current_count += 1
-                else:
-                    k = 1
-                    while os.path.exists(os.path.join(self.output_dir, f"{base}_orig{k}{ext}")):
-                        k += 1
-                    shutil.copy2(file_path, os.path.join(self.output_dir, f"{base}_orig{k}{ext}"))
-                    current_count += 1
-
-            # determine how many augmentations to generate for this file
+        try:
             if self.target_total and self.target_total > 0:
-                remaining_needed = max(0, self.target_total - current_count)
-                remaining_files = len(input_files) - i
-                if remaining_files > 0:
-                    per_this = max(0, math.ceil(remaining_needed / remaining_files))
-                else:
-                    per_this = 0
-                num_aug = per_this
+                self.run_target_plan()
             else:
-                num_aug = max(0, int(self.augment_per_image))
-
-            for j in range(num_aug):
-                augmented_image = self.augment_image(image.copy())
-                out_name = f"aug_{i}_{j}_{filename}"
-                output_path = os.path.join(self.output_dir, out_name)
-                cv2.imwrite(output_path, augmented_image)
-                current_count += 1
-
-            self.progress.emit(int((i + 1) / len(input_files) * 100))
-
-            # stop early if target reached
-            if self.target_total and current_count >= self.target_total:
-                break
-
-        self.finished.emit()
+                run_augmentation(
+                    self.input_dir,
+                    self.output_dir,
+                    self.params,
+                    augment_per_image=self.augment_per_image,
+                    preserve_originals=self.preserve_originals,
+                    max_workers=self.max_workers,
+                    progress_callback=self.progress.emit,
+                    progress_interval=self.PROGRESS_INTERVAL,
+                )
+        except Exception as e:
+            print(f"增强失败: {e}")
+        finally:
+            self.finished.emit()
+
+    def run_target_plan(self):
+        """按目标总数生成增强计划（可按类别均衡），保存到输出目录后精确执行"""
+        originals = len(list_samples(self.input_dir)) if self.preserve_originals else 0
+        augment_total = max(0, self.target_total - originals)
+
+        plan = build_plan(self.input_dir, augment_total, balance=self.balance_classes)
+        plan["params"] = self.params.to_dict()
+        os.makedirs(self.output_dir, exist_ok=True)
+        plan_path = os.path.join(self.output_dir, PLAN_FILENAME)
+        save_plan(plan, plan_path)
+        print(format_plan_summary(plan))
+        print(f"增强计划已保存: {plan_path}")
+
+        run_plan(
+            plan,
+            self.output_dir,
+            self.params,
+            preserve_originals=self.preserve_originals,
+            max_workers=self.max_workers,
+            progress_callback=self.progress.emit,
+            progress_interval=self.PROGRESS_INTERVAL,
+        )
 
 
 class AugmentationApp(QWidget):
     def __init__(self):
         super().__init__()
         self.sliders = {}
+        # 预览：缩略代理图 + 防抖 + 后台渲染
+        self.preview = PreviewController(self.show_preview, parent=self)
         self.initUI()
         self.original_image = None
         self.current_image_path = None
@@ -174,6 +137,15 @@ class AugmentationApp(QWidget):
         for op, checkbox in self.operations.items():
             self.operations_layout.addWidget(checkbox)
 
+        # 多图合成操作（需要伙伴图像，不参与单图预览）
+        self.compose_operations = {
+            "mosaic": QCheckBox("马赛克"),
+            "mixup": QCheckBox("MixUp"),
+            "copy_paste": QCheckBox("复制粘贴"),
+        }
+        for op, checkbox in self.compose_operations.items():
+            self.operations_layout.addWidget(checkbox)
+
         layout.addLayout(self.operations_layout)
 
         self.preview_label = QLabel("预览选项:")
@@ -201,6 +173,7 @@ class AugmentationApp(QWidget):
             slider.valueChanged.connect(
                 lambda value, label=slider_value_label: label.setText(f"值: {value}")
             )
+            slider.valueChanged.connect(self.update_preview)
 
         # 添加噪声强度滑动条
         self.preview_layout.addWidget(QLabel("噪声强度:"))
@@ -216,6 +189,7 @@ class AugmentationApp(QWidget):
         noise_slider.valueChanged.connect(
             lambda value: noise_value_label.setText(f"值: {value}")
         )
+        noise_slider.valueChanged.connect(self.update_preview)
 
         self.preview_button = QPushButton("预览增强效果")
         self.preview_button.clicked.connect(self.select_random_image)
@@ -250,6 +224,10 @@ class AugmentationApp(QWidget):
         self.target_spin.setValue(0)
         controls_layout.addWidget(self.target_spin)
 
+        self.balance_checkbox = QCheckBox("按类别均衡(读取YOLO标签)")
+        self.balance_checkbox.setChecked(True)
+        controls_layout.addWidget(self.balance_checkbox)
+
         layout.addLayout(controls_layout)
 
         # 连接控件变化以实时更新估算（只连接一次）
@@ -285,46 +263,13 @@ class AugmentationApp(QWidget):
         self.output_dir = QFileDialog.getExistingDirectory(self, "选择输出文件夹")
         print(f"输出文件夹: {self.output_dir}")
 
-    def augment_image_for_preview(self, image, operations):
-        if operations.get("scale"):
-            scale_factor = self.sliders["scale"].value() / 100.0
-            image = cv2.resize(image, None, fx=scale_factor, fy=scale_factor)
-
-        if operations.get("rotate"):
-            angle = self.sliders["rotate"].value()
-            h, w = image.shape[:2]
-            center = (w // 2, h // 2)
-            M = cv2.getRotationMatrix2D(center, angle, 1.0)
-            image = cv2.warpAffine(image, M, (w, h))
-
-        if operations.get("flip"):
-            image = cv2.flip(image, 1)
-
-        if operations.get("brightness"):
-            brightness_change = self.sliders["brightness"].value() - 50
-            image = cv2.convertScaleAbs(image, alpha=1, beta=brightness_change)
-
-        if operations.get("translate"):
-            tx = self.sliders["translate"].value() - 50
-            ty = self.sliders["translate"].value() - 50
-            M = np.float32([[1, 0, tx], [0, 1, ty]])
-            image = cv2.warpAffine(image, M, (image.shape[1], image.shape[0]))
-
-        if operations.get("noise"):
-            noise_strength = max(self.sliders["noise"].value() / 100.0, 0)
-            noise = np.random.normal(0, 25 * noise_strength, image.shape).astype(
-                np.uint8
-            )
-            image = cv2.add(image, noise)
-
-        return image
-
     def select_random_image(self):
         if self.input_dir:
             self.current_image_path = os.path.join(
                 self.input_dir, random.choice(os.listdir(self.input_dir))
             )
             self.original_image = cv2.imread(self.current_image_path)
+            self.preview.set_image(self.original_image)
 
             if self.original_image is None:
                 print(f"错误：无法读取图像 {self.current_image_path}")
@@ -339,22 +284,27 @@ class AugmentationApp(QWidget):
                 op: checkbox.isChecked()
                 for op, checkbox in self.preview_options.items()
             }
-            augmented_image = self.augment_image_for_preview(
-                self.original_image.copy(), preview_operations
+            self.preview.schedule(
+                AugmentParams.from_widgets(preview_operations, self.sliders)
             )
 
-            height, width, channel = augmented_image.shape
-            bytes_per_line = 3 * width
-            qt_image = QImage(
-                augmented_image.data,
-                width,
-                height,
-                bytes_per_line,
-                QImage.Format_RGB888,
-            ).rgbSwapped()
-            self.scene.clear()
-            self.scene.addPixmap(QPixmap.fromImage(qt_image))
-            self.view.setScene(self.scene)
+    def show_preview(self, augmented_image):
+        height, width, channel = augmented_image.shape
+        bytes_per_line = augmented_image.strides[0]
+        qt_image = QImage(
+            augmented_image.data,
+            width,
+            height,
+            bytes_per_line,
+            QImage.Format_RGB888,
+        ).rgbSwapped()
+        self.scene.clear()
+        self.scene.addPixmap(QPixmap.fromImage(qt_image))
+        self.view.setScene(self.scene)
+
+    def closeEvent(self, event):
+        self.preview.shutdown()
+        super().closeEvent(event)
 
     def start_enhancement(self):
         if not self.input_dir:
@@ -369,16 +319,20 @@ class AugmentationApp(QWidget):
             return
 
         operations = {
-            op: checkbox.isChecked() for op, checkbox in self.operations.items()
+            op: checkbox.isChecked()
+            for op, checkbox in {**self.operations, **self.compose_operations}.items()
         }
         print(f"开始增强，操作: {operations}")
 
         self.thread = QThread()
-        self.worker = Worker(self.input_dir, self.output_dir, operations, self.sliders)
+        # 在 GUI 线程中一次性读取滑块，工作线程只拿到只读快照
+        params = AugmentParams.from_widgets(operations, self.sliders)
+        self.worker = Worker(self.input_dir, self.output_dir, params)
         # 传入新的参数
         self.worker.preserve_originals = self.preserve_checkbox.isChecked()
         self.worker.augment_per_image = self.augment_spin.value()
         self.worker.target_total = self.target_spin.value()
+        self.worker.balance_classes = self.balance_checkbox.isChecked()
         self.worker.moveToThread(self.thread)
 
         self.worker.finished.connect(self.thread.quit)
@@ -0,0 +1,132 @@
+"""增强效果实时预览（缩略代理图 + 防抖 + 后台渲染）
+
+功能说明：
+供 enhance_dataset_UI.py / enhance_dataset_UI_mix.py 的预览区域使用。
+
+主要特性：
+- 选中图像时只缩放一次，生成长边不超过 max_side 的代理图，预览始终基于代理图渲染
+- 滑块连续拖动时用单次定时器防抖，只渲染停顿后的最后一组参数
+- 渲染在后台线程执行；每个请求带递增编号，后台开始渲染前和渲染结束后都会检查编号，
+  过期请求直接跳过、过期结果直接丢弃
+- 只有最终的"开始增强"按原始分辨率处理
+"""
+
+from dataclasses import replace
+
+import cv2
+from PyQt5.QtCore import QObject, QThread, QTimer, pyqtSignal, pyqtSlot
+
+from augment_engine import augment_image
+
+# 代理图长边的最大像素数
+PROXY_MAX_SIDE = 960
+# 防抖延迟（毫秒）
+DEBOUNCE_MS = 60
+
+
+def make_proxy(image, max_side=PROXY_MAX_SIDE):
+    """生成预览用的缩略代理图
+
+    Returns:
+        (代理图, 缩放比例)，图像本身足够小时返回原图和 1.0
+    """
+    h, w = image.shape[:2]
+    ratio = min(1.0, max_side / max(h, w))
+    if ratio >= 1.0:
+        return image, 1.0
+    proxy = cv2.resize(
+        image, (max(1, round(w * ratio)), max(1, round(h * ratio))), interpolation=cv2.INTER_AREA
+    )
+    return proxy, ratio
+
+
+def scale_params_for_proxy(params, ratio):
+    """按代理图比例换算以像素为单位的参数（平移量）"""
+    if ratio >= 1.0:
+        return params
+    return replace(params, translate=50 + round((params.translate - 50) * ratio))
+
+
+class PreviewWorker(QObject):
+    """运行在后台线程中的预览渲染器"""
+
+    rendered = pyqtSignal(int, object)
+
+    def __init__(self):
+        super().__init__()
+        # 最新请求编号，由 GUI 线程写入（整数赋值是原子的）
+        self.latest = 0
+
+    @pyqtSlot(int, object, object)
+    def render(self, generation, image, params):
+        if generation != self.latest:
+            return
+        result = augment_image(image, params)
+        if generation == self.latest:
+            self.rendered.emit(generation, result)
+
+
+class PreviewController(QObject):
+    """预览调度器：防抖、后台渲染并丢弃过期结果
+
+    Args:
+        on_rendered: 渲染完成的回调（在 GUI 线程中调用），参数为 BGR 图像
+        delay_ms: 防抖延迟
+        max_side: 代理图长边上限
+    """
+
+    request = pyqtSignal(int, object, object)
+
+    def __init__(self, on_rendered, delay_ms=DEBOUNCE_MS, max_side=PROXY_MAX_SIDE, parent=None):
+        super().__init__(parent)
+        self.on_rendered = on_rendered
+        self.max_side = max_side
+        self.proxy = None
+        self.ratio = 1.0
+        self.generation = 0
+        self._pending_params = None
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(delay_ms)
+        self.timer.timeout.connect(self._dispatch)
+
+        self.thread = QThread()
+        self.worker = PreviewWorker()
+        self.worker.moveToThread(self.thread)
+        self.request.connect(self.worker.render)
+        self.worker.rendered.connect(self._on_rendered)
+        self.thread.start()
+
+    def set_image(self, image):
+        """设置预览原图（只在这里缩放一次）"""
+        if image is None:
+            self.proxy = None
+            return
+        self.proxy, self.ratio = make_proxy(image, self.max_side)
+
+    def schedule(self, params):
+        """请求用新参数渲染预览（防抖，连续调用只渲染最后一次）"""
+        if self.proxy is None:
+            return
+        self._pending_params = params
+        self.timer.start()
+
+    def _dispatch(self):
+        if self.proxy is None or self._pending_params is None:
+            return
+        self.generation += 1
+        self.worker.latest = self.generation
+        params = scale_params_for_proxy(self._pending_params, self.ratio)
+        self.request.emit(self.generation, self.proxy, params)
+
+    def _on_rendered(self, generation, image):
+        if generation == self.generation:
+            self.on_rendered(image)
+
+    def shutdown(self):
+        """停止后台线程（窗口关闭时调用）"""
+        self.timer.stop()
+        self.worker.latest = -1
+        self.thread.quit()
+        self.thread.wait()
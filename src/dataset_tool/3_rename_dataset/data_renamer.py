@@ -11,8 +11,6 @@ Copyright (c) 2024 by ${git_name_email}, All Rights Reserved.
 
 import os
 import sys
-import shutil
-import tempfile
 from PyQt5.QtWidgets import (
     QApplication,
     QMainWindow,
@@ -25,9 +23,73 @@ from PyQt5.QtWidgets import (
     QHBoxLayout,
     QProgressBar,
     QLineEdit,
+    QMessageBox,
+    QComboBox,
 )
 from PyQt5.QtGui import QFont
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QThread, pyqtSignal
+
+from rename_engine import (
+    JOURNAL_NAME,
+    execute_renames,
+    group_files,
+    plan_renames,
+    sample_groups,
+    undo_renames,
+)
+from rename_order import ORDER_MODE_NAMES, ORDER_MODES
+
+
+class RenameWorker(QThread):
+    """后台重命名线程，避免界面卡死
+
+    journal_path 为 None 时按 input_path / output_path 规划并执行重命名，
+    否则按该撤销日志恢复原文件名。
+    """
+
+    progress = pyqtSignal(int)  # 进度百分比
+    finished = pyqtSignal(bool, str)  # (成功/失败, 消息)
+
+    def __init__(
+        self,
+        input_path="",
+        output_path="",
+        start_number=1,
+        journal_path=None,
+        order="natural",
+    ):
+        super().__init__()
+        self.input_path = input_path
+        self.output_path = output_path
+        self.start_number = start_number
+        self.order = order
+        self.journal_path = journal_path
+
+    def report(self, done, total):
+        self.progress.emit(int(done / max(total, 1) * 100))
+
+    def run(self):
+        try:
+            if self.journal_path:
+                count = undo_renames(self.journal_path, self.report)
+                self.finished.emit(True, f"Restored {count} files")
+                return
+            plan = plan_renames(
+                self.input_path, self.output_path, self.start_number, order=self.order
+            )
+            # 类别列表、没有图像的孤立文件不改名，只在结果中列出
+            _, skipped = sample_groups(group_files(self.input_path))
+            note = ""
+            if skipped:
+                names = ", ".join(skipped[:5]) + (", ..." if len(skipped) > 5 else "")
+                note = f"\nSkipped {len(skipped)} non-sample files: {names}"
+            if not plan:
+                self.finished.emit(True, "Nothing to rename" + note)
+                return
+            execute_renames(plan, self.output_path, self.report)
+            self.finished.emit(True, f"Renamed {len(plan)} files" + note)
+        except Exception as e:
+            self.finished.emit(False, str(e))
 
 
 class TitleBar(QWidget):
@@ -118,9 +180,21 @@ class RenameApp(QMainWindow):
         content_layout.addWidget(self.start_number_label)
         content_layout.addWidget(self.start_number_input)
 
-        rename_btn = QPushButton("Rename Files")
-        rename_btn.clicked.connect(self.rename_files)
-        content_layout.addWidget(rename_btn)
+        # 编号顺序：默认自然排序，保证同一批数据每次重命名结果相同
+        self.order_label = QLabel("Numbering Order:")
+        self.order_combo = QComboBox()
+        for mode in ORDER_MODES:
+            self.order_combo.addItem(ORDER_MODE_NAMES[mode], mode)
+        content_layout.addWidget(self.order_label)
+        content_layout.addWidget(self.order_combo)
+
+        self.rename_btn = QPushButton("Rename Files")
+        self.rename_btn.clicked.connect(self.rename_files)
+        content_layout.addWidget(self.rename_btn)
+
+        self.undo_btn = QPushButton("Undo Last Rename")
+        self.undo_btn.clicked.connect(self.undo_rename)
+        content_layout.addWidget(self.undo_btn)
 
         self.progress_bar = QProgressBar()
         content_layout.addWidget(self.progress_bar)
@@ -205,37 +279,47 @@ class RenameApp(QMainWindow):
             )
             return
 
-        # 创建临时文件夹
-        temp_dir = tempfile.mkdtemp()
-
-        filelist = os.listdir(self.input_path)
-        total_files = len(filelist)
-        if total_files == 0:
-            return
-
         start_number = int(self.start_number_input.text() or "1")  # 获取起始编号
-        a = start_number  # 使用用户输入的起始编号
-
-        for i, files in enumerate(filelist):
-            old_path = os.path.join(self.input_path, files)
-            if os.path.isdir(old_path):
-                continue
-
-            filetype = os.path.splitext(files)[1]
-            new_path = os.path.join(temp_dir, str(a) + filetype)
 
-            # 使用 shutil.move() 而不是 os.rename()
-            shutil.move(old_path, new_path)  # 这里替换 os.rename() 为 shutil.move()
-            a += 1  # 自增编号
-            self.progress_bar.setValue(int((i + 1) / total_files * 100))
-
-        # 将临时文件夹中的文件移动到目标文件夹
-        for file in os.listdir(temp_dir):
-            temp_file_path = os.path.join(temp_dir, file)
-            shutil.move(temp_file_path, self.output_path)
+        # 同一样本（同名的图像 / 标签 / json）使用同一个新编号；
+        # 两阶段原地改名 + 撤销日志，在后台线程执行
+        self.start_worker(
+            RenameWorker(
+                self.input_path,
+                self.output_path,
+                start_number,
+                order=self.order_combo.currentData(),
+            )
+        )
 
-        # 删除临时文件夹及其内容
-        shutil.rmtree(temp_dir)
+    def undo_rename(self):
+        """按撤销日志恢复上一次重命名"""
+        folder = self.output_path or self.input_path
+        if not folder:
+            folder = QFileDialog.getExistingDirectory(
+                self, "Select the Renamed Directory"
+            )
+        journal_path = os.path.join(folder, JOURNAL_NAME) if folder else ""
+        if not os.path.exists(journal_path):
+            QMessageBox.warning(self, "Undo", "No rename journal found in this directory")
+            return
+        self.start_worker(RenameWorker(journal_path=journal_path))
+
+    def start_worker(self, worker):
+        self.rename_btn.setEnabled(False)
+        self.undo_btn.setEnabled(False)
+        self.worker = worker
+        self.worker.progress.connect(self.progress_bar.setValue)
+        self.worker.finished.connect(self.on_finished)
+        self.worker.start()
+
+    def on_finished(self, success, message):
+        self.rename_btn.setEnabled(True)
+        self.undo_btn.setEnabled(True)
+        if success:
+            QMessageBox.information(self, "Done", message)
+        else:
+            QMessageBox.critical(self, "Error", message)
 
         self.input_label.setText("Input Path: Not Selected")
         self.output_label.setText("Output Path: Not Selected")
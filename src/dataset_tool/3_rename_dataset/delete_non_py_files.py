@@ -10,18 +10,25 @@ Copyright (c) 2024 by ${git_name_email}, All Rights Reserved.
 """
 
 import os
+import sys
+
+# 复用 4_remove_unlabeled_images 中的清理工具（单次扫描 + 并行删除）
+sys.path.insert(
+    0,
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "4_remove_unlabeled_images"),
+)
+from cleanup_orphans import apply_cleanup, find_orphans
 
 
 def delete_json_files(directory):
-    for root, dirs, files in os.walk(directory):
-        for file in files:
-            if file.endswith(".json"):
-                file_path = os.path.join(root, file)
-                try:
-                    os.remove(file_path)
-                    print(f"Deleted: {file_path}")
-                except Exception as e:
-                    print(f"Error deleting {file_path}: {e}")
+    plan = find_orphans(directory, recursive=True, remove_images=False, purge=("json",))
+    count, errors = apply_cleanup(plan, "delete")
+    failed = {path for path, _ in errors}
+    for path, _ in plan.paths():
+        if path not in failed:
+            print(f"Deleted: {path}")
+    for path, message in errors:
+        print(f"Error deleting {path}: {message}")
 
 
 if __name__ == "__main__":
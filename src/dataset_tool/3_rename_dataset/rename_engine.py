@@ -0,0 +1,214 @@
+"""数据集重命名引擎
+
+功能说明：
+data_renamer.py 的重命名逻辑。先规划全部重命名，再统一执行：
+- 按文件名（无扩展名）分组，同一样本的图像、标签、json 使用同一个新编号
+  （12.jpg / 12.txt / 12.json → 1.jpg / 1.txt / 1.json）
+- 两阶段重命名：先把每个文件改名为同一目录下唯一的临时名，再改为最终名，
+  新旧编号互相重叠（1→2、2→1）也不会冲突；原地重命名只修改目录项，不复制文件内容
+- 输出目录与输入目录不同时，第二阶段直接移动到输出目录（同一磁盘为改名，跨盘只复制一次）
+- 不是样本的文件不参与编号：classes.txt 等类别列表始终跳过；目录中有图像时，
+  没有图像的文件名分组（孤立标签等）也跳过，由调用方报告，不改名
+- 执行前写入撤销日志（.rename_journal.json），undo_renames 可按日志恢复原文件名，
+  中途中断时也能恢复
+"""
+
+import json
+import os
+import shutil
+import uuid
+
+from rename_order import IMAGE_EXTENSIONS, order_stems
+
+JOURNAL_NAME = ".rename_journal.json"
+JOURNAL_VERSION = 1
+
+# 不是样本的文件（类别列表），不参与编号
+NON_SAMPLE_NAMES = ("classes.txt", "predefined_classes.txt")
+
+# 临时文件名前缀（以 . 开头，扫描时跳过）
+_TEMP_PREFIX = ".renaming-"
+
+
+def group_files(input_dir):
+    """按文件名（无扩展名）对目录中的文件分组
+
+    跳过子目录和以 . 开头的文件（撤销日志、临时文件等）。
+
+    Returns:
+        {文件名(无扩展名): [文件名]}，按扫描顺序排列
+    """
+    groups = {}
+    with os.scandir(input_dir) as it:
+        for entry in it:
+            if entry.name.startswith(".") or not entry.is_file():
+                continue
+            stem = os.path.splitext(entry.name)[0]
+            groups.setdefault(stem, []).append(entry.name)
+    return groups
+
+
+def sample_groups(groups):
+    """去掉不是样本的分组
+
+    classes.txt 等类别列表始终去掉；分组中有任意图像时，没有图像的分组也去掉
+    （只有标签的目录，如单独的 labels 文件夹，仍全部参与编号）。
+
+    Args:
+        groups: group_files 的结果
+
+    Returns:
+        (样本分组 {文件名(无扩展名): [文件名]}, 跳过的文件名列表)
+    """
+    non_sample = {name.lower() for name in NON_SAMPLE_NAMES}
+
+    def has_image(names):
+        return any(os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS for name in names)
+
+    groups = dict(groups)
+    skipped = []
+    for stem, names in list(groups.items()):
+        kept = [name for name in names if name.lower() not in non_sample]
+        skipped += [name for name in names if name.lower() in non_sample]
+        if kept:
+            groups[stem] = kept
+        else:
+            del groups[stem]
+    if any(has_image(names) for names in groups.values()):
+        for stem in [stem for stem, names in groups.items() if not has_image(names)]:
+            skipped += groups.pop(stem)
+    return groups, sorted(skipped)
+
+
+def plan_renames(input_dir, output_dir=None, start_number=1, stems=None, order="natural"):
+    """规划重命名
+
+    Args:
+        input_dir: 输入目录
+        output_dir: 输出目录，None 或与输入目录相同时原地重命名
+        start_number: 起始编号
+        stems: 编号顺序（文件名无扩展名列表），None 表示按 order 排序
+        order: 排序方式，见 rename_order.ORDER_MODES；None 表示按扫描顺序
+
+    Returns:
+        [(源路径, 目标路径)]，已去掉无需改名的文件；不是样本的文件（见 sample_groups）
+        不在其中
+
+    Raises:
+        FileExistsError: 目标文件已存在且不属于本次重命名
+    """
+    output_dir = output_dir or input_dir
+    groups, _ = sample_groups(group_files(input_dir))
+    if stems is None:
+        stems = list(groups) if order is None else order_stems(input_dir, groups, order)
+
+    plan = []
+    for number, stem in enumerate(stems, start_number):
+        for name in groups[stem]:
+            ext = os.path.splitext(name)[1]
+            plan.append(
+                (os.path.join(input_dir, name), os.path.join(output_dir, f"{number}{ext}"))
+            )
+
+    # 目标已被无关文件占用时拒绝执行，避免覆盖
+    sources = {os.path.normcase(os.path.abspath(src)) for src, _ in plan}
+    conflicts = [
+        dst
+        for _, dst in plan
+        if os.path.lexists(dst) and os.path.normcase(os.path.abspath(dst)) not in sources
+    ]
+    if conflicts:
+        raise FileExistsError(
+            f"{len(conflicts)} 个目标文件已存在（如 {os.path.basename(conflicts[0])}），"
+            f"请清空输出目录后重试"
+        )
+    return [(src, dst) for src, dst in plan if src != dst]
+
+
+def _write_journal(path, entries, phase):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(
+            {"version": JOURNAL_VERSION, "phase": phase, "entries": entries},
+            f,
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+    os.replace(tmp_path, path)
+
+
+def execute_renames(plan, journal_dir, progress_callback=None):
+    """两阶段执行重命名并写入撤销日志
+
+    Args:
+        plan: plan_renames 的结果
+        journal_dir: 撤销日志保存目录（通常为输出目录）
+        progress_callback: 进度回调，参数为 (已完成步数, 总步数)
+
+    Returns:
+        撤销日志路径
+    """
+    token = uuid.uuid4().hex[:8]
+    entries = [
+        [src, os.path.join(os.path.dirname(src), f"{_TEMP_PREFIX}{token}-{i}"), dst]
+        for i, (src, dst) in enumerate(plan)
+    ]
+    journal_path = os.path.join(journal_dir, JOURNAL_NAME)
+    os.makedirs(journal_dir, exist_ok=True)
+    total = len(entries) * 2
+    done = 0
+
+    # 第一阶段：原名 → 同目录临时名（日志记录所处阶段，用于中断后恢复）
+    _write_journal(journal_path, entries, 1)
+    for src, tmp, _ in entries:
+        os.rename(src, tmp)
+        done += 1
+        if progress_callback:
+            progress_callback(done, total)
+
+    # 第二阶段：临时名 → 目标名
+    _write_journal(journal_path, entries, 2)
+    for _, tmp, dst in entries:
+        shutil.move(tmp, dst)
+        done += 1
+        if progress_callback:
+            progress_callback(done, total)
+    return journal_path
+
+
+def undo_renames(journal_path, progress_callback=None):
+    """按撤销日志恢复原文件名，完成后删除日志
+
+    上次执行中途中断时也能恢复：第一阶段中断时只把临时名改回原名；
+    第二阶段中断时，仍是临时名的直接改回，已是目标名的两阶段改回。
+
+    Returns:
+        恢复的文件数
+    """
+    with open(journal_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if data.get("version") != JOURNAL_VERSION:
+        raise ValueError(f"不支持的撤销日志版本: {data.get('version')}")
+
+    # 已是目标名的文件先改为目标目录下的临时名，再统一改回原名
+    moves, pending = [], []
+    for src, tmp, dst in data["entries"]:
+        if os.path.lexists(tmp):
+            pending.append((tmp, src))
+        elif data["phase"] == 2 and os.path.lexists(dst):
+            moves.append((dst, os.path.join(os.path.dirname(dst), os.path.basename(tmp)), src))
+
+    total = len(moves) * 2 + len(pending)
+    done = 0
+    for dst, tmp, _ in moves:
+        os.rename(dst, tmp)
+        done += 1
+        if progress_callback:
+            progress_callback(done, total)
+    for tmp, src in [(tmp, src) for _, tmp, src in moves] + pending:
+        shutil.move(tmp, src)
+        done += 1
+        if progress_callback:
+            progress_callback(done, total)
+    os.remove(journal_path)
+    return len(moves) + len(pending)
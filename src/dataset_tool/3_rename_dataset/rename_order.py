@@ -0,0 +1,164 @@
+"""重命名编号顺序
+
+功能说明：
+决定 rename_engine.plan_renames 按什么顺序给样本编号。os.listdir 的顺序是任意的，
+同一批数据在另一台机器上重命名会得到不同的编号；这里提供几种确定的排序方式。
+
+排序方式：
+- natural：自然排序（img2 排在 img10 前面）
+- mtime：按文件修改时间
+- exif：按 EXIF 拍摄时间（DateTimeOriginal），没有 EXIF 的文件用修改时间代替
+- frame：按文件名中的视频名 + 帧号（video1_000123 → ("video1", 123)）
+
+主要特性：
+- 时间戳多线程读取；EXIF 只读取 JPEG 文件头中的 APP1 段，不解码像素
+- 每个样本（同名的图像 / 标签 / json）以图像文件为准取时间戳
+- 排序键相同时再按自然排序，结果完全确定
+"""
+
+import os
+import re
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ORDER_MODES = ("natural", "mtime", "exif", "frame")
+
+# 界面显示名称
+ORDER_MODE_NAMES = {
+    "natural": "Natural sort",
+    "mtime": "Modified time",
+    "exif": "EXIF capture time",
+    "frame": "Video + frame number",
+}
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff")
+
+_DIGITS_RE = re.compile(r"(\d+)")
+# 文件名末尾的帧号（可带 _ 或 - 分隔）
+_FRAME_RE = re.compile(r"^(.*?)[_\-]?(\d+)$")
+
+# EXIF 标签
+_EXIF_IFD_POINTER = 0x8769
+_DATETIME = 0x0132
+_DATETIME_ORIGINAL = 0x9003
+
+
+def natural_key(name):
+    """自然排序键：数字部分按数值比较"""
+    return [int(part) if part.isdigit() else part.lower() for part in _DIGITS_RE.split(name)]
+
+
+def frame_key(stem):
+    """视频帧排序键：(视频名的自然排序键, 帧号)，没有帧号时帧号记为 -1"""
+    match = _FRAME_RE.match(stem)
+    if match is None:
+        return natural_key(stem), -1
+    return natural_key(match.group(1)), int(match.group(2))
+
+
+def _read_exif_segment(f):
+    """在 JPEG 中找到 APP1 Exif 段并返回其中的 TIFF 数据，没有时返回 None"""
+    if f.read(2) != b"\xff\xd8":
+        return None
+    while True:
+        marker = f.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        code = marker[1]
+        # 图像数据开始（SOS）或结束后不会再有 EXIF
+        if code in (0xDA, 0xD9):
+            return None
+        length = struct.unpack(">H", f.read(2))[0]
+        if code == 0xE1:
+            data = f.read(length - 2)
+            if data[:6] == b"Exif\x00\x00":
+                return data[6:]
+        else:
+            f.seek(length - 2, os.SEEK_CUR)
+
+
+def _ifd_entries(tiff, offset, endian):
+    """读取一个 IFD 的全部条目 {标签: (类型, 个数, 值或偏移)}"""
+    (count,) = struct.unpack(endian + "H", tiff[offset : offset + 2])
+    entries = {}
+    for i in range(count):
+        start = offset + 2 + i * 12
+        tag, kind, n, value = struct.unpack(endian + "HHII", tiff[start : start + 12])
+        entries[tag] = (kind, n, value, start + 8)
+    return entries
+
+
+def _ascii_value(tiff, entry):
+    kind, n, value, inline = entry
+    # ASCII 不超过 4 字节时直接存放在条目中
+    start = inline if n <= 4 else value
+    return tiff[start : start + n].rstrip(b"\x00").decode("ascii", "replace")
+
+
+def exif_datetime(path):
+    """读取 JPEG 的 EXIF 拍摄时间（时间戳），没有时返回 None"""
+    try:
+        with open(path, "rb") as f:
+            tiff = _read_exif_segment(f)
+        if not tiff:
+            return None
+        endian = "<" if tiff[:2] == b"II" else ">"
+        (ifd0,) = struct.unpack(endian + "I", tiff[4:8])
+        entries = _ifd_entries(tiff, ifd0, endian)
+        text = None
+        if _EXIF_IFD_POINTER in entries:
+            exif = _ifd_entries(tiff, entries[_EXIF_IFD_POINTER][2], endian)
+            if _DATETIME_ORIGINAL in exif:
+                text = _ascii_value(tiff, exif[_DATETIME_ORIGINAL])
+        if text is None and _DATETIME in entries:
+            text = _ascii_value(tiff, entries[_DATETIME])
+        if not text:
+            return None
+        return time.mktime(time.strptime(text.strip(), "%Y:%m:%d %H:%M:%S"))
+    except (OSError, struct.error, ValueError, OverflowError):
+        return None
+
+
+def _primary_file(names):
+    """样本中用于读取时间戳的文件：优先图像"""
+    for name in names:
+        if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS:
+            return name
+    return names[0]
+
+
+def order_stems(input_dir, groups, mode="natural", max_workers=None):
+    """按指定方式给样本排序
+
+    Args:
+        input_dir: 输入目录
+        groups: rename_engine.group_files 的结果 {文件名(无扩展名): [文件名]}
+        mode: 排序方式，见 ORDER_MODES
+        max_workers: 读取时间戳的线程数
+
+    Returns:
+        排序后的文件名（无扩展名）列表
+    """
+    stems = sorted(groups, key=natural_key)
+    if mode == "natural":
+        return stems
+    if mode == "frame":
+        return sorted(stems, key=frame_key)
+    if mode not in ("mtime", "exif"):
+        raise ValueError(f"不支持的排序方式: {mode}")
+
+    def timestamp(stem):
+        path = os.path.join(input_dir, _primary_file(groups[stem]))
+        if mode == "exif":
+            value = exif_datetime(path)
+            if value is not None:
+                return value
+        return os.stat(path).st_mtime
+
+    max_workers = max_workers or min(32, (os.cpu_count() or 4) * 4)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        times = list(executor.map(timestamp, stems))
+    # stems 已按自然排序，sorted 是稳定的，时间相同的样本保持自然顺序
+    order = sorted(range(len(stems)), key=times.__getitem__)
+    return [stems[i] for i in order]
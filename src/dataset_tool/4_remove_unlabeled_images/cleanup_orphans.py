@@ -0,0 +1,298 @@
+"""孤立文件批量清理
+
+功能说明：
+remove_unlabeled_images.py（删除没有 JSON 的图片）和 3_rename_dataset/delete_non_py_files.py
+（删除全部 JSON）共用的清理工具。一次扫描建立"文件名（无扩展名）→ 图像 / 标签"的索引，
+找出：
+- 孤立图像：没有任何一种标签（.txt / .json，可配置）的图像
+- 孤立标签：没有对应图像的标签
+- 指定类型的全部文件（--purge，如删除全部 .json）
+
+主要特性：
+- 复用 5_split_dataset/dataset_index.py：单次 scandir，可递归扫描子文件夹，
+  按字典 / 集合查找文件名，O(1)
+- 图像扩展名、标签类型（txt / json）可配置；图像和标签可以在不同文件夹
+- classes.txt 等类别列表不是样本标签，不会被当作孤立标签清理（可用 --ignore 配置）
+- 三种处理方式：dry-run（只输出报告）、quarantine（移动到隔离文件夹，保留相对路径，
+  可手动恢复）、delete（多线程并行删除）
+"""
+
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+# 复用 5_split_dataset 中的文件夹索引和并行传输
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "5_split_dataset")
+)
+from dataset_index import IMAGE_EXTENSIONS, build_index
+from transfer import default_workers, transfer_files
+
+# 标签类型 → dataset_index 中的文件类别
+LABEL_KINDS = {"txt": "label", "json": "json"}
+
+CLEANUP_ACTIONS = ("dry-run", "quarantine", "delete")
+
+CATEGORY_NAMES = {
+    "orphan_images": "没有标签的图像",
+    "orphan_labels": "没有图像的标签",
+    "purged": "指定删除的文件",
+}
+
+# 不是样本标签的文件（类别列表等），不会被当作孤立标签或随 --purge 清理
+IGNORED_LABEL_NAMES = ("classes.txt", "predefined_classes.txt")
+
+# 默认隔离文件夹名（位于图像文件夹下，扫描时以 . 开头的文件夹会被跳过）
+QUARANTINE_DIR_NAME = ".quarantine"
+
+
+class CleanupPlan:
+    """待清理的文件
+
+    Attributes:
+        files: {类别: [(绝对路径, 相对扫描根目录的路径)]}，类别见 CATEGORY_NAMES
+    """
+
+    def __init__(self):
+        self.files = {name: [] for name in CATEGORY_NAMES}
+
+    def __len__(self):
+        return sum(len(items) for items in self.files.values())
+
+    def paths(self):
+        """全部待清理的 [(绝对路径, 相对路径)]，同一文件只出现一次"""
+        seen, result = set(), []
+        for items in self.files.values():
+            for path, rel in items:
+                if path not in seen:
+                    seen.add(path)
+                    result.append((path, rel))
+        return result
+
+    def format(self, limit=20):
+        """格式化为文本报告，每个类别最多列出 limit 个文件"""
+        lines = [f"待清理文件: {len(self.paths())} 个"]
+        for name, items in self.files.items():
+            if not items:
+                continue
+            lines.append(f"  {CATEGORY_NAMES[name]}: {len(items)}")
+            for path, _ in items[:limit]:
+                lines.append(f"    {path}")
+            if len(items) > limit:
+                lines.append(f"    ……另有 {len(items) - limit} 个未列出")
+        return "\n".join(lines)
+
+
+def _relative(index, path):
+    return os.path.relpath(path, index.root)
+
+
+def find_orphans(
+    image_dir,
+    label_dir=None,
+    label_types=("json",),
+    image_extensions=IMAGE_EXTENSIONS,
+    recursive=False,
+    remove_images=True,
+    remove_labels=False,
+    purge=(),
+    ignore=IGNORED_LABEL_NAMES,
+):
+    """扫描文件夹，找出需要清理的文件
+
+    Args:
+        image_dir: 图像文件夹
+        label_dir: 标签文件夹，None 表示与图像在同一文件夹
+        label_types: 视为标签的类型，见 LABEL_KINDS；图像有其中任意一种即视为已标注
+        image_extensions: 视为图像的扩展名
+        recursive: 是否递归扫描子文件夹（递归时按相对路径匹配）
+        remove_images: 是否清理没有标签的图像
+        remove_labels: 是否清理没有图像的标签
+        purge: 无论是否配对都全部清理的标签类型（如 ("json",)）
+        ignore: 不参与标签清理的文件名（不区分大小写），默认为 classes.txt 等类别列表
+
+    Returns:
+        CleanupPlan
+    """
+    unknown = set(label_types) | set(purge)
+    unknown -= set(LABEL_KINDS)
+    if unknown:
+        raise ValueError(f"不支持的标签类型: {', '.join(sorted(unknown))}")
+
+    # 清理前必须反映磁盘上的最新状态，不使用索引缓存
+    image_index = build_index(
+        image_dir, recursive=recursive, image_extensions=image_extensions, use_cache=False
+    )
+    if label_dir is None or os.path.abspath(label_dir) == image_index.root:
+        label_index = image_index
+    else:
+        label_index = build_index(
+            label_dir, recursive=recursive, image_extensions=image_extensions, use_cache=False
+        )
+
+    kinds = [LABEL_KINDS[t] for t in label_types]
+    # 同一文件名可能有多个图像（如 a.jpg 和 a.png），全部列出，不能漏掉
+    images = image_index.all_files("image")
+    plan = CleanupPlan()
+
+    if remove_images:
+        labeled = set()
+        for kind in kinds:
+            labeled.update(label_index.files(kind))
+        plan.files["orphan_images"] = [
+            (path, _relative(image_index, path))
+            for key, paths in images.items()
+            if key not in labeled
+            for path in paths
+        ]
+
+    ignored = {name.lower() for name in ignore}
+
+    def label_files(kind):
+        for key, paths in label_index.all_files(kind).items():
+            for path in paths:
+                if os.path.basename(path).lower() not in ignored:
+                    yield key, path
+
+    if remove_labels:
+        for kind in kinds:
+            plan.files["orphan_labels"].extend(
+                (path, _relative(label_index, path))
+                for key, path in label_files(kind)
+                if key not in images
+            )
+
+    for label_type in purge:
+        plan.files["purged"].extend(
+            (path, _relative(label_index, path))
+            for _, path in label_files(LABEL_KINDS[label_type])
+        )
+    return plan
+
+
+def apply_cleanup(plan, action="dry-run", quarantine_dir=None, max_workers=None):
+    """执行清理
+
+    Args:
+        plan: find_orphans 的结果
+        action: 处理方式，见 CLEANUP_ACTIONS
+        quarantine_dir: 隔离文件夹（action 为 quarantine 时必填），按相对路径存放
+        max_workers: 并行线程数
+
+    Returns:
+        (处理的文件数, [(路径, 错误信息)])
+    """
+    if action not in CLEANUP_ACTIONS:
+        raise ValueError(f"不支持的处理方式: {action}")
+    items = plan.paths()
+    if action == "dry-run" or not items:
+        return 0, []
+    max_workers = max_workers or default_workers()
+
+    if action == "quarantine":
+        if not quarantine_dir:
+            raise ValueError("隔离模式需要指定隔离文件夹")
+        jobs = [(path, os.path.join(quarantine_dir, rel)) for path, rel in items]
+        for directory in {os.path.dirname(dst) for _, dst in jobs}:
+            os.makedirs(directory, exist_ok=True)
+        stats = transfer_files(jobs, mode="move", max_workers=max_workers)
+        return stats.done, []
+
+    def unlink(path):
+        try:
+            os.remove(path)
+            return None
+        except OSError as e:
+            return path, str(e)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(unlink, [path for path, _ in items]))
+    errors = [r for r in results if r is not None]
+    return len(items) - len(errors), errors
+
+
+# ==================== 主程序入口 ====================
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="孤立图像 / 标签批量清理",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+使用示例:
+  # 只输出报告：没有 JSON 的图片
+  python cleanup_orphans.py -i E:/data
+
+  # 没有 txt 也没有 json 的图片、没有图片的标签，移动到隔离文件夹
+  python cleanup_orphans.py -i E:/data --labels txt json --orphan-labels --action quarantine
+
+  # 递归删除全部 JSON
+  python cleanup_orphans.py -i E:/data --purge json --no-orphan-images --recursive --action delete
+        """,
+    )
+    parser.add_argument("-i", "--images", required=True, help="图像文件夹")
+    parser.add_argument("-l", "--label-dir", default=None, help="标签文件夹（默认与图像相同）")
+    parser.add_argument(
+        "--labels",
+        nargs="+",
+        choices=sorted(LABEL_KINDS),
+        default=["json"],
+        help="视为标签的类型（默认 json）",
+    )
+    parser.add_argument(
+        "--image-ext",
+        nargs="+",
+        default=list(IMAGE_EXTENSIONS),
+        help="图像扩展名（默认 .jpg .jpeg .png .bmp .tif .tiff）",
+    )
+    parser.add_argument("--recursive", action="store_true", help="递归扫描子文件夹")
+    parser.add_argument(
+        "--no-orphan-images", action="store_true", help="不清理没有标签的图像"
+    )
+    parser.add_argument("--orphan-labels", action="store_true", help="清理没有图像的标签")
+    parser.add_argument(
+        "--purge", nargs="+", choices=sorted(LABEL_KINDS), default=[], help="全部清理的标签类型"
+    )
+    parser.add_argument(
+        "--ignore",
+        nargs="*",
+        default=list(IGNORED_LABEL_NAMES),
+        help="不参与标签清理的文件名（默认 classes.txt predefined_classes.txt）",
+    )
+    parser.add_argument(
+        "--action", choices=CLEANUP_ACTIONS, default="dry-run", help="处理方式（默认 dry-run）"
+    )
+    parser.add_argument(
+        "--quarantine-dir",
+        default=None,
+        help=f"隔离文件夹（默认为图像文件夹下的 {QUARANTINE_DIR_NAME}）",
+    )
+    parser.add_argument("-w", "--workers", type=int, default=None, help="并行线程数")
+    args = parser.parse_args()
+
+    image_extensions = [
+        ext.lower() if ext.startswith(".") else "." + ext.lower() for ext in args.image_ext
+    ]
+    plan = find_orphans(
+        args.images,
+        label_dir=args.label_dir,
+        label_types=args.labels,
+        image_extensions=image_extensions,
+        recursive=args.recursive,
+        remove_images=not args.no_orphan_images,
+        remove_labels=args.orphan_labels,
+        purge=args.purge,
+        ignore=args.ignore,
+    )
+    print(plan.format())
+
+    quarantine_dir = args.quarantine_dir or os.path.join(args.images, QUARANTINE_DIR_NAME)
+    count, errors = apply_cleanup(plan, args.action, quarantine_dir, args.workers)
+    if args.action == "quarantine":
+        print(f"已移动 {count} 个文件到 {quarantine_dir}")
+    elif args.action == "delete":
+        print(f"已删除 {count} 个文件")
+    else:
+        print("dry-run：未修改任何文件（使用 --action quarantine / delete 执行）")
+    for path, message in errors:
+        print(f"删除失败 {path}: {message}")
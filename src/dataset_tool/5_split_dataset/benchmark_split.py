@@ -0,0 +1,67 @@
+"""划分性能基准测试
+
+功能说明：
+对比旧的列表成员判断划分（O(n²)）与 split_core.split_items（O(n)）的耗时，
+并输出每个样本的平均耗时：线性算法的 "每样本耗时" 应基本不随规模变化。
+
+使用示例：
+  python benchmark_split.py
+  python benchmark_split.py --sizes 10000 100000 1000000 --legacy-max 20000
+"""
+
+import argparse
+import random
+import time
+
+from split_core import split_counts, split_items
+
+
+def legacy_split(total_txt, train_percent, val_percent):
+    """旧实现：random.sample + 列表成员过滤"""
+    num_train, num_val, _ = split_counts(len(total_txt), train_percent, val_percent)
+    train_files = random.sample(total_txt, num_train)
+    remaining_files = [f for f in total_txt if f not in train_files]
+    val_files = random.sample(remaining_files, num_val)
+    test_files = [f for f in remaining_files if f not in val_files]
+    return train_files, val_files, test_files
+
+
+def measure(func, names, repeat=3):
+    """取多次运行中的最短耗时（秒）"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(names, 0.7, 0.15)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="数据集划分性能基准测试")
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[10_000, 100_000, 1_000_000],
+        help="测试的样本数量",
+    )
+    parser.add_argument(
+        "--legacy-max", type=int, default=20_000, help="旧实现只测试不超过该数量的规模"
+    )
+    args = parser.parse_args()
+
+    print(f"{'样本数':>10} {'split_items':>12} {'每样本(ns)':>12} {'旧实现':>12}")
+    per_item = []
+    for size in args.sizes:
+        names = [f"{i:08d}.txt" for i in range(size)]
+        elapsed = measure(split_items, names)
+        per_item.append(elapsed / size * 1e9)
+        legacy = (
+            f"{measure(legacy_split, names, repeat=1):.3f}s"
+            if size <= args.legacy_max
+            else "-"
+        )
+        print(f"{size:>10} {elapsed:>11.3f}s {per_item[-1]:>12.1f} {legacy:>12}")
+
+    # 线性扩展：最大规模与最小规模的每样本耗时之比应接近 1
+    print(f"\n每样本耗时比（最大规模 / 最小规模）: {per_item[-1] / per_item[0]:.2f}")
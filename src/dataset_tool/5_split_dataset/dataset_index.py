@@ -0,0 +1,208 @@
+"""数据集文件索引
+
+功能说明：
+organize_dataset.py、organize_dataset_UI.py、split_dataset.py、split_dataset_UI.py、
+yolo_dataset_all_in_one.py 和 4_remove_unlabeled_images/remove_unlabeled_images.py
+共用的文件夹扫描逻辑。一次 os.scandir 遍历，直接使用 DirEntry 自带的文件类型信息
+（不再对每个文件调用 os.path.isdir / os.path.exists），同时建立
+"文件名（无扩展名）→ {image, label, json}" 的索引。
+
+主要特性：
+- 可选递归扫描子文件夹（以相对路径去掉扩展名作为键，避免不同子文件夹同名冲突）
+- 同名不同扩展名的文件（如 a.jpg 和 a.png）都会保留：files() 每个键取一个，
+  all_files() 给出全部路径，供清理等不能漏掉文件的场景使用
+- 索引持久化到用户缓存目录（~/.cache/dataset_index/），不在数据文件夹中写文件；
+  下次扫描时逐个比较各文件夹的 mtime，全部未变化则直接复用
+- 文件夹 mtime 的校验较粗（FAT/exFAT 上新增文件时不一定变化），据索引移动、复制、
+  改写文件的调用方都传 use_cache=False，缓存只用于只读的查看 / 检查
+"""
+
+import hashlib
+import json
+import os
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff")
+LABEL_EXTENSION = ".txt"
+JSON_EXTENSION = ".json"
+
+INDEX_VERSION = 2
+INDEX_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "dataset_index")
+
+
+class DatasetIndex:
+    """文件夹扫描结果
+
+    Args:
+        root: 扫描的根目录
+        entries: {键: {"image"/"label"/"json": 相对 root 的路径,
+            "duplicates": {类别: [同一键下其余同类文件的相对路径]}（仅在有重复时存在）}}
+        dir_mtimes: {相对 root 的文件夹路径: mtime_ns}
+    """
+
+    def __init__(self, root, entries, dir_mtimes):
+        self.root = root
+        self.entries = entries
+        self.dir_mtimes = dir_mtimes
+
+    def __len__(self):
+        return len(self.entries)
+
+    def files(self, kind):
+        """取出某一类文件
+
+        Args:
+            kind: "image" / "label" / "json"
+
+        Returns:
+            {键: 绝对路径}，按键排序
+        """
+        return {
+            key: os.path.join(self.root, entry[kind])
+            for key, entry in sorted(self.entries.items())
+            if kind in entry
+        }
+
+    def all_files(self, kind):
+        """取出某一类的全部文件（同一键下可能有多个，如 a.jpg 和 a.png）
+
+        Returns:
+            {键: [绝对路径]}，按键排序
+        """
+        return {
+            key: [
+                os.path.join(self.root, rel)
+                for rel in sorted([entry[kind]] + entry.get("duplicates", {}).get(kind, []))
+            ]
+            for key, entry in sorted(self.entries.items())
+            if kind in entry
+        }
+
+    def pairs(self, first="image", second="label"):
+        """同时拥有两类文件的样本
+
+        Returns:
+            [(键, 第一类文件路径, 第二类文件路径)]，按键排序
+        """
+        return [
+            (key, os.path.join(self.root, entry[first]), os.path.join(self.root, entry[second]))
+            for key, entry in sorted(self.entries.items())
+            if first in entry and second in entry
+        ]
+
+    def missing(self, kind, required):
+        """有 kind 类文件、但缺少 required 类文件的样本 {键: kind 文件路径}"""
+        return {
+            key: os.path.join(self.root, entry[kind])
+            for key, entry in sorted(self.entries.items())
+            if kind in entry and required not in entry
+        }
+
+
+def _scan(root, recursive, image_extensions):
+    """单次遍历文件夹，返回 (entries, dir_mtimes)"""
+    entries = {}
+    dir_mtimes = {}
+    kinds = {ext: "image" for ext in image_extensions}
+    kinds[LABEL_EXTENSION] = "label"
+    kinds[JSON_EXTENSION] = "json"
+
+    pending = [""]
+    while pending:
+        rel_dir = pending.pop()
+        directory = os.path.join(root, rel_dir) if rel_dir else root
+        dir_mtimes[rel_dir] = os.stat(directory).st_mtime_ns
+        with os.scandir(directory) as it:
+            for entry in it:
+                name = entry.name
+                rel_path = f"{rel_dir}/{name}" if rel_dir else name
+                if entry.is_dir():
+                    if recursive and not name.startswith("."):
+                        pending.append(rel_path)
+                    continue
+                stem, ext = os.path.splitext(rel_path)
+                kind = kinds.get(ext.lower())
+                if kind is None:
+                    continue
+                item = entries.setdefault(stem, {})
+                if kind in item:
+                    # 同名不同扩展名：按路径排序，第一个作为该键的文件，其余记为重复
+                    first, rel_path = sorted((item[kind], rel_path))
+                    item[kind] = first
+                    item.setdefault("duplicates", {}).setdefault(kind, []).append(rel_path)
+                else:
+                    item[kind] = rel_path
+    return entries, dir_mtimes
+
+
+def _cache_path(root, recursive, image_extensions):
+    key = json.dumps([root, recursive, sorted(image_extensions)])
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=12).hexdigest()
+    return os.path.join(INDEX_CACHE_DIR, f"{digest}.json")
+
+
+def _load_cached(path, root):
+    """读取缓存的索引，任意文件夹 mtime 变化则视为失效"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if data.get("version") != INDEX_VERSION or data.get("root") != root:
+        return None
+    for rel_dir, mtime in data["dir_mtimes"].items():
+        directory = os.path.join(root, rel_dir) if rel_dir else root
+        try:
+            if os.stat(directory).st_mtime_ns != mtime:
+                return None
+        except OSError:
+            return None
+    return DatasetIndex(root, data["entries"], data["dir_mtimes"])
+
+
+def _save_cached(path, index):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "version": INDEX_VERSION,
+                "root": index.root,
+                "dir_mtimes": index.dir_mtimes,
+                "entries": index.entries,
+            },
+            f,
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+    os.replace(tmp_path, path)
+
+
+def build_index(root, recursive=False, image_extensions=IMAGE_EXTENSIONS, use_cache=True):
+    """扫描文件夹并建立索引
+
+    Args:
+        root: 要扫描的文件夹
+        recursive: 是否递归扫描子文件夹（跳过以 . 开头的隐藏文件夹）
+        image_extensions: 视为图像的扩展名（小写）
+        use_cache: 是否使用 / 更新持久化的索引缓存
+
+    Returns:
+        DatasetIndex
+    """
+    root = os.path.abspath(root)
+    image_extensions = tuple(ext.lower() for ext in image_extensions)
+    cache_path = _cache_path(root, recursive, image_extensions)
+
+    if use_cache:
+        cached = _load_cached(cache_path, root)
+        if cached is not None:
+            return cached
+
+    entries, dir_mtimes = _scan(root, recursive, image_extensions)
+    index = DatasetIndex(root, entries, dir_mtimes)
+    if use_cache:
+        try:
+            _save_cached(cache_path, index)
+        except OSError:
+            pass
+    return index
@@ -0,0 +1,106 @@
+"""文件列表输出（不复制文件）
+
+功能说明：
+split_dataset.py、split_dataset_UI.py 和 yolo_dataset_all_in_one.py 的"仅生成文件列表"模式。
+Ultralytics 的 dataset.yaml 中 train / val / test 除了目录，也可以是每行一个图像绝对路径的
+.txt 文件列表。这里只写出 train.txt / val.txt / test.txt 和 dataset.yaml，不复制任何图像，
+生成新的划分几乎是瞬间完成的，也不占用额外磁盘空间。
+
+标签定位：
+Ultralytics 由图像路径推导标签路径（把路径中最后一个 /images/ 换成 /labels/，扩展名换成 .txt）。
+- 标签正好在推导位置（如 images/ 与 labels/ 并列，或图像和标签在同一文件夹）→ 直接列出原图路径
+- 否则在输出目录的 links/ 下为该样本建立图像和标签的符号链接，列表中写链接路径；
+  系统不允许创建符号链接时（如未开启开发者模式的 Windows）回退为硬链接 / 复制
+"""
+
+import os
+import shutil
+
+from transfer import transfer_file
+
+# 存放符号链接的子目录
+LINK_DIR_NAME = "links"
+SPLIT_NAMES = ("train", "val", "test")
+
+
+def expected_label_path(image_path):
+    """按 Ultralytics 的规则由图像路径推导标签路径"""
+    images, labels = f"{os.sep}images{os.sep}", f"{os.sep}labels{os.sep}"
+    return os.path.splitext(labels.join(image_path.rsplit(images, 1)))[0] + ".txt"
+
+
+def _same_file(a, b):
+    return os.path.normcase(os.path.abspath(a)) == os.path.normcase(os.path.abspath(b))
+
+
+def _link(src, dst):
+    """创建符号链接，不支持时回退为硬链接 / 复制"""
+    try:
+        os.symlink(src, dst)
+    except (OSError, NotImplementedError):
+        transfer_file(src, dst, "hardlink")
+
+
+def write_file_lists(output_dir, splits):
+    """写出各子集的图像路径列表
+
+    Args:
+        output_dir: 输出目录（写入 train.txt / val.txt / test.txt）
+        splits: {子集名: [(图像路径, 标签路径)]}
+
+    Returns:
+        (各子集样本数字典, 建立链接的样本数)
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    link_root = os.path.join(output_dir, LINK_DIR_NAME)
+    # 旧的链接目录里只有本工具建立的链接，整体删除即可（不会影响链接指向的源文件）
+    if os.path.isdir(link_root):
+        shutil.rmtree(link_root)
+
+    counts = {}
+    linked = 0
+    for split in SPLIT_NAMES:
+        lines = []
+        for image, label in splits.get(split, []):
+            image = os.path.abspath(image)
+            if _same_file(expected_label_path(image), label):
+                lines.append(image)
+                continue
+
+            # 标签不在推导位置：建立 links/images/<split>/ 与 links/labels/<split>/ 的链接
+            filename = os.path.basename(image)
+            link_image = os.path.join(link_root, "images", split, filename)
+            link_label = expected_label_path(link_image)
+            os.makedirs(os.path.dirname(link_image), exist_ok=True)
+            os.makedirs(os.path.dirname(link_label), exist_ok=True)
+            _link(image, link_image)
+            _link(os.path.abspath(label), link_label)
+            lines.append(link_image)
+            linked += 1
+
+        list_path = os.path.join(output_dir, f"{split}.txt")
+        with open(list_path + ".tmp", "w", encoding="utf-8") as f:
+            f.writelines(line + "\n" for line in lines)
+        os.replace(list_path + ".tmp", list_path)
+        counts[split] = len(lines)
+    return counts, linked
+
+
+def dataset_yaml_data(save_dir, categories, list_only=False):
+    """构建 dataset.yaml 的内容
+
+    Args:
+        save_dir: 数据集根目录
+        categories: 类别名称列表
+        list_only: True 时 train / val / test 指向文件列表，否则指向 images/ 子目录
+    """
+    normalized_save_dir = os.path.normpath(save_dir)
+    if list_only:
+        entries = {split: f"{split}.txt" for split in SPLIT_NAMES}
+    else:
+        entries = {split: f"images/{split}" for split in SPLIT_NAMES}
+    return {
+        "path": normalized_save_dir,
+        **entries,
+        "names": {i: category for i, category in enumerate(categories)},
+    }
@@ -0,0 +1,286 @@
+"""分组划分：同一组的样本整体进入同一个子集
+
+功能说明：
+视频抽帧得到的数据集中，相邻帧几乎相同，逐张随机划分会让它们同时出现在训练集和验证集，
+使验证指标虚高。这里先把样本分组，再按组划分，每组只会出现在一个子集中。
+
+分组方式：
+- regex：按文件名正则分组，默认去掉末尾的帧号（video1_000123 → video1_）；
+  纯数字的文件名（如 data_renamer 输出的 1.jpg … N.jpg）没有前缀，各自成组
+- manifest：按清单文件分组（CSV 每行 "文件名,组名"，或 JSON {文件名: 组名}）
+- phash：按感知哈希（dHash）聚类，汉明距离不超过阈值的图像归为同一组
+
+感知哈希：
+- 多线程批量计算（OpenCV 解码时释放 GIL），按降采样方式读取以减少解码开销
+- 结果缓存为 .npz（路径、mtime、大小、哈希），未变化的图像不再解码
+- 近邻查找使用多段索引（鸽巢原理：距离 ≤ d 的两个 64 位哈希切成 d+1 段后
+  至少有一段完全相同），只在同段桶内比较，再用并查集合并成组
+"""
+
+import csv
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+GROUP_MODES = ("regex", "manifest", "phash")
+
+# 界面显示名称
+GROUP_MODE_NAMES = {
+    "regex": "文件名正则",
+    "manifest": "分组清单",
+    "phash": "感知哈希聚类",
+}
+
+# 默认正则：去掉文件名（无扩展名）末尾的帧号，前缀须以非数字结尾，
+# 否则纯数字文件名会按首位数字分组（1、10-19、100-199 … 同组）
+DEFAULT_GROUP_PATTERN = r"^(.*\D)[_\-]?\d+$"
+# 感知哈希聚类的默认汉明距离阈值
+DEFAULT_MAX_DISTANCE = 4
+# 感知哈希缓存的默认文件名（保存在图像文件夹中）
+HASH_CACHE_NAME = ".phash_cache.npz"
+
+# 桶内两两比较时每块的行数（控制内存占用）
+_CHUNK_ROWS = 1024
+
+
+def _stem(name):
+    return os.path.splitext(os.path.basename(name))[0]
+
+
+def _dense_ids(keys):
+    """任意分组键 → 从 0 开始的连续组号"""
+    _, ids = np.unique(np.asarray(keys, dtype=object).astype(str), return_inverse=True)
+    return ids.astype(np.int64)
+
+
+def groups_from_regex(names, pattern=DEFAULT_GROUP_PATTERN):
+    """按文件名正则分组
+
+    正则匹配文件名（无扩展名）：有捕获组时取第一个捕获组，否则取整个匹配；
+    不匹配的样本单独成组。
+    """
+    regex = re.compile(pattern)
+    keys = []
+    for name in names:
+        stem = _stem(name)
+        match = regex.search(stem)
+        if match is None:
+            keys.append("\0" + stem)
+        else:
+            keys.append(match.group(1) if regex.groups else match.group(0))
+    return _dense_ids(keys)
+
+
+def load_group_manifest(path):
+    """读取分组清单
+
+    Returns:
+        {文件名或文件名（无扩展名）: 组名}
+    """
+    if path.lower().endswith(".json"):
+        with open(path, "r", encoding="utf-8") as f:
+            return {str(k): str(v) for k, v in json.load(f).items()}
+
+    manifest = {}
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.reader(f):
+            if len(row) >= 2 and row[0].strip() and not row[0].startswith("#"):
+                manifest[row[0].strip()] = row[1].strip()
+    return manifest
+
+
+def groups_from_manifest(names, manifest):
+    """按清单分组，清单中没有的样本单独成组"""
+    keys = []
+    for name in names:
+        base = os.path.basename(name)
+        group = manifest.get(base, manifest.get(_stem(base)))
+        keys.append("\0" + base if group is None else group)
+    return _dense_ids(keys)
+
+
+def dhash(path, hash_size=8):
+    """计算图像的差值哈希（dHash），读取失败时返回 None"""
+    image = cv2.imread(path, cv2.IMREAD_REDUCED_GRAYSCALE_4)
+    if image is None:
+        return None
+    small = cv2.resize(image, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).ravel()
+    return int(np.packbits(bits).view(">u8")[0])
+
+
+def compute_hashes(image_paths, cache_path=None, max_workers=None):
+    """批量计算感知哈希（带缓存）
+
+    Returns:
+        (uint64 哈希数组, 是否有效的布尔数组)
+    """
+    image_paths = [os.path.abspath(p) for p in image_paths]
+
+    cache = {}
+    if cache_path and os.path.exists(cache_path):
+        try:
+            with np.load(cache_path) as data:
+                cache = {
+                    str(p): (int(m), int(s), int(h))
+                    for p, m, s, h in zip(
+                        data["paths"], data["mtimes"], data["sizes"], data["hashes"]
+                    )
+                }
+        except (OSError, KeyError, ValueError):
+            cache = {}
+
+    def load(path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return 0, 0, None, False
+        cached = cache.get(path)
+        if cached is not None and cached[:2] == (st.st_mtime_ns, st.st_size):
+            return st.st_mtime_ns, st.st_size, cached[2], True
+        return st.st_mtime_ns, st.st_size, dhash(path), False
+
+    max_workers = max_workers or os.cpu_count() or 4
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(load, image_paths))
+
+    valid = np.array([r[2] is not None for r in results], dtype=bool)
+    hashes = np.array([r[2] or 0 for r in results], dtype=np.uint64)
+
+    if cache_path and (len(cache) != len(results) or not all(r[3] for r in results)):
+        keep = np.flatnonzero(valid)
+        tmp_path = cache_path + ".tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                np.savez(
+                    f,
+                    paths=np.array(image_paths, dtype=str)[keep],
+                    mtimes=np.array([r[0] for r in results], dtype=np.int64)[keep],
+                    sizes=np.array([r[1] for r in results], dtype=np.int64)[keep],
+                    hashes=hashes[keep],
+                )
+            os.replace(tmp_path, cache_path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    return hashes, valid
+
+
+def _popcount(x):
+    """uint64 数组逐元素统计 1 的个数"""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(x)
+    return np.unpackbits(x.view(np.uint8).reshape(*x.shape, 8), axis=-1).sum(axis=-1)
+
+
+def _find(parent, i):
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def _bucket_components(bucket_hashes, max_distance):
+    """桶内按汉明距离求连通分量，返回每个成员所在分量的最小桶内下标"""
+    k = len(bucket_hashes)
+    label = np.arange(k)
+    while True:
+        new_label = label.copy()
+        for start in range(0, k, _CHUNK_ROWS):
+            rows = bucket_hashes[start : start + _CHUNK_ROWS, None]
+            near = _popcount(rows ^ bucket_hashes[None, :]) <= max_distance
+            new_label[start : start + len(rows)] = np.where(
+                near, label[None, :], k
+            ).min(axis=1)
+        if np.array_equal(new_label, label):
+            return label
+        # 标签传播：每轮取近邻中的最小标签，并把标签跳转到其标签的标签以加速收敛
+        label = new_label[new_label]
+
+
+def cluster_hashes(hashes, max_distance=DEFAULT_MAX_DISTANCE):
+    """把汉明距离不超过 max_distance 的哈希（传递地）聚为一组
+
+    固定机位的相邻帧哈希大多完全相同，先去重只对不同的哈希值聚类，
+    桶的大小不再随重复帧数量平方增长。
+
+    Returns:
+        每个哈希的组号（从 0 开始的连续整数）
+    """
+    if len(hashes) == 0:
+        return np.empty(0, dtype=np.int64)
+    unique, inverse = np.unique(hashes, return_inverse=True)
+    n = len(unique)
+    parent = list(range(n))
+    bands = max_distance + 1
+    bounds = np.linspace(0, 64, bands + 1).astype(int)
+
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        mask = np.uint64((1 << (hi - lo)) - 1)
+        keys = (unique >> np.uint64(lo)) & mask
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+        ends = np.r_[starts[1:], n]
+        for start, end in zip(starts, ends):
+            if end - start < 2:
+                continue
+            members = order[start:end]
+            # 前面的段已把整个桶合并为一组时不必再比较
+            first = _find(parent, members[0])
+            if all(_find(parent, m) == first for m in members[1:]):
+                continue
+            label = _bucket_components(unique[members], max_distance)
+            for member, root in zip(members, members[label]):
+                if member != root:
+                    a, b = _find(parent, member), _find(parent, root)
+                    if a != b:
+                        parent[max(a, b)] = min(a, b)
+
+    roots = np.fromiter((_find(parent, i) for i in range(n)), dtype=np.int64, count=n)
+    return np.unique(roots[inverse.ravel()], return_inverse=True)[1].astype(np.int64)
+
+
+def assign_groups(
+    image_paths,
+    mode,
+    pattern=DEFAULT_GROUP_PATTERN,
+    manifest=None,
+    max_distance=DEFAULT_MAX_DISTANCE,
+    cache_path=None,
+):
+    """按指定方式为每个样本分组
+
+    Args:
+        image_paths: 图像路径（或文件名）列表
+        mode: 分组方式，见 GROUP_MODES
+        pattern: regex 方式使用的正则
+        manifest: manifest 方式使用的清单路径或 {文件名: 组名} 字典
+        max_distance: phash 方式的汉明距离阈值
+        cache_path: phash 方式的哈希缓存路径
+
+    Returns:
+        每个样本的组号（从 0 开始的连续整数）
+    """
+    if mode == "regex":
+        return groups_from_regex(image_paths, pattern or DEFAULT_GROUP_PATTERN)
+    if mode == "manifest":
+        if manifest is None:
+            raise ValueError("manifest 分组方式需要提供分组清单")
+        if isinstance(manifest, str):
+            manifest = load_group_manifest(manifest)
+        return groups_from_manifest(image_paths, manifest)
+    if mode == "phash":
+        hashes, valid = compute_hashes(image_paths, cache_path)
+        groups = np.empty(len(hashes), dtype=np.int64)
+        index = np.flatnonzero(valid)
+        groups[index] = cluster_hashes(hashes[index], max_distance)
+        # 无法解码的图像各自单独成组
+        invalid = np.flatnonzero(~valid)
+        groups[invalid] = groups[index].max(initial=-1) + 1 + np.arange(len(invalid))
+        return groups
+    raise ValueError(f"不支持的分组方式: {mode}")
@@ -0,0 +1,251 @@
+"""增量划分同步
+
+功能说明：
+供 yolo_dataset_all_in_one.py 的增量模式使用。每次运行不再把整个数据集重新复制到
+images/{train,val,test}，而是对比输出目录中的划分清单（split_manifest.json），
+只复制新增或内容变化的文件、移动换了子集的文件、删除源中已不存在的样本。
+
+清单内容（每个样本）：
+- split：所属子集
+- image / label：输出文件名
+- image_stat / label_stat：源文件的 [大小, mtime_ns]
+- image_hash / label_hash：源文件内容的 BLAKE2b 摘要
+
+判断流程：
+- 大小和 mtime 都没变且输出文件存在 → 跳过（不读取文件内容）
+- 大小或 mtime 变了 → 计算内容摘要，摘要相同只更新清单，不同才重新复制
+- 子集归属由 split_core.hash_split_items 按名称哈希分桶决定，已有样本的归属保持稳定
+- 没有清单时（如输出目录来自一次全量划分），先扫描已有的子集目录还原记录，
+  同一样本只保留一份并按新的归属移动，避免同一张图像同时出现在 train 和 val 中
+"""
+
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from transfer import default_workers, transfer_files
+
+MANIFEST_NAME = "split_manifest.json"
+MANIFEST_VERSION = 1
+
+_KINDS = (("image", "images"), ("label", "labels"))
+_SPLITS = ("train", "val", "test")
+
+
+def file_digest(path, chunk_size=1024 * 1024):
+    """计算文件内容的 BLAKE2b 摘要（十六进制字符串）"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_manifest(output_dir):
+    """读取输出目录中的划分清单，不存在或版本不符时返回空字典"""
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if data.get("version") != MANIFEST_VERSION:
+        return {}
+    return data.get("items", {})
+
+
+def save_manifest(output_dir, items, ratios):
+    """原子写入划分清单"""
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(
+            {"version": MANIFEST_VERSION, "ratios": list(ratios), "items": items},
+            f,
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+    os.replace(tmp_path, path)
+
+
+def scan_output(output_dir):
+    """扫描已有的 images/labels 子集目录，按文件名（无扩展名）还原清单记录
+
+    用于没有划分清单的输出目录。记录中没有源文件的大小 / mtime 和摘要，对比时
+    改用输出文件的内容摘要。
+
+    Returns:
+        (记录字典, 多余文件列表)：同一样本在多个子集中出现时只保留第一份
+        （train、val、test 的顺序），其余的输出文件列为多余文件
+    """
+    items, extra = {}, []
+    for kind, folder in _KINDS:
+        for split in _SPLITS:
+            split_dir = os.path.join(output_dir, folder, split)
+            if not os.path.isdir(split_dir):
+                continue
+            for entry in os.scandir(split_dir):
+                if not entry.is_file():
+                    continue
+                name = os.path.splitext(entry.name)[0]
+                record = items.setdefault(name, {"split": split})
+                if record["split"] != split or kind in record:
+                    extra.append(entry.path)
+                else:
+                    record[kind] = entry.name
+    return items, extra
+
+
+class SyncReport:
+    """增量同步结果统计"""
+
+    def __init__(self):
+        self.added = 0
+        self.updated = 0
+        self.moved = 0
+        self.removed = 0
+        self.unchanged = 0
+        self.copied_files = 0
+        self.elapsed = 0.0
+        self.scanned = False  # 没有清单，记录由扫描输出目录得到
+
+    def format(self):
+        prefix = "未找到划分清单，已按输出目录现有文件对账；" if self.scanned else ""
+        return prefix + (
+            f"新增 {self.added} / 更新 {self.updated} / 换子集 {self.moved} / "
+            f"删除 {self.removed} / 未变化 {self.unchanged}，"
+            f"实际传输 {self.copied_files} 个文件，耗时 {self.elapsed:.2f}s"
+        )
+
+
+def _inspect(output_dir, old_items, pair, split):
+    """对比一个样本与清单记录，返回 (新清单记录, 复制任务, 移动任务, 删除列表, 状态)"""
+    entry = old_items.get(pair["name"])
+    record = {"split": split}
+    copies, moves, removals = [], [], []
+    state = "unchanged" if entry is not None else "added"
+    if entry is not None and entry.get("split") != split:
+        state = "moved"
+
+    for kind, folder in _KINDS:
+        src = pair[kind]
+        filename = os.path.basename(src)
+        dest = os.path.join(output_dir, folder, split, filename)
+        st = os.stat(src)
+        stat = [st.st_size, st.st_mtime_ns]
+        record[kind] = filename
+        record[f"{kind}_stat"] = stat
+
+        old_name = entry.get(kind) if entry is not None else None
+        dest_present = False
+        if old_name:
+            old_dest = os.path.join(output_dir, folder, entry["split"], old_name)
+            if old_dest == dest:
+                dest_present = os.path.exists(dest)
+            elif old_name == filename and os.path.exists(old_dest):
+                # 换了子集：在输出目录内移动，不重新复制
+                moves.append((old_dest, dest))
+                dest_present = True
+            else:
+                removals.append(old_dest)
+
+        if old_name != filename:
+            record[f"{kind}_hash"] = file_digest(src)
+            copies.append((src, dest))
+            continue
+
+        # 大小和 mtime 都没变时直接沿用摘要，否则比较内容摘要
+        old_hash = entry.get(f"{kind}_hash")
+        if old_hash is None and dest_present:
+            # 记录来自扫描输出目录：与已有输出文件的内容比较
+            old_hash = file_digest(old_dest)
+        new_hash = old_hash if stat == entry.get(f"{kind}_stat") else file_digest(src)
+        record[f"{kind}_hash"] = new_hash
+        if new_hash != old_hash or not dest_present:
+            copies.append((src, dest))
+            if state == "unchanged":
+                state = "updated"
+
+    return record, copies, moves, removals, state
+
+
+def sync_split(
+    assignments,
+    output_dir,
+    ratios,
+    transfer_mode="copy",
+    max_workers=None,
+    progress_callback=None,
+):
+    """按划分结果增量同步输出目录
+
+    Args:
+        assignments: [(样本字典, 子集名)]，样本字典含 name / image / label
+        output_dir: 输出数据集目录（含 images/、labels/ 和划分清单）
+        ratios: 本次使用的划分比例，记录到清单中
+        transfer_mode: 复制新文件时的传输方式，见 transfer.TRANSFER_MODES
+        max_workers: 检查 / 传输的线程数
+        progress_callback: 传输进度回调，参数为 TransferStats
+
+    Returns:
+        SyncReport
+    """
+    start = time.perf_counter()
+    report = SyncReport()
+    old_items = load_manifest(output_dir)
+    removals = []
+    if not old_items:
+        # 没有清单时不能假定输出目录为空：已有文件按现在的划分重新归位
+        old_items, removals = scan_output(output_dir)
+        report.scanned = bool(old_items or removals)
+    max_workers = max_workers or default_workers()
+
+    for _, folder in _KINDS:
+        for split in _SPLITS:
+            os.makedirs(os.path.join(output_dir, folder, split), exist_ok=True)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(
+            executor.map(lambda item: _inspect(output_dir, old_items, *item), assignments)
+        )
+
+    items = {}
+    copies, moves = [], []
+    for (pair, _), (record, pair_copies, pair_moves, pair_removals, state) in zip(
+        assignments, results
+    ):
+        items[pair["name"]] = record
+        copies += pair_copies
+        moves += pair_moves
+        removals += pair_removals
+        setattr(report, state, getattr(report, state) + 1)
+
+    # 源中已不存在的样本：删除输出文件
+    for name in old_items.keys() - items.keys():
+        entry = old_items[name]
+        for kind, folder in _KINDS:
+            if entry.get(kind):
+                removals.append(os.path.join(output_dir, folder, entry["split"], entry[kind]))
+        report.removed += 1
+
+    for path in removals:
+        if os.path.lexists(path):
+            os.remove(path)
+    for src, dest in moves:
+        os.replace(src, dest)
+    if copies:
+        stats = transfer_files(
+            copies,
+            mode=transfer_mode,
+            max_workers=max_workers,
+            progress_callback=progress_callback,
+        )
+        report.copied_files = stats.done
+
+    save_manifest(output_dir, items, ratios)
+    report.elapsed = time.perf_counter() - start
+    return report
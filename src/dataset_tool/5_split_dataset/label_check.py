@@ -0,0 +1,405 @@
+"""YOLO 标签检查与修复
+
+功能说明：
+organize / split 工具只按文件名匹配图像和标签，不看标签内容；格式错误的行、超出
+classes.txt 范围的类别ID、超出 [0, 1] 的坐标、零面积框往往要到训练时才暴露。
+这里在划分前对所有标签做一次检查，并可选地直接修复。
+
+主要特性：
+- 多线程读取标签文件，解析结果拼接为 NumPy 数组（每行的类别ID、坐标个数，全部坐标
+  的一维数组，以及每个文件的行偏移量），所有检查都在数组上批量完成
+- 同时支持检测框（cls cx cy w h）和分割多边形（cls x1 y1 x2 y2 ...）
+- 检查项：格式错误、类别ID越界、坐标超出 [0, 1]、零面积框、重复行
+- 可选修复：clip（裁剪越界坐标）、dedupe（删除重复行）、drop（删除无法修复的行），
+  只重写有改动的文件，未改动的行保持原样
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+ISSUE_NAMES = {
+    "malformed": "格式错误",
+    "class_id": "类别ID越界",
+    "out_of_range": "坐标超出 [0, 1]",
+    "zero_area": "零面积框",
+    "duplicate": "重复行",
+}
+
+FIX_MODES = ("clip", "dedupe", "drop")
+
+# 界面 / 日志显示名称
+FIX_MODE_NAMES = {
+    "clip": "裁剪越界坐标",
+    "dedupe": "删除重复行",
+    "drop": "删除无效行",
+}
+
+# 坐标越界的容差（浮点误差范围内视为合法）
+_EPS = 1e-6
+# 报告中最多列出的问题行数
+_MAX_EXAMPLES = 20
+
+
+def _parse_file(path):
+    """读取一个标签文件
+
+    Returns:
+        (非空行文本列表, 行号列表, 各行数值列表（格式错误为 None）, 各行是否与前面的行重复)
+    """
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        text = f.read()
+    lines, line_numbers, values, duplicates = [], [], [], []
+    seen = set()
+    for number, line in enumerate(text.splitlines(), 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = tuple(float(token) for token in line.split())
+        except ValueError:
+            row = None
+        # 检测框为 1 + 4 个数，多边形为 1 + 偶数个坐标（至少 3 个点）
+        if row is not None and len(row) != 5 and (len(row) < 7 or len(row) % 2 == 0):
+            row = None
+        lines.append(line)
+        line_numbers.append(number)
+        values.append(row)
+        duplicates.append(row is not None and row in seen)
+        if row is not None:
+            seen.add(row)
+    return lines, line_numbers, values, duplicates
+
+
+def _geometry_issues(coords, counts, starts, valid):
+    """批量计算每行的坐标越界和零面积标记
+
+    Args:
+        coords: 全部坐标的一维数组
+        counts: 每行的坐标个数（格式错误的行为 0）
+        starts: 每行在 coords 中的起始下标
+        valid: 每行是否格式正确
+
+    Returns:
+        (越界标记, 零面积标记)
+    """
+    n = len(counts)
+    out_of_range = np.zeros(n, dtype=bool)
+    zero_area = np.zeros(n, dtype=bool)
+    rows = np.flatnonzero(valid)
+    if len(rows) == 0:
+        return out_of_range, zero_area
+
+    # 每行坐标的最小 / 最大值（有效行的坐标段首尾相接，可直接 reduceat）
+    lo = np.minimum.reduceat(coords, starts[rows])
+    hi = np.maximum.reduceat(coords, starts[rows])
+    out_of_range[rows] = (lo < -_EPS) | (hi > 1 + _EPS)
+
+    # 多边形：鞋带公式求面积（坐标个数均为偶数，按点展开后同样首尾相接）
+    xs, ys = coords[0::2], coords[1::2]
+    point_starts = starts[rows] // 2
+    point_counts = counts[rows] // 2
+    nxt = np.arange(1, len(xs) + 1)
+    nxt[point_starts + point_counts - 1] = point_starts
+    cross = xs * ys[nxt] - xs[nxt] * ys
+    zero_area[rows] = np.abs(np.add.reduceat(cross, point_starts)) <= _EPS
+
+    # 检测框：中心点在 [0, 1]，且框的边界不超出图像
+    boxes = rows[counts[rows] == 4]
+    if len(boxes):
+        cx, cy, w, h = (coords[starts[boxes] + k] for k in range(4))
+        edges = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2])
+        out_of_range[boxes] |= (edges < -_EPS).any(axis=0) | (edges > 1 + _EPS).any(axis=0)
+        zero_area[boxes] = (w <= 0) | (h <= 0)
+    return out_of_range, zero_area
+
+
+def _clip(coords, counts, starts, rows):
+    """裁剪指定行的坐标：多边形直接裁剪，检测框先转为两角坐标再裁剪"""
+    fixed = coords.copy()
+    polygon_rows = rows[counts[rows] != 4]
+    if len(polygon_rows):
+        index = np.concatenate(
+            [np.arange(s, s + c) for s, c in zip(starts[polygon_rows], counts[polygon_rows])]
+        )
+        fixed[index] = np.clip(fixed[index], 0.0, 1.0)
+    boxes = rows[counts[rows] == 4]
+    if len(boxes):
+        cx, cy, w, h = (coords[starts[boxes] + k] for k in range(4))
+        x1, x2 = np.clip(cx - w / 2, 0, 1), np.clip(cx + w / 2, 0, 1)
+        y1, y2 = np.clip(cy - h / 2, 0, 1), np.clip(cy + h / 2, 0, 1)
+        for k, value in enumerate(((x1 + x2) / 2, (y1 + y2) / 2, x2 - x1, y2 - y1)):
+            fixed[starts[boxes] + k] = value
+    return fixed
+
+
+class ParsedLabels:
+    """一批标签文件的解析结果（所有非空行按文件顺序拼接）
+
+    Attributes:
+        paths: 标签文件路径列表
+        file_offsets: 第 i 个文件的行为 file_offsets[i]:file_offsets[i+1]
+        classes: 每行的类别ID（float64，格式错误的行为 NaN）
+        counts: 每行的坐标个数（格式错误的行为 0）
+        starts: 每行在 coords 中的起始下标
+        coords: 全部坐标的一维数组（float64）
+        texts / numbers: 每行的原始文本和行号
+        duplicate: 每行是否与同一文件中前面的行重复
+        empty_files: 空文件数
+        unreadable: 无法读取的文件路径列表
+    """
+
+    def __init__(self, paths, parsed):
+        self.paths = paths
+        self.unreadable = []
+        self.empty_files = 0
+        line_counts = np.zeros(len(parsed), dtype=np.int64)
+        texts, numbers, classes, counts, flat, duplicate = [], [], [], [], [], []
+        for i, (path, result) in enumerate(zip(paths, parsed)):
+            if result is None:
+                self.unreadable.append(path)
+                continue
+            lines, line_numbers, values, duplicates = result
+            line_counts[i] = len(lines)
+            self.empty_files += not lines
+            texts += lines
+            numbers += line_numbers
+            duplicate += duplicates
+            for row in values:
+                if row is None:
+                    classes.append(np.nan)
+                    counts.append(0)
+                else:
+                    classes.append(row[0])
+                    counts.append(len(row) - 1)
+                    flat += row[1:]
+
+        self.file_offsets = np.zeros(len(parsed) + 1, dtype=np.int64)
+        np.cumsum(line_counts, out=self.file_offsets[1:])
+        self.line_file = np.repeat(np.arange(len(parsed)), line_counts)
+        self.texts = texts
+        self.numbers = numbers
+        self.classes = np.array(classes, dtype=np.float64)
+        self.counts = np.array(counts, dtype=np.int64)
+        self.coords = np.array(flat, dtype=np.float64)
+        self.duplicate = np.array(duplicate, dtype=bool)
+        self.starts = np.zeros(len(self.counts), dtype=np.int64)
+        np.cumsum(self.counts[:-1], out=self.starts[1:])
+
+    @property
+    def valid(self):
+        """每行是否格式正确"""
+        return self.counts > 0
+
+
+def parse_labels(label_paths, max_workers=None):
+    """多线程读取并解析一批 YOLO 标签文件
+
+    Args:
+        label_paths: 标签文件路径列表
+        max_workers: 读取线程数
+
+    Returns:
+        ParsedLabels
+    """
+    label_paths = list(label_paths)
+
+    def load(path):
+        try:
+            return _parse_file(path)
+        except OSError:
+            return None
+
+    max_workers = max_workers or min(32, (os.cpu_count() or 4) * 4)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        parsed = list(executor.map(load, label_paths))
+    return ParsedLabels(label_paths, parsed)
+
+
+class LabelReport:
+    """标签检查结果统计"""
+
+    def __init__(self):
+        self.files = 0
+        self.lines = 0
+        self.empty_files = 0
+        self.unreadable_files = []
+        self.issues = {issue: 0 for issue in ISSUE_NAMES}
+        self.problem_lines = 0
+        self.files_with_issues = 0
+        self.fixed_files = 0
+        self.clipped_lines = 0
+        self.removed_lines = 0
+        self.examples = []  # [(文件路径, 行号, 问题)]
+
+    @property
+    def has_issues(self):
+        return self.files_with_issues > 0 or bool(self.unreadable_files)
+
+    def format(self):
+        lines = [
+            f"标签文件 {self.files} 个（空文件 {self.empty_files} 个），目标 {self.lines} 行",
+        ]
+        for issue, name in ISSUE_NAMES.items():
+            if self.issues[issue]:
+                lines.append(f"  ⚠ {name}: {self.issues[issue]} 行")
+        if self.unreadable_files:
+            lines.append(f"  ⚠ 无法读取: {len(self.unreadable_files)} 个文件")
+        if not self.has_issues:
+            lines.append("  ✓ 未发现问题")
+        else:
+            lines.append(f"  共 {self.files_with_issues} 个文件有问题")
+            for path, number, issue in self.examples:
+                lines.append(f"    {os.path.basename(path)}:{number} {ISSUE_NAMES[issue]}")
+            hidden = self.problem_lines - len(self.examples)
+            if hidden > 0:
+                lines.append(f"    ……另有 {hidden} 行未列出")
+        if self.fixed_files:
+            lines.append(
+                f"  ✓ 已修复 {self.fixed_files} 个文件：裁剪 {self.clipped_lines} 行，"
+                f"删除 {self.removed_lines} 行"
+            )
+        return "\n".join(lines)
+
+
+def load_class_count(class_file):
+    """读取 classes.txt 中的类别数（非空行数）"""
+    with open(class_file, "r", encoding="utf-8") as f:
+        return sum(1 for line in f if line.strip())
+
+
+def check_labels(label_paths, num_classes=None, fix=(), max_workers=None):
+    """检查（并可选修复）一批 YOLO 标签文件
+
+    Args:
+        label_paths: 标签文件路径列表
+        num_classes: 类别数，None 表示不检查类别ID上限
+        fix: 要执行的修复，FIX_MODES 的子集；为空时只检查不修改文件
+        max_workers: 读写线程数
+
+    Returns:
+        LabelReport
+    """
+    fix = set(fix)
+    unknown = fix - set(FIX_MODES)
+    if unknown:
+        raise ValueError(f"不支持的修复方式: {', '.join(sorted(unknown))}")
+
+    max_workers = max_workers or min(32, (os.cpu_count() or 4) * 4)
+    labels = parse_labels(label_paths, max_workers)
+    label_paths = labels.paths
+    classes, counts, starts, coords = labels.classes, labels.counts, labels.starts, labels.coords
+    duplicate, line_file, file_offsets = labels.duplicate, labels.line_file, labels.file_offsets
+    texts, numbers = labels.texts, labels.numbers
+
+    report = LabelReport()
+    report.files = len(label_paths)
+    report.lines = len(counts)
+    report.empty_files = labels.empty_files
+    report.unreadable_files = labels.unreadable
+
+    # 批量检查
+    valid = labels.valid
+    class_id = valid & ((classes != np.floor(classes)) | (classes < 0))
+    if num_classes is not None:
+        class_id |= valid & (classes >= num_classes)
+    out_of_range, zero_area = _geometry_issues(coords, counts, starts, valid)
+    flags = {
+        "malformed": ~valid,
+        "class_id": class_id,
+        "out_of_range": out_of_range,
+        "zero_area": zero_area,
+        "duplicate": duplicate,
+    }
+    for issue, mask in flags.items():
+        report.issues[issue] = int(mask.sum())
+    problem = np.zeros(len(counts), dtype=bool)
+    for mask in flags.values():
+        problem |= mask
+    report.problem_lines = int(problem.sum())
+    report.files_with_issues = len(np.unique(line_file[problem]))
+
+    for row in np.flatnonzero(problem)[:_MAX_EXAMPLES]:
+        issue = next(name for name, mask in flags.items() if mask[row])
+        report.examples.append((label_paths[line_file[row]], numbers[row], issue))
+
+    if not fix or not problem.any():
+        return report
+
+    # 修复：先裁剪，再按裁剪后的坐标重新判断零面积
+    clipped = valid & out_of_range if "clip" in fix else np.zeros_like(valid)
+    fixed = _clip(coords, counts, starts, np.flatnonzero(clipped))
+    _, zero_after = _geometry_issues(fixed, counts, starts, valid)
+    remove = np.zeros(len(counts), dtype=bool)
+    if "dedupe" in fix:
+        remove |= duplicate
+    if "drop" in fix:
+        remove |= ~valid | class_id | zero_after
+        if "clip" not in fix:
+            remove |= out_of_range
+    clipped &= ~remove
+
+    def rewrite(i):
+        lo, hi = file_offsets[i], file_offsets[i + 1]
+        out = []
+        for row in range(lo, hi):
+            if remove[row]:
+                continue
+            if clipped[row]:
+                values = fixed[starts[row] : starts[row] + counts[row]]
+                out.append(
+                    " ".join([str(int(classes[row]))] + [f"{v:.6g}" for v in values])
+                )
+            else:
+                out.append(texts[row])
+        path = label_paths[i]
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.writelines(line + "\n" for line in out)
+        os.replace(tmp_path, path)
+
+    changed = np.unique(line_file[remove | clipped])
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        list(executor.map(rewrite, changed))
+    report.fixed_files = len(changed)
+    report.clipped_lines = int(clipped.sum())
+    report.removed_lines = int(remove.sum())
+    return report
+
+
+# ==================== 主程序入口 ====================
+if __name__ == "__main__":
+    import argparse
+
+    from dataset_index import build_index
+
+    parser = argparse.ArgumentParser(
+        description="YOLO 标签检查与修复",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+使用示例:
+  # 只检查
+  python label_check.py -l E:/dataset/labels -c E:/dataset/classes.txt
+
+  # 裁剪越界坐标、删除重复行和无法修复的行（直接修改标签文件）
+  python label_check.py -l E:/dataset/labels -c E:/dataset/classes.txt --fix clip dedupe drop
+        """,
+    )
+    parser.add_argument("-l", "--labels", required=True, help="标签文件夹")
+    parser.add_argument("-c", "--classes", default=None, help="classes.txt（用于检查类别ID上限）")
+    parser.add_argument(
+        "--fix", nargs="*", choices=FIX_MODES, default=[], help="要执行的修复（默认只检查）"
+    )
+    parser.add_argument("--recursive", action="store_true", help="递归扫描子文件夹")
+    args = parser.parse_args()
+
+    # 修复会改写文件，此时不使用索引缓存
+    index = build_index(args.labels, recursive=args.recursive, use_cache=not args.fix)
+    label_files = [
+        path
+        for path in index.files("label").values()
+        if os.path.basename(path) != "classes.txt"
+    ]
+    num_classes = load_class_count(args.classes) if args.classes else None
+    print(check_labels(label_files, num_classes, fix=args.fix).format())
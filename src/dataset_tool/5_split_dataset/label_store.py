@@ -0,0 +1,254 @@
+"""打包的标签缓存（label_store/）
+
+功能说明：
+每次开始训练都要重新读取几十万个很小的 .txt 标签文件，在 NFS 等网络存储上非常慢。
+split_dataset.py、split_dataset_UI.py 和 yolo_dataset_all_in_one.py 可以在 dataset.yaml
+旁边额外写出一个 label_store/ 目录，把所有标签打包成几个连续的 NumPy 数组，训练、验证
+和分析脚本用 LabelStore 以内存映射方式打开，按下标或图像路径 O(1) 取出标签，无需解析文本。
+
+目录内容：
+- coords.npy：float32，所有检测框（cx cy w h）和多边形（x1 y1 x2 y2 ...）的坐标首尾相接
+- coord_offsets.npy：int64，第 j 个目标的坐标为 coords[coord_offsets[j]:coord_offsets[j+1]]
+- classes.npy：int32，第 j 个目标的类别ID
+- offsets.npy：int64，第 i 张图像的目标为 offsets[i]:offsets[i+1]
+- sizes.npy：int32，第 i 张图像的 (宽, 高)
+- index.json：图像 / 标签路径（数据集根目录下的用相对路径）以及各子集的下标范围
+
+主要特性：
+- 标签解析复用 label_check.parse_labels（多线程），格式错误的行不写入
+- 图像尺寸只读取文件头（PNG / JPEG / BMP），其他格式才解码图像
+- 各子集的图像连续存放，LabelStore.split_range 直接给出下标范围
+"""
+
+import json
+import os
+import struct
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from label_check import parse_labels
+
+LABEL_STORE_NAME = "label_store"
+LABEL_STORE_VERSION = 1
+SPLIT_NAMES = ("train", "val", "test")
+
+_ARRAYS = ("coords", "coord_offsets", "classes", "offsets", "sizes")
+
+
+def _header_size(path):
+    """只读取文件头获取图像尺寸 (宽, 高)，不支持的格式返回 None"""
+    with open(path, "rb") as f:
+        head = f.read(26)
+        if head[:8] == b"\x89PNG\r\n\x1a\n":
+            return struct.unpack(">II", head[16:24])
+        if head[:2] == b"BM":
+            width, height = struct.unpack("<ii", head[18:26])
+            return width, abs(height)
+        if head[:2] != b"\xff\xd8":
+            return None
+        # JPEG：逐个跳过标记段，直到 SOF 段
+        f.seek(2)
+        while True:
+            marker = f.read(2)
+            if len(marker) < 2 or marker[0] != 0xFF:
+                return None
+            while marker[1] == 0xFF:
+                marker = marker[:1] + f.read(1)
+            code = marker[1]
+            if code in (0xD8, 0x01) or 0xD0 <= code <= 0xD7:
+                continue
+            length = struct.unpack(">H", f.read(2))[0]
+            if 0xC0 <= code <= 0xCF and code not in (0xC4, 0xC8, 0xCC):
+                height, width = struct.unpack(">xHH", f.read(5))
+                return width, height
+            f.seek(length - 2, os.SEEK_CUR)
+
+
+def image_size(path):
+    """获取图像尺寸 (宽, 高)，读取失败时返回 (0, 0)"""
+    try:
+        size = _header_size(path)
+    except (OSError, struct.error):
+        size = None
+    if size is None:
+        image = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+        if image is None:
+            return 0, 0
+        size = (image.shape[1], image.shape[0])
+    return size
+
+
+def _relative(path, root):
+    """数据集根目录下的文件记录相对路径（统一为 /），其余记录绝对路径"""
+    path = os.path.abspath(path)
+    rel = os.path.relpath(path, root)
+    if rel.startswith(".."):
+        return path
+    return rel.replace(os.sep, "/")
+
+
+def write_label_store(save_dir, splits, max_workers=None):
+    """在数据集目录中写出打包的标签缓存
+
+    Args:
+        save_dir: 数据集根目录（dataset.yaml 所在目录）
+        splits: {子集名: [(图像路径, 标签路径)]}
+        max_workers: 读取线程数
+
+    Returns:
+        (图像数, 目标数)
+    """
+    root = os.path.abspath(save_dir)
+    images, labels, ranges = [], [], {}
+    for split in SPLIT_NAMES:
+        pairs = splits.get(split, [])
+        ranges[split] = [len(images), len(images) + len(pairs)]
+        for image, label in pairs:
+            images.append(image)
+            labels.append(label)
+
+    max_workers = max_workers or min(32, (os.cpu_count() or 4) * 4)
+    parsed = parse_labels(labels, max_workers)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        sizes = np.array(
+            list(executor.map(image_size, images)), dtype=np.int32
+        ).reshape(-1, 2)
+
+    # 只保留格式正确的行
+    keep = parsed.valid
+    counts = parsed.counts[keep]
+    coord_offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+    np.cumsum(counts, out=coord_offsets[1:])
+    offsets = np.zeros(len(images) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(parsed.line_file[keep], minlength=len(images)), out=offsets[1:])
+    arrays = {
+        "coords": parsed.coords.astype(np.float32),
+        "coord_offsets": coord_offsets,
+        "classes": parsed.classes[keep].astype(np.int32),
+        "offsets": offsets,
+        "sizes": sizes,
+    }
+
+    # 先写入临时目录再整体替换，读取方不会看到写了一半的缓存
+    store_dir = os.path.join(root, LABEL_STORE_NAME)
+    tmp_dir = store_dir + ".tmp"
+    os.makedirs(tmp_dir, exist_ok=True)
+    for name in _ARRAYS:
+        np.save(os.path.join(tmp_dir, f"{name}.npy"), arrays[name])
+    with open(os.path.join(tmp_dir, "index.json"), "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "version": LABEL_STORE_VERSION,
+                "images": [_relative(p, root) for p in images],
+                "labels": [_relative(p, root) for p in labels],
+                "splits": ranges,
+            },
+            f,
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+    if os.path.isdir(store_dir):
+        old_dir = store_dir + ".old"
+        os.replace(store_dir, old_dir)
+        os.replace(tmp_dir, store_dir)
+        for name in os.listdir(old_dir):
+            os.remove(os.path.join(old_dir, name))
+        os.rmdir(old_dir)
+    else:
+        os.replace(tmp_dir, store_dir)
+    return len(images), len(counts)
+
+
+class LabelStore:
+    """以内存映射方式读取 label_store/
+
+    用法:
+        store = LabelStore("E:/yolo_dataset")
+        start, end = store.split_range("train")
+        classes, boxes = store.boxes(start)
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path: 数据集根目录或 label_store/ 目录
+        """
+        if os.path.basename(os.path.normpath(path)) != LABEL_STORE_NAME:
+            path = os.path.join(path, LABEL_STORE_NAME)
+        self.path = path
+        self.root = os.path.dirname(os.path.abspath(path))
+        with open(os.path.join(path, "index.json"), "r", encoding="utf-8") as f:
+            index = json.load(f)
+        if index.get("version") != LABEL_STORE_VERSION:
+            raise ValueError(f"不支持的标签缓存版本: {index.get('version')}")
+        self.images = index["images"]
+        self.labels = index["labels"]
+        self.splits = index["splits"]
+        for name in _ARRAYS:
+            setattr(self, name, np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r"))
+        self._lookup = None
+
+    def __len__(self):
+        return len(self.images)
+
+    def split_range(self, split):
+        """子集的图像下标范围 (start, end)"""
+        start, end = self.splits[split]
+        return start, end
+
+    def image_path(self, i):
+        """第 i 张图像的绝对路径"""
+        return os.path.normpath(os.path.join(self.root, self.images[i]))
+
+    def image_size(self, i):
+        """第 i 张图像的 (宽, 高)"""
+        width, height = self.sizes[i]
+        return int(width), int(height)
+
+    def index_of(self, image_path):
+        """由图像路径查找下标，找不到时抛出 KeyError"""
+        if self._lookup is None:
+            self._lookup = {
+                os.path.normcase(self.image_path(i)): i for i in range(len(self.images))
+            }
+        return self._lookup[os.path.normcase(os.path.abspath(image_path))]
+
+    def instances(self, i):
+        """第 i 张图像的全部目标
+
+        Returns:
+            (类别ID数组, [每个目标的坐标数组])，坐标为内存映射数组的切片（不复制）
+        """
+        lo, hi = self.offsets[i], self.offsets[i + 1]
+        bounds = self.coord_offsets[lo : hi + 1]
+        return self.classes[lo:hi], [
+            self.coords[a:b] for a, b in zip(bounds[:-1], bounds[1:])
+        ]
+
+    def boxes(self, i):
+        """第 i 张图像的检测框
+
+        Returns:
+            (类别ID数组, N × 4 的 cx cy w h 数组)；多边形目标换算为外接框
+        """
+        lo, hi = self.offsets[i], self.offsets[i + 1]
+        a, b = self.coord_offsets[lo], self.coord_offsets[hi]
+        if b - a == 4 * (hi - lo):
+            # 全部是检测框：直接取连续切片
+            return self.classes[lo:hi], self.coords[a:b].reshape(-1, 4)
+        classes, polygons = self.instances(i)
+        boxes = np.empty((len(polygons), 4), dtype=np.float32)
+        for k, coords in enumerate(polygons):
+            if len(coords) == 4:
+                boxes[k] = coords
+                continue
+            xs, ys = coords[0::2], coords[1::2]
+            boxes[k] = (
+                (xs.min() + xs.max()) / 2,
+                (ys.min() + ys.max()) / 2,
+                xs.max() - xs.min(),
+                ys.max() - ys.min(),
+            )
+        return classes, boxes
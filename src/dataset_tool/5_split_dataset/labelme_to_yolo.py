@@ -0,0 +1,319 @@
+"""LabelMe JSON → YOLO 标签批量转换
+
+功能说明：
+标注使用 LabelMe（每张图像一个 .json，格式见 src/generate_mask/4.json），而 organize / split
+工具只识别 YOLO .txt 标签。这里把一个文件夹中的 LabelMe JSON 批量转换为 YOLO 检测框
+（cls cx cy w h）或 YOLO 分割（cls x1 y1 x2 y2 ...）标签。
+
+主要特性：
+- 类别ID按 classes.txt 的行号（从 0 开始）；不在 classes.txt 中的标签跳过并在报告中列出
+- 支持 polygon / rectangle / circle（分割时近似为多边形）；line / linestrip / point
+  只能转换为检测框
+- 没有面积的目标（点、水平 / 竖直的线、共线的多边形，与 label_check 的零面积判定一致）
+  不写入标签，按形状类型计入跳过数
+- 进程池并行解析 JSON（安装了 orjson 时优先使用）；每个文件的全部坐标拼接为一个数组，
+  归一化和外接框计算都在数组上批量完成
+- 图像尺寸取自 JSON 中的 imageWidth / imageHeight，缺失时才读取图像文件头
+"""
+
+import math
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+
+try:
+    import orjson
+
+    def _loads(data):
+        return orjson.loads(data)
+
+except ImportError:
+    import json
+
+    def _loads(data):
+        return json.loads(data)
+
+
+TASKS = ("detect", "segment")
+
+# 界面 / 日志显示名称
+TASK_NAMES = {"detect": "检测框", "segment": "分割多边形"}
+
+# 圆形近似为多边形时的顶点数
+CIRCLE_POINTS = 32
+
+_UNIT_CIRCLE = [
+    (math.cos(2 * math.pi * k / CIRCLE_POINTS), math.sin(2 * math.pi * k / CIRCLE_POINTS))
+    for k in range(CIRCLE_POINTS)
+]
+
+# 没有面积、只能转换为检测框的形状
+_OPEN_SHAPES = ("line", "linestrip", "point", "points")
+
+# 零面积判定的容差（与 label_check 一致；小于它的宽高按 6 位小数输出时为 0）
+_EPS = 1e-6
+
+
+def load_class_names(class_file):
+    """读取 classes.txt，返回 {类别名: 类别ID}（按非空行顺序编号）"""
+    with open(class_file, "r", encoding="utf-8") as f:
+        names = [line.strip() for line in f if line.strip()]
+    return {name: i for i, name in enumerate(names)}
+
+
+def _shape_points(shape, task):
+    """把一个 LabelMe 形状转换为顶点列表，不支持时返回 None"""
+    kind = shape.get("shape_type") or "polygon"
+    points = shape.get("points") or []
+    if kind == "polygon":
+        return points if len(points) >= 3 else None
+    if kind == "rectangle":
+        if len(points) < 2:
+            return None
+        (x1, y1), (x2, y2) = points[:2]
+        return [[x1, y1], [x2, y1], [x2, y2], [x1, y2]]
+    if kind == "circle":
+        if len(points) < 2:
+            return None
+        (cx, cy), (px, py) = points[:2]
+        r = math.hypot(px - cx, py - cy)
+        if task == "detect":
+            return [[cx - r, cy - r], [cx + r, cy + r]]
+        return [[cx + r * c, cy + r * s] for c, s in _UNIT_CIRCLE]
+    if kind in _OPEN_SHAPES and task == "detect":
+        return points or None
+    return None
+
+
+def _image_size(json_path, data):
+    """图像 (宽, 高)：优先使用 JSON 中记录的尺寸"""
+    width, height = data.get("imageWidth"), data.get("imageHeight")
+    if width and height:
+        return width, height
+    from label_store import image_size
+
+    image_path = os.path.join(os.path.dirname(json_path), data.get("imagePath") or "")
+    return image_size(image_path)
+
+
+def convert_file(json_path, label_path, class_ids, task="detect"):
+    """转换一个 LabelMe JSON
+
+    Args:
+        json_path: LabelMe JSON 路径
+        label_path: 输出的 YOLO 标签路径
+        class_ids: {类别名: 类别ID}
+        task: "detect" 或 "segment"
+
+    Returns:
+        (写入的目标数, {未知标签: 次数}, {跳过的形状类型: 次数}, 错误信息或 None)
+    """
+    unknown, skipped = Counter(), Counter()
+    try:
+        with open(json_path, "rb") as f:
+            data = _loads(f.read())
+        if not isinstance(data, dict):
+            return 0, unknown, skipped, "JSON 顶层不是对象，不是 LabelMe 标注文件"
+        width, height = _image_size(json_path, data)
+        if not width or not height:
+            return 0, unknown, skipped, "无法获取图像尺寸"
+
+        classes, counts, points, kinds = [], [], [], []
+        for shape in data.get("shapes", []):
+            label = shape.get("label")
+            class_id = class_ids.get(label)
+            if class_id is None:
+                unknown[label] += 1
+                continue
+            kind = shape.get("shape_type") or "polygon"
+            shape_points = _shape_points(shape, task)
+            if shape_points is None:
+                skipped[kind] += 1
+                continue
+            classes.append(class_id)
+            counts.append(len(shape_points))
+            points.extend(shape_points)
+            kinds.append(kind)
+
+        lines = []
+        if classes:
+            coords = np.array(points, dtype=np.float64).reshape(-1, 2)
+            coords /= (width, height)
+            np.clip(coords, 0.0, 1.0, out=coords)
+            starts = np.zeros(len(counts), dtype=np.int64)
+            np.cumsum(counts[:-1], out=starts[1:])
+            lo = np.minimum.reduceat(coords, starts, axis=0)
+            hi = np.maximum.reduceat(coords, starts, axis=0)
+            # 外接框（裁剪到图像内之后）宽或高为 0 的目标不是有效的训练目标
+            keep = ((hi - lo) > _EPS).all(axis=1)
+            if task == "segment":
+                # 多边形还要有面积（鞋带公式，与 label_check 相同）
+                xs, ys = coords[:, 0], coords[:, 1]
+                nxt = np.arange(1, len(coords) + 1)
+                nxt[starts + np.asarray(counts) - 1] = starts
+                cross = xs * ys[nxt] - xs[nxt] * ys
+                keep &= np.abs(np.add.reduceat(cross, starts)) > _EPS
+            for kind in np.asarray(kinds, dtype=object)[~keep]:
+                skipped[kind] += 1
+
+            if task == "detect":
+                rows = np.hstack(((lo + hi) / 2, hi - lo))
+                for class_id, row, ok in zip(classes, rows.tolist(), keep):
+                    if ok:
+                        lines.append(f"{class_id} " + " ".join(f"{v:.6f}" for v in row))
+            else:
+                flat = coords.ravel().tolist()
+                for class_id, start, count, ok in zip(classes, starts.tolist(), counts, keep):
+                    if ok:
+                        values = flat[2 * start : 2 * (start + count)]
+                        lines.append(f"{class_id} " + " ".join(f"{v:.6f}" for v in values))
+
+        os.makedirs(os.path.dirname(label_path) or ".", exist_ok=True)
+        with open(label_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + ("\n" if lines else ""))
+        return len(lines), unknown, skipped, None
+    except (OSError, ValueError, TypeError, KeyError, AttributeError) as e:
+        # 结构不符合 LabelMe 格式（如 shapes 中的元素不是对象）时按失败记录，不中断整批转换
+        return 0, unknown, skipped, str(e)
+
+
+def _convert_job(job, class_ids, task):
+    return convert_file(job[0], job[1], class_ids, task)
+
+
+class ConvertReport:
+    """转换结果汇总"""
+
+    def __init__(self):
+        self.files = 0
+        self.converted = 0
+        self.instances = 0
+        self.unknown = Counter()
+        self.skipped = Counter()
+        self.failed = []  # [(JSON 路径, 错误信息)]
+
+    def format(self, limit=20):
+        """格式化为文本报告"""
+        lines = [
+            f"JSON 文件: {self.files}，已转换: {self.converted}，目标数: {self.instances}"
+        ]
+        if self.unknown:
+            lines.append("不在类别文件中的标签（已跳过）:")
+            for label, count in self.unknown.most_common():
+                lines.append(f"  {label}: {count}")
+        if self.skipped:
+            lines.append("无法转换或没有面积的形状（已跳过）:")
+            for kind, count in self.skipped.most_common():
+                lines.append(f"  {kind}: {count}")
+        if self.failed:
+            lines.append(f"转换失败: {len(self.failed)}")
+            for path, message in self.failed[:limit]:
+                lines.append(f"  {path}: {message}")
+            if len(self.failed) > limit:
+                lines.append(f"  ……另有 {len(self.failed) - limit} 个未列出")
+        return "\n".join(lines)
+
+
+def convert_labelme(jobs, class_ids, task="detect", max_workers=None, progress_callback=None):
+    """批量转换 LabelMe JSON
+
+    Args:
+        jobs: [(JSON 路径, 输出标签路径)]
+        class_ids: {类别名: 类别ID}，见 load_class_names
+        task: 输出格式，见 TASKS
+        max_workers: 进程数，默认为 CPU 核数
+        progress_callback: 进度回调，参数为 (已完成文件数, 总文件数)
+
+    Returns:
+        ConvertReport
+    """
+    if task not in TASKS:
+        raise ValueError(f"不支持的输出格式: {task}")
+    jobs = list(jobs)
+    report = ConvertReport()
+    report.files = len(jobs)
+    if not jobs:
+        return report
+
+    max_workers = max_workers or os.cpu_count() or 4
+    # 每批几百个文件，摊薄进程间通信开销
+    chunksize = max(1, min(512, len(jobs) // (max_workers * 8)))
+    worker = partial(_convert_job, class_ids=class_ids, task=task)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(worker, jobs, chunksize=chunksize)
+        for done, ((json_path, _), result) in enumerate(zip(jobs, results), 1):
+            count, unknown, skipped, error = result
+            report.unknown.update(unknown)
+            report.skipped.update(skipped)
+            if error is None:
+                report.converted += 1
+                report.instances += count
+            else:
+                report.failed.append((json_path, error))
+            if progress_callback and (done % 1000 == 0 or done == len(jobs)):
+                progress_callback(done, len(jobs))
+    return report
+
+
+def collect_jobs(json_dir, output_dir=None, recursive=False):
+    """列出文件夹中的 LabelMe JSON 及对应的输出路径
+
+    Args:
+        json_dir: JSON 所在文件夹
+        output_dir: 标签输出文件夹，None 表示写在 JSON 旁边（递归时保留子文件夹结构）
+        recursive: 是否递归扫描子文件夹
+
+    Returns:
+        [(JSON 路径, 输出标签路径)]
+    """
+    from dataset_index import build_index
+
+    output_dir = output_dir or json_dir
+    return [
+        (path, os.path.join(output_dir, key + ".txt"))
+        for key, path in build_index(json_dir, recursive=recursive, use_cache=False)
+        .files("json")
+        .items()
+    ]
+
+
+# ==================== 主程序入口 ====================
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(
+        description="LabelMe JSON → YOLO 标签批量转换",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+使用示例:
+  # 检测框，标签写在 JSON 旁边
+  python labelme_to_yolo.py -i E:/labelme_data -c E:/labelme_data/classes.txt
+
+  # 分割多边形，输出到单独的文件夹
+  python labelme_to_yolo.py -i E:/labelme_data -c classes.txt -o E:/yolo_labels --task segment
+        """,
+    )
+    parser.add_argument("-i", "--input", required=True, help="LabelMe JSON 文件夹")
+    parser.add_argument("-c", "--classes", required=True, help="classes.txt")
+    parser.add_argument("-o", "--output", default=None, help="标签输出文件夹（默认与 JSON 相同）")
+    parser.add_argument("--task", choices=TASKS, default="detect", help="输出格式（默认 detect）")
+    parser.add_argument("--recursive", action="store_true", help="递归扫描子文件夹")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="进程数")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    jobs = collect_jobs(args.input, args.output, args.recursive)
+    report = convert_labelme(
+        jobs,
+        load_class_names(args.classes),
+        task=args.task,
+        max_workers=args.workers,
+        progress_callback=lambda done, total: print(f"\r{done}/{total}", end="", flush=True),
+    )
+    print()
+    print(report.format())
+    print(f"耗时: {time.perf_counter() - start:.1f}s")
@@ -16,13 +16,20 @@
 """
 
 import os
-import shutil
 from pathlib import Path
-from typing import Tuple, List
+from typing import Tuple, List, Optional
+
+from dataset_index import build_index
+from transfer import TRANSFER_MODE_NAMES, TRANSFER_MODES, transfer_files
 
 
 def organize_dataset(
-    source_dir: str, output_dir: str, copy_mode: bool = True
+    source_dir: str,
+    output_dir: str,
+    copy_mode: bool = True,
+    mode: Optional[str] = None,
+    workers: Optional[int] = None,
+    recursive: bool = False,
 ) -> Tuple[int, int, int]:
     """整理数据集：将图像和标签文件分类到不同文件夹
 
@@ -30,6 +37,9 @@ def organize_dataset(
         source_dir: 源文件夹路径（包含混合的图像和标签文件）
         output_dir: 输出文件夹路径
         copy_mode: True=复制文件，False=移动文件
+        mode: 传输方式（copy / move / hardlink / reflink），指定时覆盖 copy_mode
+        workers: 并行 I/O 线程数，None 表示自动
+        recursive: 是否递归扫描子文件夹
 
     Returns:
         (成功匹配数, 无标签图像数, 孤立标签数)
@@ -46,82 +56,65 @@ def organize_dataset(
     os.makedirs(images_dir, exist_ok=True)
     os.makedirs(labels_dir, exist_ok=True)
 
-    # 2. 支持的图像格式
-    image_extensions = {".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff"}
-    label_extension = ".txt"
-
-    # 3. 扫描源文件夹，分类文件
+    # 2. 扫描源文件夹，分类文件（单次 scandir；随后要移动 / 复制文件，不使用索引缓存）
     print(f"\n正在扫描源文件夹: {source_dir}")
 
-    image_files = {}  # {文件名(无扩展名): 完整路径}
-    label_files = {}  # {文件名(无扩展名): 完整路径}
-
-    for filename in os.listdir(source_dir):
-        file_path = os.path.join(source_dir, filename)
-
-        # 跳过目录
-        if os.path.isdir(file_path):
-            continue
-
-        # 获取文件名（无扩展名）和扩展名
-        name_without_ext = os.path.splitext(filename)[0]
-        ext = os.path.splitext(filename)[1].lower()
-
-        # 分类存储
-        if ext in image_extensions:
-            image_files[name_without_ext] = file_path
-        elif ext == label_extension:
-            label_files[name_without_ext] = file_path
+    index = build_index(source_dir, recursive=recursive, use_cache=False)
+    image_files = index.files("image")  # {文件名(无扩展名): 完整路径}
+    label_files = index.files("label")  # {文件名(无扩展名): 完整路径}
 
     print(f"找到 {len(image_files)} 个图像文件")
     print(f"找到 {len(label_files)} 个标签文件")
 
-    # 4. 匹配图像和标签
+    # 3. 匹配图像和标签
     matched_count = 0
     no_label_count = 0
     orphan_label_count = 0
 
     # 选择操作方式
-    operation = shutil.copy2 if copy_mode else shutil.move
-    operation_name = "复制" if copy_mode else "移动"
+    if mode is None:
+        mode = "copy" if copy_mode else "move"
+    operation_name = TRANSFER_MODE_NAMES[mode]
 
     print(f"\n开始{operation_name}文件...")
 
-    # 处理图像文件
+    # 收集匹配的图像和标签，统一交给传输引擎并行处理
+    jobs = []
     for name, image_path in image_files.items():
         if name in label_files:
             # 找到匹配的标签
             label_path = label_files[name]
-
-            # 复制/移动图像
-            dest_image = os.path.join(images_dir, os.path.basename(image_path))
-            operation(image_path, dest_image)
-
-            # 复制/移动标签
-            dest_label = os.path.join(labels_dir, os.path.basename(label_path))
-            operation(label_path, dest_label)
-
+            jobs.append(
+                (image_path, os.path.join(images_dir, os.path.basename(image_path)))
+            )
+            jobs.append(
+                (label_path, os.path.join(labels_dir, os.path.basename(label_path)))
+            )
             matched_count += 1
-
-            # 显示进度
-            if matched_count % 100 == 0:
-                print(f"已处理: {matched_count} 对文件...")
         else:
             # 没有对应的标签
             no_label_count += 1
             print(f"警告: 图像 '{os.path.basename(image_path)}' 没有对应的标签文件")
 
+    stats = transfer_files(
+        jobs,
+        mode=mode,
+        max_workers=workers,
+        progress_callback=lambda st: print(f"已处理: {st.format()}"),
+    )
+
     # 统计孤立的标签文件（有标签但没有图像）
     for name in label_files:
         if name not in image_files:
             orphan_label_count += 1
             print(f"警告: 标签 '{name}.txt' 没有对应的图像文件")
 
-    # 5. 输出统计信息
+    # 4. 输出统计信息
     print(f"\n{'='*50}")
     print(f"整理完成！")
     print(f"{'='*50}")
     print(f"✓ 成功匹配并{operation_name}: {matched_count} 对文件")
+    print(f"⏱ 耗时 {stats.elapsed:.2f}s（{stats.mb_per_second:.1f} MB/s）")
     print(f"⚠ 无标签的图像: {no_label_count} 个")
     print(f"⚠ 孤立的标签: {orphan_label_count} 个")
     print(f"\n输出目录:")
@@ -133,7 +126,12 @@ def organize_dataset(
 
 
 def batch_organize_datasets(
-    source_dirs: List[str], output_base_dir: str, copy_mode: bool = True
+    source_dirs: List[str],
+    output_base_dir: str,
+    copy_mode: bool = True,
+    mode: Optional[str] = None,
+    workers: Optional[int] = None,
+    recursive: bool = False,
 ):
     """批量整理多个数据集文件夹
 
@@ -141,6 +139,9 @@ def batch_organize_datasets(
         source_dirs: 源文件夹路径列表
         output_base_dir: 输出基础目录
         copy_mode: True=复制文件，False=移动文件
+        mode: 传输方式，指定时覆盖 copy_mode
+        workers: 并行 I/O 线程数，None 表示自动
+        recursive: 是否递归扫描子文件夹
     """
     total_matched = 0
     total_no_label = 0
@@ -153,7 +154,14 @@ def batch_organize_datasets(
         folder_name = os.path.basename(source_dir.rstrip(os.sep))
         output_dir = os.path.join(output_base_dir, folder_name)
 
-        matched, no_label, orphan = organize_dataset(source_dir, output_dir, copy_mode)
+        matched, no_label, orphan = organize_dataset(
+            source_dir,
+            output_dir,
+            copy_mode,
+            mode=mode,
+            workers=workers,
+            recursive=recursive,
+        )
 
         total_matched += matched
         total_no_label += no_label
@@ -184,7 +192,13 @@ if __name__ == "__main__":
   
   # 移动模式（不保留源文件）
   python organize_dataset.py -s E:/mixed_data -o E:/organized_data --move
+
+  # 硬链接模式（同一磁盘内不占用额外空间，跨盘时自动回退为复制）
+  python organize_dataset.py -s E:/mixed_data -o E:/organized_data --mode hardlink
   
+  # 递归扫描子文件夹（如按日期分好的标注批次）
+  python organize_dataset.py -s E:/mixed_data -o E:/organized_data --recursive
+
   # 批量处理多个文件夹
   python organize_dataset.py -s E:/data1 E:/data2 E:/data3 -o E:/output
         """,
@@ -200,6 +214,21 @@ if __name__ == "__main__":
         "--move", action="store_true", help="移动文件而不是复制（默认为复制）"
     )
 
+    parser.add_argument(
+        "--mode",
+        choices=TRANSFER_MODES,
+        default=None,
+        help="传输方式：copy / move / hardlink / reflink（指定时覆盖 --move）",
+    )
+
+    parser.add_argument(
+        "--workers", type=int, default=None, help="并行 I/O 线程数（默认自动）"
+    )
+
+    parser.add_argument(
+        "--recursive", action="store_true", help="递归扫描源文件夹的子文件夹"
+    )
+
     args = parser.parse_args()
 
     # 验证源文件夹
@@ -216,7 +245,21 @@ if __name__ == "__main__":
 
     if len(args.source) == 1:
         # 单个文件夹
-        organize_dataset(args.source[0], args.output, copy_mode)
+        organize_dataset(
+            args.source[0],
+            args.output,
+            copy_mode,
+            mode=args.mode,
+            workers=args.workers,
+            recursive=args.recursive,
+        )
     else:
         # 批量处理
-        batch_organize_datasets(args.source, args.output, copy_mode)
+        batch_organize_datasets(
+            args.source,
+            args.output,
+            copy_mode,
+            mode=args.mode,
+            workers=args.workers,
+            recursive=args.recursive,
+        )
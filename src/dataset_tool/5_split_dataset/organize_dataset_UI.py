@@ -8,12 +8,11 @@
 - 可视化文件选择
 - 实时进度显示
 - 详细统计信息
-- 支持复制/移动模式切换
+- 支持复制/移动/硬链接模式切换，多线程并行传输
 """
 
 import os
 import sys
-import shutil
 from PyQt5.QtWidgets import (
     QApplication,
     QWidget,
@@ -32,6 +31,9 @@ from PyQt5.QtWidgets import (
 from PyQt5.QtCore import QThread, pyqtSignal
 from PyQt5.QtGui import QFont
 
+from dataset_index import build_index
+from transfer import TRANSFER_MODE_NAMES, transfer_files
+
 
 class OrganizeWorker(QThread):
     """后台工作线程，用于执行文件整理任务"""
@@ -39,11 +41,11 @@ class OrganizeWorker(QThread):
     progress = pyqtSignal(str)  # 进度信息
     finished = pyqtSignal(int, int, int)  # 完成信号 (成功, 无标签, 孤立)
 
-    def __init__(self, source_dir, output_dir, copy_mode):
+    def __init__(self, source_dir, output_dir, mode="copy"):
         super().__init__()
         self.source_dir = source_dir
         self.output_dir = output_dir
-        self.copy_mode = copy_mode
+        self.mode = mode
 
     def run(self):
         """执行文件整理"""
@@ -54,29 +56,12 @@ class OrganizeWorker(QThread):
             os.makedirs(images_dir, exist_ok=True)
             os.makedirs(labels_dir, exist_ok=True)
 
-            # 支持的格式
-            image_extensions = {".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff"}
-            label_extension = ".txt"
-
-            # 扫描文件
+            # 扫描文件（单次 scandir；随后要移动 / 复制文件，不使用索引缓存）
             self.progress.emit(f"正在扫描源文件夹: {self.source_dir}\n")
 
-            image_files = {}
-            label_files = {}
-
-            for filename in os.listdir(self.source_dir):
-                file_path = os.path.join(self.source_dir, filename)
-
-                if os.path.isdir(file_path):
-                    continue
-
-                name_without_ext = os.path.splitext(filename)[0]
-                ext = os.path.splitext(filename)[1].lower()
-
-                if ext in image_extensions:
-                    image_files[name_without_ext] = file_path
-                elif ext == label_extension:
-                    label_files[name_without_ext] = file_path
+            index = build_index(self.source_dir, use_cache=False)
+            image_files = index.files("image")
+            label_files = index.files("label")
 
             self.progress.emit(f"找到 {len(image_files)} 个图像文件\n")
             self.progress.emit(f"找到 {len(label_files)} 个标签文件\n\n")
@@ -86,35 +71,34 @@ class OrganizeWorker(QThread):
             no_label_count = 0
             orphan_label_count = 0
 
-            operation = shutil.copy2 if self.copy_mode else shutil.move
-            operation_name = "复制" if self.copy_mode else "移动"
+            operation_name = TRANSFER_MODE_NAMES[self.mode]
 
             self.progress.emit(f"开始{operation_name}文件...\n")
 
-            total = len(image_files)
-            for idx, (name, image_path) in enumerate(image_files.items(), 1):
+            jobs = []
+            for name, image_path in image_files.items():
                 if name in label_files:
                     label_path = label_files[name]
 
-                    # 复制/移动文件
                     dest_image = os.path.join(images_dir, os.path.basename(image_path))
                     dest_label = os.path.join(labels_dir, os.path.basename(label_path))
-
-                    operation(image_path, dest_image)
-                    operation(label_path, dest_label)
+                    jobs.append((image_path, dest_image))
+                    jobs.append((label_path, dest_label))
 
                     matched_count += 1
-
-                    if matched_count % 50 == 0:
-                        self.progress.emit(
-                            f"进度: {idx}/{total} - 已处理 {matched_count} 对文件\n"
-                        )
                 else:
                     no_label_count += 1
                     self.progress.emit(
                         f"⚠ 警告: '{os.path.basename(image_path)}' 没有对应标签\n"
                     )
 
+            # 并行传输，进度汇总为文件数 / 文件/s / MB/s
+            stats = transfer_files(
+                jobs,
+                mode=self.mode,
+                progress_callback=lambda st: self.progress.emit(f"进度: {st.format()}\n"),
+            )
+
             # 统计孤立标签
             for name in label_files:
                 if name not in image_files:
@@ -125,6 +109,9 @@ class OrganizeWorker(QThread):
             self.progress.emit(f"整理完成！\n")
             self.progress.emit(f"{'='*50}\n")
             self.progress.emit(f"✓ 成功匹配: {matched_count} 对文件\n")
+            self.progress.emit(
+                f"⏱ 耗时 {stats.elapsed:.2f}s（{stats.mb_per_second:.1f} MB/s）\n"
+            )
             self.progress.emit(f"⚠ 无标签图像: {no_label_count} 个\n")
             self.progress.emit(f"⚠ 孤立标签: {orphan_label_count} 个\n")
             self.progress.emit(f"\n输出目录:\n")
@@ -261,11 +248,15 @@ class OrganizeDatasetApp(QWidget):
         self.mode_group = QButtonGroup()
         self.copy_radio = QRadioButton("复制文件（保留源文件）")
         self.move_radio = QRadioButton("移动文件（删除源文件）")
+        self.link_radio = QRadioButton("硬链接（不占额外空间）")
+        self.link_radio.setToolTip("源和输出需在同一磁盘分区，否则自动回退为复制")
         self.copy_radio.setChecked(True)
         self.mode_group.addButton(self.copy_radio)
         self.mode_group.addButton(self.move_radio)
+        self.mode_group.addButton(self.link_radio)
         mode_layout.addWidget(self.copy_radio)
         mode_layout.addWidget(self.move_radio)
+        mode_layout.addWidget(self.link_radio)
         mode_layout.addStretch()
         layout.addLayout(mode_layout)
 
@@ -348,10 +339,15 @@ class OrganizeDatasetApp(QWidget):
         self.progress_bar.setVisible(True)
 
         # 获取操作模式
-        copy_mode = self.copy_radio.isChecked()
+        if self.move_radio.isChecked():
+            mode = "move"
+        elif self.link_radio.isChecked():
+            mode = "hardlink"
+        else:
+            mode = "copy"
 
         # 创建并启动工作线程
-        self.worker = OrganizeWorker(source_dir, output_dir, copy_mode)
+        self.worker = OrganizeWorker(source_dir, output_dir, mode)
         self.worker.progress.connect(self.update_log)
         self.worker.finished.connect(self.on_finished)
         self.worker.start()
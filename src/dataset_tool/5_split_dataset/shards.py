@@ -0,0 +1,266 @@
+"""tar 分片导出（WebDataset 格式）
+
+功能说明：
+供 yolo_dataset_all_in_one.py 使用。在远程存储 / 对象存储上训练时，数以百万计的小文件
+才是瓶颈；这里把每个子集按大小上限打包成若干 tar 分片，每个样本的图像和标签以相同的
+键名相邻存放（WebDataset 命名：<键>.jpg + <键>.txt），加载时顺序读取分片即可跑满带宽。
+
+输出内容（shards/ 目录）：
+- {子集}-000000.tar、{子集}-000001.tar ……：分片文件
+- {子集}-index.json：每个样本所在的分片及图像 / 标签数据在分片内的偏移量和长度，
+  用于随机访问（ShardIndex.read）
+
+主要特性：
+- 先按文件大小规划分片（计入 tar 头和 512 字节对齐），再由线程池并行写出各分片
+- 分片先写入临时文件再原子替换，中途失败不会留下不完整的分片
+- iter_shard / iter_split 流式读取：顺序读 tar，按键名把相邻成员组装成样本
+"""
+
+import json
+import os
+import re
+import tarfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from transfer import TransferStats, default_workers
+
+SHARD_DIR_NAME = "shards"
+SHARD_INDEX_VERSION = 1
+# 默认分片大小上限（字节）
+DEFAULT_SHARD_SIZE = 512 * 1024 * 1024
+
+_BLOCK = 512
+# 流式读取时的缓冲区大小
+_READ_BUFFER = 8 * 1024 * 1024
+
+
+def _tar_size(size):
+    """一个成员在 tar 中占用的字节数（头部 + 按 512 字节对齐的数据）"""
+    return _BLOCK + (size + _BLOCK - 1) // _BLOCK * _BLOCK
+
+
+def sample_key(path):
+    """由文件名生成样本键：WebDataset 以第一个 "." 分隔键名和扩展名，键名中的 "." 换成 "_" """
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return re.sub(r"[.\s]", "_", stem)
+
+
+def plan_shards(pairs, max_shard_bytes=DEFAULT_SHARD_SIZE):
+    """按大小上限把样本顺序分配到各分片
+
+    Args:
+        pairs: [(图像路径, 标签路径)]
+        max_shard_bytes: 单个分片的大小上限；单个样本超过上限时独占一个分片
+
+    Returns:
+        [[样本下标]]，每个元素为一个分片
+    """
+    # 预留 tar 结尾的空块（整个归档按 RECORDSIZE 对齐）
+    budget = max_shard_bytes - tarfile.RECORDSIZE
+    shards, current, current_size = [], [], 0
+    for i, (image, label) in enumerate(pairs):
+        size = _tar_size(os.path.getsize(image)) + _tar_size(os.path.getsize(label))
+        if current and current_size + size > budget:
+            shards.append(current)
+            current, current_size = [], 0
+        current.append(i)
+        current_size += size
+    if current:
+        shards.append(current)
+    return shards
+
+
+def _add_member(tar, name, path):
+    """把一个文件写入 tar，返回 (数据偏移量, 数据长度)"""
+    st = os.stat(path)
+    info = tarfile.TarInfo(name)
+    info.size = st.st_size
+    info.mtime = int(st.st_mtime)
+    info.mode = 0o644
+    with open(path, "rb") as f:
+        tar.addfile(info, f)
+    # addfile 之后 tar.offset 指向对齐后的数据末尾
+    return tar.offset - (info.size + _BLOCK - 1) // _BLOCK * _BLOCK, info.size
+
+
+def _write_shard(path, pairs, keys):
+    """写出一个分片，返回 (各样本的索引记录, 分片字节数)"""
+    records = []
+    tmp_path = path + ".tmp"
+    try:
+        with tarfile.open(tmp_path, "w", format=tarfile.PAX_FORMAT) as tar:
+            for (image, label), key in zip(pairs, keys):
+                image_ext = os.path.splitext(image)[1].lower().lstrip(".")
+                image_name = f"{key}.{image_ext}"
+                image_offset, image_size = _add_member(tar, image_name, image)
+                label_offset, label_size = _add_member(tar, f"{key}.txt", label)
+                records.append(
+                    [key, image_name, image_offset, image_size, label_offset, label_size]
+                )
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return records, os.path.getsize(path)
+
+
+def write_shards(
+    output_dir,
+    splits,
+    max_shard_bytes=DEFAULT_SHARD_SIZE,
+    max_workers=None,
+    progress_callback=None,
+):
+    """把各子集导出为 tar 分片
+
+    Args:
+        output_dir: 数据集根目录，分片写入其中的 shards/
+        splits: {子集名: [(图像路径, 标签路径)]}
+        max_shard_bytes: 单个分片的大小上限
+        max_workers: 并行写出的线程数
+        progress_callback: 每写完一个分片调用一次，参数为 TransferStats（按分片计数）
+
+    Returns:
+        {子集名: 分片数}
+    """
+    shard_dir = os.path.join(output_dir, SHARD_DIR_NAME)
+    os.makedirs(shard_dir, exist_ok=True)
+
+    tasks = []  # (子集名, 分片序号, 分片路径, 样本列表, 键名列表)
+    for split, pairs in splits.items():
+        # 删除上次导出留下的旧分片，避免读取时混入
+        for name in os.listdir(shard_dir):
+            if name.startswith(f"{split}-"):
+                os.remove(os.path.join(shard_dir, name))
+
+        keys = [sample_key(image) for image, _ in pairs]
+        # 不同文件夹中的同名样本：追加序号保证键名唯一。序号要避开已发出的键和
+        # 其他样本本来的键（a、a、a_1 → a、a_2、a_1），否则按 __key__ 读取时会合并样本
+        reserved = set(keys)
+        issued = set()
+        for i, key in enumerate(keys):
+            if key in issued:
+                n = 1
+                while f"{key}_{n}" in issued or f"{key}_{n}" in reserved:
+                    n += 1
+                key = keys[i] = f"{key}_{n}"
+            issued.add(key)
+
+        for n, members in enumerate(plan_shards(pairs, max_shard_bytes)):
+            tasks.append(
+                (
+                    split,
+                    n,
+                    os.path.join(shard_dir, f"{split}-{n:06d}.tar"),
+                    [pairs[i] for i in members],
+                    [keys[i] for i in members],
+                )
+            )
+
+    stats = TransferStats(len(tasks))
+    results = {}
+    with ThreadPoolExecutor(max_workers=max_workers or default_workers()) as executor:
+        futures = {
+            executor.submit(_write_shard, path, pairs, keys): (split, n, path)
+            for split, n, path, pairs, keys in tasks
+        }
+        for future in as_completed(futures):
+            records, nbytes = future.result()
+            results[futures[future]] = records
+            stats.add(nbytes)
+            if progress_callback:
+                progress_callback(stats)
+
+    # 每个子集一个索引文件：分片列表 + 每个样本 [键名, 分片序号, 图像成员名, 偏移, 长度, 标签偏移, 长度]
+    counts = {}
+    for split in splits:
+        shard_keys = sorted(k for k in results if k[0] == split)
+        samples = []
+        for shard in shard_keys:
+            for key, image_name, *offsets in results[shard]:
+                samples.append([key, shard[1], image_name, *offsets])
+        index_path = os.path.join(shard_dir, f"{split}-index.json")
+        with open(index_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "version": SHARD_INDEX_VERSION,
+                    "shards": [os.path.basename(path) for _, _, path in shard_keys],
+                    "samples": samples,
+                },
+                f,
+                ensure_ascii=False,
+                separators=(",", ":"),
+            )
+        os.replace(index_path + ".tmp", index_path)
+        counts[split] = len(shard_keys)
+    return counts
+
+
+def iter_shard(path):
+    """顺序读取一个分片，逐个产出样本
+
+    Yields:
+        {"__key__": 键名, 扩展名: 文件内容 bytes, ...}
+    """
+    with open(path, "rb", buffering=_READ_BUFFER) as f:
+        with tarfile.open(fileobj=f, mode="r|") as tar:
+            sample = None
+            for member in tar:
+                if not member.isfile():
+                    continue
+                key, _, ext = member.name.partition(".")
+                if sample is not None and sample["__key__"] != key:
+                    yield sample
+                    sample = None
+                if sample is None:
+                    sample = {"__key__": key}
+                sample[ext] = tar.extractfile(member).read()
+            if sample is not None:
+                yield sample
+
+
+def iter_split(output_dir, split):
+    """按顺序流式读取一个子集的全部分片"""
+    shard_dir = os.path.join(output_dir, SHARD_DIR_NAME)
+    with open(os.path.join(shard_dir, f"{split}-index.json"), "r", encoding="utf-8") as f:
+        shards = json.load(f)["shards"]
+    for name in shards:
+        yield from iter_shard(os.path.join(shard_dir, name))
+
+
+class ShardIndex:
+    """按分片索引随机读取样本
+
+    用法:
+        index = ShardIndex("E:/yolo_dataset", "train")
+        image_bytes, label_bytes = index.read(0)
+    """
+
+    def __init__(self, output_dir, split):
+        self.shard_dir = os.path.join(output_dir, SHARD_DIR_NAME)
+        with open(
+            os.path.join(self.shard_dir, f"{split}-index.json"), "r", encoding="utf-8"
+        ) as f:
+            data = json.load(f)
+        if data.get("version") != SHARD_INDEX_VERSION:
+            raise ValueError(f"不支持的分片索引版本: {data.get('version')}")
+        self.shards = data["shards"]
+        self.samples = data["samples"]
+
+    def __len__(self):
+        return len(self.samples)
+
+    def read(self, i):
+        """读取第 i 个样本
+
+        Returns:
+            (图像文件内容, 标签文件内容)
+        """
+        _, shard, _, image_offset, image_size, label_offset, label_size = self.samples[i]
+        with open(os.path.join(self.shard_dir, self.shards[shard]), "rb") as f:
+            f.seek(image_offset)
+            image = f.read(image_size)
+            f.seek(label_offset)
+            label = f.read(label_size)
+        return image, label
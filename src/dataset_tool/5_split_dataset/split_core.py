@@ -0,0 +1,112 @@
+"""数据集划分核心
+
+功能说明：
+split_dataset.py、split_dataset_UI.py 和 yolo_dataset_all_in_one.py 共用的划分逻辑。
+只做一次（可指定种子的）随机排列，再按比例切片，时间复杂度 O(n)，
+不再对列表做 `f not in train_files` 这类逐个成员判断。
+分组划分（split_groups）对组做同样的排列，再按累计样本数切分，每组整体进入一个子集。
+哈希分桶划分（hash_split_items）只由样本名决定归属，新增样本不会改变已有样本的划分，
+供增量更新使用。
+"""
+
+import hashlib
+import random
+
+import numpy as np
+
+
+def split_counts(total, train_ratio, val_ratio):
+    """根据比例计算各子集数量，测试集取剩余全部
+
+    Returns:
+        (训练集数量, 验证集数量, 测试集数量)
+    """
+    num_train = int(total * train_ratio)
+    num_val = int(total * val_ratio)
+    num_test = total - num_train - num_val
+    return num_train, num_val, num_test
+
+
+def split_items(items, train_ratio, val_ratio, seed=None):
+    """随机划分为训练集 / 验证集 / 测试集
+
+    Args:
+        items: 待划分的样本序列（文件名、路径或字典均可）
+        train_ratio: 训练集比例（0-1）
+        val_ratio: 验证集比例（0-1），测试集取剩余全部
+        seed: 随机种子，None 表示每次随机
+
+    Returns:
+        (训练集列表, 验证集列表, 测试集列表)，三者互不重叠且并集为 items
+    """
+    order = list(items)
+    random.Random(seed).shuffle(order)
+    num_train, num_val, _ = split_counts(len(order), train_ratio, val_ratio)
+    return (
+        order[:num_train],
+        order[num_train : num_train + num_val],
+        order[num_train + num_val :],
+    )
+
+
+def split_groups(items, groups, train_ratio, val_ratio, seed=None):
+    """按组随机划分，同一组的样本整体进入同一个子集
+
+    Args:
+        items: 待划分的样本序列
+        groups: 与 items 一一对应的组号（从 0 开始的连续整数，见 grouping.assign_groups）
+        train_ratio: 训练集比例（0-1）
+        val_ratio: 验证集比例（0-1），测试集取剩余全部
+        seed: 随机种子，None 表示每次随机
+
+    Returns:
+        (训练集列表, 验证集列表, 测试集列表)
+    """
+    items = list(items)
+    groups = np.asarray(groups, dtype=np.int64)
+    sizes = np.bincount(groups)
+    order = list(range(len(sizes)))
+    random.Random(seed).shuffle(order)
+
+    # 按排列顺序累计样本数，累计量越过比例边界的组归入下一个子集
+    num_train, num_val, _ = split_counts(len(items), train_ratio, val_ratio)
+    cumulative = np.cumsum(sizes[order])
+    split_of_group = np.empty(len(sizes), dtype=np.int8)
+    split_of_group[order] = np.searchsorted(
+        [num_train, num_train + num_val], cumulative - sizes[order] / 2, side="right"
+    )
+    split_of = split_of_group[groups]
+    return tuple([items[i] for i in np.flatnonzero(split_of == s)] for s in range(3))
+
+
+def hash_bucket(key, train_ratio, val_ratio):
+    """按名称的哈希值把样本分到 0/1/2（训练/验证/测试）子集
+
+    哈希值映射到 [0, 1) 区间后按比例切分：同一名称总是得到同一结果，
+    调整比例时只有落在边界变化区间内的样本会换到别的子集。
+    """
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+    position = int.from_bytes(digest, "big") / 2**64
+    if position < train_ratio:
+        return 0
+    if position < train_ratio + val_ratio:
+        return 1
+    return 2
+
+
+def hash_split_items(items, keys, train_ratio, val_ratio):
+    """按名称哈希分桶划分为训练集 / 验证集 / 测试集（结果稳定，与样本集合无关）
+
+    Args:
+        items: 待划分的样本序列
+        keys: 与 items 一一对应的名称（通常为文件名，无扩展名）
+        train_ratio: 训练集比例（0-1）
+        val_ratio: 验证集比例（0-1），测试集取剩余全部
+
+    Returns:
+        (训练集列表, 验证集列表, 测试集列表)
+    """
+    splits = ([], [], [])
+    for item, key in zip(items, keys):
+        splits[hash_bucket(key, train_ratio, val_ratio)].append(item)
+    return splits
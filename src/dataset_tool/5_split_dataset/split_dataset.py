@@ -1,8 +1,21 @@
 import os
-import shutil
-import random
 import argparse
 
+import yaml
+
+from dataset_index import build_index
+from file_lists import dataset_yaml_data, write_file_lists
+from grouping import (
+    DEFAULT_MAX_DISTANCE,
+    GROUP_MODES,
+    HASH_CACHE_NAME,
+    assign_groups,
+)
+from label_store import write_label_store
+from split_core import split_groups, split_items
+from stratify import LABEL_CACHE_NAME, format_histogram, stratified_split_items
+from transfer import TRANSFER_MODES, transfer_files
+
 
 # 创建目录
 def mkdir(path):
@@ -11,7 +24,23 @@ def mkdir(path):
 
 
 def split_dataset(
-    image_dir, txt_dir, save_dir, train_percent, val_percent, test_percent
+    image_dir,
+    txt_dir,
+    save_dir,
+    train_percent,
+    val_percent,
+    test_percent,
+    seed=None,
+    mode="copy",
+    workers=None,
+    stratify=False,
+    group_mode=None,
+    group_pattern=None,
+    group_manifest=None,
+    max_distance=DEFAULT_MAX_DISTANCE,
+    list_only=False,
+    class_file=None,
+    label_store=False,
 ):
     # 创建保存数据集的目录结构
     mkdir(save_dir)
@@ -26,7 +55,7 @@ def split_dataset(
     label_val_path = os.path.join(labels_dir, "val")
     label_test_path = os.path.join(labels_dir, "test")
 
-    # 创建相应的文件夹
+    # 创建相应的文件夹（文件列表模式不需要）
     for path in [
         img_train_path,
         img_val_path,
@@ -35,54 +64,122 @@ def split_dataset(
         label_val_path,
         label_test_path,
     ]:
-        mkdir(path)
+        if not list_only:
+            mkdir(path)
 
-    # 获取所有标签文件
-    total_txt = [f for f in os.listdir(txt_dir) if f.endswith(".txt")]
-    num_txt = len(total_txt)
+    # 获取所有标签文件，并按文件名在图像文件夹中匹配图像（两个文件夹各扫描一次）
+    total_txt = [
+        os.path.basename(p)
+        for p in build_index(txt_dir, use_cache=False).files("label").values()
+    ]
+    image_files = build_index(image_dir, use_cache=False).files("image")
 
-    # 根据比例计算数量
-    num_train = int(num_txt * train_percent)
-    num_val = int(num_txt * val_percent)
-    num_test = num_txt - num_train - num_val
+    def image_of(txt_file):
+        """标签文件对应的图像路径，图像文件夹中没有同名图像时按 .png 处理"""
+        stem = os.path.splitext(txt_file)[0]
+        return image_files.get(stem, os.path.join(image_dir, stem + ".png"))
 
-    # 随机划分数据集
-    train_files = random.sample(total_txt, num_train)
-    remaining_files = [f for f in total_txt if f not in train_files]
-    val_files = random.sample(remaining_files, num_val)
-    test_files = [f for f in remaining_files if f not in val_files]
+    # 分组：同一组（如同一段视频）的样本整体进入同一个子集
+    groups = None
+    if group_mode:
+        groups = assign_groups(
+            [image_of(f) for f in total_txt],
+            group_mode,
+            pattern=group_pattern,
+            manifest=group_manifest,
+            max_distance=max_distance,
+            cache_path=os.path.join(image_dir, HASH_CACHE_NAME),
+        )
+        print(f"分组数量: {len(set(groups.tolist()))}")
+
+    if stratify:
+        # 按类别分布分层划分
+        train_files, val_files, test_files, hist = stratified_split_items(
+            total_txt,
+            [os.path.join(txt_dir, f) for f in total_txt],
+            train_percent,
+            val_percent,
+            seed=seed,
+            cache_path=os.path.join(txt_dir, LABEL_CACHE_NAME),
+            groups=groups,
+        )
+        print(
+            format_histogram(
+                hist, ratios=(train_percent, val_percent, 1 - train_percent - val_percent)
+            )
+        )
+    elif groups is not None:
+        # 按组随机划分
+        train_files, val_files, test_files = split_groups(
+            total_txt, groups, train_percent, val_percent, seed=seed
+        )
+    else:
+        # 随机划分数据集（一次排列 + 切片）
+        train_files, val_files, test_files = split_items(
+            total_txt, train_percent, val_percent, seed=seed
+        )
 
     print(
         f"训练集数量: {len(train_files)}, 验证集数量: {len(val_files)}, 测试集数量: {len(test_files)}"
     )
 
-    # 复制文件到相应的目录
-    for txt_file in train_files:
-        img_file = txt_file.replace(".txt", ".png")
-        shutil.copy(
-            os.path.join(image_dir, img_file), os.path.join(img_train_path, img_file)
-        )
-        shutil.copy(
-            os.path.join(txt_dir, txt_file), os.path.join(label_train_path, txt_file)
-        )
+    # 可选：生成 dataset.yaml
+    if class_file:
+        with open(class_file, "r", encoding="utf-8") as f:
+            categories = [line.strip() for line in f if line.strip()]
+        with open(os.path.join(save_dir, "dataset.yaml"), "w", encoding="utf-8") as f:
+            yaml.dump(
+                dataset_yaml_data(save_dir, categories, list_only),
+                f,
+                default_flow_style=False,
+                sort_keys=False,
+                allow_unicode=True,
+            )
 
-    for txt_file in val_files:
-        img_file = txt_file.replace(".txt", ".png")
-        shutil.copy(
-            os.path.join(image_dir, img_file), os.path.join(img_val_path, img_file)
-        )
-        shutil.copy(
-            os.path.join(txt_dir, txt_file), os.path.join(label_val_path, txt_file)
+    # 各子集的 (图像, 标签) 源路径
+    sources = {
+        split: [(image_of(f), os.path.join(txt_dir, f)) for f in files]
+        for split, files in (
+            ("train", train_files),
+            ("val", val_files),
+            ("test", test_files),
         )
+    }
 
-    for txt_file in test_files:
-        img_file = txt_file.replace(".txt", ".png")
-        shutil.copy(
-            os.path.join(image_dir, img_file), os.path.join(img_test_path, img_file)
-        )
-        shutil.copy(
-            os.path.join(txt_dir, txt_file), os.path.join(label_test_path, txt_file)
+    if list_only:
+        # 文件列表模式：只写出 train.txt / val.txt / test.txt，不复制文件
+        counts, linked = write_file_lists(save_dir, sources)
+        print(f"文件列表: {counts}，建立链接的样本: {linked}")
+        outputs = sources
+    else:
+        # 复制文件到相应的目录（并行传输）
+        outputs = {
+            split: [
+                (
+                    os.path.join(images_dir, split, os.path.basename(image)),
+                    os.path.join(labels_dir, split, os.path.basename(label)),
+                )
+                for image, label in pairs
+            ]
+            for split, pairs in sources.items()
+        }
+        jobs = []
+        for split in sources:
+            for src, dst in zip(sources[split], outputs[split]):
+                jobs += list(zip(src, dst))
+
+        stats = transfer_files(
+            jobs,
+            mode=mode,
+            max_workers=workers,
+            progress_callback=lambda st: print(f"  {st.format()}"),
         )
+        print(f"传输完成，耗时 {stats.elapsed:.2f}s")
+
+    # 可选：打包标签缓存（label_store/），训练时无需逐个读取 .txt
+    if label_store:
+        num_images, num_instances = write_label_store(save_dir, outputs, workers)
+        print(f"标签缓存: {num_images} 张图像，{num_instances} 个目标")
 
 
 if __name__ == "__main__":
@@ -122,6 +219,71 @@ if __name__ == "__main__":
         default=0.15,
         help="Percentage of data for test set",
     )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=None,
+        help="Random seed for a reproducible split",
+    )
+    parser.add_argument(
+        "--stratify",
+        action="store_true",
+        help="Stratify the split by the class distribution of the YOLO labels",
+    )
+    parser.add_argument(
+        "--group",
+        choices=GROUP_MODES,
+        default=None,
+        help="Keep groups of related images in one split: "
+        "regex (filename pattern), manifest (CSV/JSON file) or phash (near-duplicate clustering)",
+    )
+    parser.add_argument(
+        "--group-pattern",
+        type=str,
+        default=None,
+        help="Regex applied to the file stem for --group regex "
+        "(default strips a trailing frame number)",
+    )
+    parser.add_argument(
+        "--group-manifest",
+        type=str,
+        default=None,
+        help="CSV (name,group) or JSON {name: group} file for --group manifest",
+    )
+    parser.add_argument(
+        "--max-distance",
+        type=int,
+        default=DEFAULT_MAX_DISTANCE,
+        help="Hamming distance threshold for --group phash",
+    )
+    parser.add_argument(
+        "--list-only",
+        action="store_true",
+        help="Write train.txt/val.txt/test.txt lists of absolute image paths instead of copying files",
+    )
+    parser.add_argument(
+        "--class-file",
+        type=str,
+        default=None,
+        help="Class names file (one per line); when given, dataset.yaml is written to --save-dir",
+    )
+    parser.add_argument(
+        "--label-store",
+        action="store_true",
+        help="Also write label_store/: all labels packed into memory-mappable arrays",
+    )
+    parser.add_argument(
+        "--mode",
+        choices=[m for m in TRANSFER_MODES if m != "move"],
+        default="copy",
+        help="How files are placed: copy, hardlink or reflink (links fall back to copy)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of I/O threads (default: based on CPU count)",
+    )
 
     args = parser.parse_args()
 
@@ -136,4 +298,15 @@ if __name__ == "__main__":
         args.train_percent,
         args.val_percent,
         args.test_percent,
+        seed=args.seed,
+        mode=args.mode,
+        workers=args.workers,
+        stratify=args.stratify,
+        group_mode=args.group,
+        group_pattern=args.group_pattern,
+        group_manifest=args.group_manifest,
+        max_distance=args.max_distance,
+        list_only=args.list_only,
+        class_file=args.class_file,
+        label_store=args.label_store,
     )
@@ -25,8 +25,6 @@
 """
 
 import os
-import shutil
-import random
 import yaml
 from PyQt5 import QtWidgets
 from PyQt5.QtWidgets import (
@@ -37,8 +35,24 @@ from PyQt5.QtWidgets import (
     QPushButton,
     QWidget,
     QApplication,
+    QCheckBox,
+    QComboBox,
 )
 
+from dataset_index import build_index
+from file_lists import dataset_yaml_data, write_file_lists
+from grouping import (
+    DEFAULT_MAX_DISTANCE,
+    GROUP_MODE_NAMES,
+    GROUP_MODES,
+    HASH_CACHE_NAME,
+    assign_groups,
+)
+from label_store import write_label_store
+from split_core import split_groups, split_items
+from stratify import LABEL_CACHE_NAME, format_histogram, stratified_split_items
+from transfer import TRANSFER_MODE_NAMES, transfer_files
+
 
 def mkdir(path):
     """创建目录（如果不存在）
@@ -50,18 +64,19 @@ def mkdir(path):
         os.makedirs(path)
 
 
-def generate_yaml(txt_file, save_dir):
+def generate_yaml(txt_file, save_dir, list_only=False):
     """生成 YOLO 格式的 dataset.yaml 配置文件
 
     Args:
         txt_file: 类别文件路径，每行一个类别名称
         save_dir: 数据集保存目录
+        list_only: True 时 train / val / test 指向 train.txt 等文件列表
 
     YAML 文件格式：
         path: 数据集根目录
-        train: 训练集相对路径
-        val: 验证集相对路径
-        test: 测试集相对路径
+        train: 训练集相对路径（或文件列表）
+        val: 验证集相对路径（或文件列表）
+        test: 测试集相对路径（或文件列表）
         names: {类别ID: 类别名称} 字典
     """
     # 使用 os.path.normpath 确保路径为系统标准格式（Windows/Linux 兼容）
@@ -77,16 +92,9 @@ def generate_yaml(txt_file, save_dir):
         QtWidgets.QMessageBox.critical(None, "错误", f"读取类别文件失败: {e}")
         return
 
-    # 构建 YAML 数据结构
-    yaml_data = {
-        "path": normalized_save_dir,  # 数据集根目录（绝对路径）
-        "train": "images/train",  # 训练集图像相对路径
-        "val": "images/val",  # 验证集图像相对路径
-        "test": "images/test",  # 测试集图像相对路径
-        "names": {
-            i: category for i, category in enumerate(categories)
-        },  # 类别映射 {0: 'class1', 1: 'class2', ...}
-    }
+    # 构建 YAML 数据结构：path 为数据集根目录（绝对路径），
+    # names 为类别映射 {0: 'class1', 1: 'class2', ...}
+    yaml_data = dataset_yaml_data(normalized_save_dir, categories, list_only)
 
     try:
         with open(yaml_file, "w", encoding="utf-8") as file:
@@ -106,7 +114,19 @@ def generate_yaml(txt_file, save_dir):
 
 
 def split_dataset(
-    image_dir, txt_dir, save_dir, train_percent, val_percent, test_percent
+    image_dir,
+    txt_dir,
+    save_dir,
+    train_percent,
+    val_percent,
+    test_percent,
+    seed=None,
+    mode="copy",
+    stratify=False,
+    group_mode=None,
+    group_arg=None,
+    list_only=False,
+    label_store=False,
 ):
     """将数据集按比例划分为训练集、验证集和测试集
 
@@ -117,6 +137,13 @@ def split_dataset(
         train_percent: 训练集比例（0-1）
         val_percent: 验证集比例（0-1）
         test_percent: 测试集比例（0-1）
+        seed: 随机种子，None 表示每次随机
+        mode: 文件传输方式（copy / hardlink / reflink），见 transfer.TRANSFER_MODES
+        stratify: 是否按类别分布分层划分（读取 YOLO 标签）
+        group_mode: 分组方式（regex / manifest / phash），None 表示不分组
+        group_arg: 分组参数：regex 为正则，manifest 为清单路径，phash 为汉明距离阈值
+        list_only: True 时只写出 train.txt / val.txt / test.txt 文件列表，不复制文件
+        label_store: 是否额外写出打包的标签缓存 label_store/
 
     工作流程：
         1. 创建标准 YOLO 目录结构
@@ -140,7 +167,7 @@ def split_dataset(
     label_val_path = os.path.join(labels_dir, "val")
     label_test_path = os.path.join(labels_dir, "test")
 
-    # 批量创建所有必需的文件夹
+    # 批量创建所有必需的文件夹（文件列表模式不需要）
     for path in [
         img_train_path,
         img_val_path,
@@ -149,13 +176,15 @@ def split_dataset(
         label_val_path,
         label_test_path,
     ]:
-        mkdir(path)
-
-    # 2. 支持的图像格式（可根据需要扩展）
-    image_extensions = [".png", ".jpg", ".jpeg"]
+        if not list_only:
+            mkdir(path)
 
-    # 获取所有标签文件（YOLO 格式 .txt 文件）
-    total_txt = [f for f in os.listdir(txt_dir) if f.endswith(".txt")]
+    # 2. 扫描标签文件夹和图像文件夹（各一次 scandir；随后要复制文件，不使用索引缓存）
+    total_txt = [
+        os.path.basename(p)
+        for p in build_index(txt_dir, use_cache=False).files("label").values()
+    ]
+    image_files = build_index(image_dir, use_cache=False).files("image")
 
     # 验证标签文件是否存在
     if not total_txt:
@@ -164,66 +193,122 @@ def split_dataset(
         )
         return
 
-    num_txt = len(total_txt)
-
-    # 3. 根据比例计算各数据集的样本数量
-    num_train = int(num_txt * train_percent)  # 训练集数量
-    num_val = int(num_txt * val_percent)  # 验证集数量
-    num_test = num_txt - num_train - num_val  # 测试集数量（剩余全部）
-
-    # 4. 随机划分数据集（无放回抽样，确保数据不重复）
-    train_files = random.sample(total_txt, num_train)  # 随机抽取训练集
-    remaining_files = [f for f in total_txt if f not in train_files]  # 剩余文件
-    val_files = random.sample(remaining_files, num_val)  # 从剩余中抽取验证集
-    test_files = [
-        f for f in remaining_files if f not in val_files
-    ]  # 剩余全部作为测试集
+    def find_image(txt_file):
+        """根据标签文件名查找对应的图像文件（支持多种格式），找不到返回 None"""
+        return image_files.get(os.path.splitext(txt_file)[0])
+
+    # 分组：同一组（如同一段视频）的样本整体进入同一个子集
+    groups = None
+    if group_mode:
+        groups = assign_groups(
+            [find_image(f) or os.path.join(image_dir, f) for f in total_txt],
+            group_mode,
+            pattern=group_arg if group_mode == "regex" else None,
+            manifest=group_arg if group_mode == "manifest" else None,
+            max_distance=(
+                int(group_arg)
+                if group_mode == "phash" and group_arg
+                else DEFAULT_MAX_DISTANCE
+            ),
+            cache_path=os.path.join(image_dir, HASH_CACHE_NAME),
+        )
+        print(f"分组数量: {len(set(groups.tolist()))}")
+
+    # 3-4. 按比例划分数据集（测试集取剩余全部）
+    if stratify:
+        # 分层划分：每个类别在各子集中的占比都接近划分比例
+        train_files, val_files, test_files, hist = stratified_split_items(
+            total_txt,
+            [os.path.join(txt_dir, f) for f in total_txt],
+            train_percent,
+            val_percent,
+            seed=seed,
+            cache_path=os.path.join(txt_dir, LABEL_CACHE_NAME),
+            groups=groups,
+        )
+        print(
+            format_histogram(
+                hist, ratios=(train_percent, val_percent, 1 - train_percent - val_percent)
+            )
+        )
+    elif groups is not None:
+        # 按组随机划分
+        train_files, val_files, test_files = split_groups(
+            total_txt, groups, train_percent, val_percent, seed=seed
+        )
+    else:
+        # 随机划分（一次排列 + 切片，O(n)）
+        train_files, val_files, test_files = split_items(
+            total_txt, train_percent, val_percent, seed=seed
+        )
 
     # 输出划分结果统计
     print(
         f"训练集数量: {len(train_files)}, 验证集数量: {len(val_files)}, 测试集数量: {len(test_files)}"
     )
 
-    # 5. 定义文件复制函数
-    def copy_files(txt_files, img_path, label_path):
-        """复制图像和标签文件到指定目录
+    # 5. 定义样本收集函数
+    def collect_pairs(txt_files):
+        """查找每个标签文件对应的图像
 
         Args:
             txt_files: 标签文件列表
-            img_path: 图像目标目录
-            label_path: 标签目标目录
+
+        Returns:
+            [(图像路径, 标签路径)]，找不到图像的标签被跳过
         """
+        pairs = []
         for txt_file in txt_files:
             # 获取标签文件的完整路径
             txt_full_path = os.path.abspath(os.path.join(txt_dir, txt_file))
 
             # 根据标签文件名查找对应的图像文件（支持多种格式）
-            img_file = None
-            for ext in image_extensions:
-                potential_img_file = os.path.join(
-                    image_dir, txt_file.replace(".txt", ext)
-                )
-                if os.path.exists(potential_img_file):
-                    img_file = potential_img_file
-                    break
+            img_file = find_image(txt_file)
 
             # 如果找不到对应图像，跳过该标签文件
             if img_file is None:
                 print(f"警告：未找到对应的图像文件: {txt_file}")
                 continue
+            pairs.append((img_file, txt_full_path))
+        return pairs
+
+    splits = {
+        "train": collect_pairs(train_files),
+        "val": collect_pairs(val_files),
+        "test": collect_pairs(test_files),
+    }
 
-            # 复制图像和标签文件到目标目录
-            shutil.copy(img_file, os.path.join(img_path, os.path.basename(img_file)))
-            shutil.copy(txt_full_path, os.path.join(label_path, txt_file))
+    if list_only:
+        # 6. 文件列表模式：只写出各子集的图像路径列表
+        counts, linked = write_file_lists(save_dir, splits)
+        print(f"已生成文件列表: {counts}，建立链接的样本: {linked}")
+        outputs = splits
+    else:
+        # 6. 三个子集的文件合并为一批并行传输
+        outputs = {
+            split: [
+                (
+                    os.path.join(images_dir, split, os.path.basename(img_file)),
+                    os.path.join(labels_dir, split, os.path.basename(txt_full_path)),
+                )
+                for img_file, txt_full_path in pairs
+            ]
+            for split, pairs in splits.items()
+        }
+        jobs = []
+        for split in splits:
+            for src, dst in zip(splits[split], outputs[split]):
+                jobs += list(zip(src, dst))
+        print(f"正在{TRANSFER_MODE_NAMES[mode]}文件...")
+        stats = transfer_files(
+            jobs, mode=mode, progress_callback=lambda st: print(f"  {st.format()}")
+        )
+        print(f"文件复制完成！耗时 {stats.elapsed:.2f}s")
 
-    # 6. 批量复制训练集、验证集和测试集文件
-    print("正在复制训练集...")
-    copy_files(train_files, img_train_path, label_train_path)
-    print("正在复制验证集...")
-    copy_files(val_files, img_val_path, label_val_path)
-    print("正在复制测试集...")
-    copy_files(test_files, img_test_path, label_test_path)
-    print("文件复制完成！")
+    # 7. 可选：打包标签缓存（label_store/），训练时无需逐个读取 .txt
+    if label_store:
+        num_images, num_instances = write_label_store(save_dir, outputs)
+        print(f"标签缓存已生成: {num_images} 张图像，{num_instances} 个目标")
 
 
 class SplitDatasetApp(QWidget):
@@ -300,6 +385,26 @@ class SplitDatasetApp(QWidget):
         self.testLabel = QLabel("测试集百分比:")
         self.testInput = QLineEdit("0.15")
 
+        # Stratified split
+        self.stratifyCheckBox = QCheckBox("按类别分层划分（读取 YOLO 标签）")
+
+        # Group-aware split
+        self.groupLabel = QLabel("分组方式（同组样本进入同一子集）:")
+        self.groupCombo = QComboBox()
+        self.groupCombo.addItem("不分组", None)
+        for group_mode in GROUP_MODES:
+            self.groupCombo.addItem(GROUP_MODE_NAMES[group_mode], group_mode)
+        self.groupArgInput = QLineEdit()
+        self.groupArgInput.setPlaceholderText(
+            "正则 / 清单文件路径 / 汉明距离阈值（留空使用默认值）"
+        )
+
+        # Manifest-only output
+        self.listOnlyCheckBox = QCheckBox("仅生成文件列表（不复制文件）")
+
+        # Packed label store
+        self.labelStoreCheckBox = QCheckBox("生成标签缓存（label_store/，可内存映射）")
+
         # Start button
         self.startButton = QPushButton("开始划分数据集并生成 YAML")
         self.startButton.clicked.connect(self.start_splitting)
@@ -330,6 +435,15 @@ class SplitDatasetApp(QWidget):
         layout.addWidget(self.testLabel)
         layout.addWidget(self.testInput)
 
+        layout.addWidget(self.stratifyCheckBox)
+
+        layout.addWidget(self.groupLabel)
+        layout.addWidget(self.groupCombo)
+        layout.addWidget(self.groupArgInput)
+
+        layout.addWidget(self.listOnlyCheckBox)
+        layout.addWidget(self.labelStoreCheckBox)
+
         layout.addWidget(self.startButton)
 
         self.setLayout(layout)
@@ -378,9 +492,19 @@ class SplitDatasetApp(QWidget):
             return
 
         split_dataset(
-            image_dir, txt_dir, save_dir, train_percent, val_percent, test_percent
+            image_dir,
+            txt_dir,
+            save_dir,
+            train_percent,
+            val_percent,
+            test_percent,
+            stratify=self.stratifyCheckBox.isChecked(),
+            group_mode=self.groupCombo.currentData(),
+            group_arg=self.groupArgInput.text().strip() or None,
+            list_only=self.listOnlyCheckBox.isChecked(),
+            label_store=self.labelStoreCheckBox.isChecked(),
         )
-        generate_yaml(class_file, save_dir)
+        generate_yaml(class_file, save_dir, self.listOnlyCheckBox.isChecked())
         QtWidgets.QMessageBox.information(
             self, "完成", "数据集划分和 YAML 文件生成完成！"
         )
@@ -0,0 +1,283 @@
+"""按类别分布分层划分
+
+功能说明：
+split_dataset.py、split_dataset_UI.py 和 yolo_dataset_all_in_one.py 共用的分层划分逻辑。
+长尾类别在纯随机划分下，验证集 / 测试集常常一个样本都分不到；这里使用迭代式多标签分层
+（Sechidis 等, 2011）：每轮挑选剩余样本最少的类别，把含该类别的样本逐个分配给
+"该类别缺口最大" 的子集，使每个类别在各子集中的占比都尽量接近划分比例。
+
+主要特性：
+- 标签解析：正则一次性取出每行的类别ID，直接转成 NumPy 数组，多线程读取
+- 解析结果缓存为 .npz（路径、mtime、大小、偏移量、类别ID），未变化的文件不再读取
+- 样本 × 类别计数矩阵、各子集类别直方图均用 NumPy 向量化计算
+"""
+
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# 标签解析缓存的默认文件名（保存在标签文件夹中）
+LABEL_CACHE_NAME = ".label_cache.npz"
+# 子集名称（与分配结果 0/1/2 对应）
+SPLIT_NAMES = ("train", "val", "test")
+
+# 每行行首的类别ID
+_CLASS_RE = re.compile(rb"^[ \t]*(\d+)", re.M)
+
+
+def parse_label_classes(path):
+    """读取一个 YOLO 标签文件中每个目标的类别ID
+
+    Returns:
+        int32 数组，文件不存在或为空时返回空数组
+    """
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return np.empty(0, dtype=np.int32)
+    return np.array(_CLASS_RE.findall(data), dtype=np.int64).astype(np.int32)
+
+
+def _read_cache(cache_path):
+    """读取解析缓存，返回 {路径: (mtime_ns, 大小, 类别数组)}"""
+    if not cache_path or not os.path.exists(cache_path):
+        return {}
+    try:
+        with np.load(cache_path) as data:
+            paths = data["paths"]
+            mtimes = data["mtimes"]
+            sizes = data["sizes"]
+            offsets = data["offsets"]
+            classes = data["classes"]
+    except (OSError, KeyError, ValueError):
+        return {}
+    return {
+        str(path): (int(mtimes[i]), int(sizes[i]), classes[offsets[i] : offsets[i + 1]])
+        for i, path in enumerate(paths)
+    }
+
+
+def _write_cache(cache_path, paths, mtimes, sizes, offsets, classes):
+    """原子写入解析缓存（标签文件夹只读时静默跳过）"""
+    tmp_path = cache_path + ".tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                paths=np.array(paths, dtype=str),
+                mtimes=np.array(mtimes, dtype=np.int64),
+                sizes=np.array(sizes, dtype=np.int64),
+                offsets=offsets,
+                classes=classes,
+            )
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def load_label_classes(label_paths, cache_path=None, max_workers=None):
+    """批量解析标签文件的类别ID（带缓存）
+
+    Args:
+        label_paths: 标签文件路径列表
+        cache_path: 缓存文件路径，None 表示不使用缓存
+        max_workers: 读取线程数
+
+    Returns:
+        (offsets, classes)：第 i 个文件的类别ID为 classes[offsets[i]:offsets[i+1]]
+    """
+    label_paths = [os.path.abspath(p) for p in label_paths]
+    cache = _read_cache(cache_path)
+
+    def load(path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return 0, 0, np.empty(0, dtype=np.int32), False
+        cached = cache.get(path)
+        if cached is not None and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+            return st.st_mtime_ns, st.st_size, cached[2], True
+        return st.st_mtime_ns, st.st_size, parse_label_classes(path), False
+
+    max_workers = max_workers or min(32, (os.cpu_count() or 4) * 4)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(load, label_paths))
+
+    lengths = np.fromiter((len(r[2]) for r in results), dtype=np.int64, count=len(results))
+    offsets = np.zeros(len(results) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    classes = (
+        np.concatenate([r[2] for r in results]).astype(np.int32)
+        if results
+        else np.empty(0, dtype=np.int32)
+    )
+
+    if cache_path and (len(cache) != len(results) or not all(r[3] for r in results)):
+        _write_cache(
+            cache_path,
+            label_paths,
+            [r[0] for r in results],
+            [r[1] for r in results],
+            offsets,
+            classes,
+        )
+    return offsets, classes
+
+
+def class_matrix(offsets, classes, num_classes=None):
+    """由 (offsets, classes) 构建 样本数 × 类别数 的目标计数矩阵"""
+    n = len(offsets) - 1
+    if num_classes is None:
+        num_classes = int(classes.max()) + 1 if len(classes) else 0
+    rows = np.repeat(np.arange(n), np.diff(offsets))
+    keep = classes < num_classes
+    flat = rows[keep] * num_classes + classes[keep]
+    counts = np.bincount(flat, minlength=n * num_classes)
+    return counts.reshape(n, num_classes).astype(np.int32)
+
+
+def iterative_stratify(matrix, ratios, seed=None, sizes=None):
+    """迭代式多标签分层划分
+
+    Args:
+        matrix: 样本数 × 类别数 的计数矩阵（按"是否包含该类别"分层）
+        ratios: 各子集比例，如 (0.7, 0.15, 0.15)
+        seed: 随机种子，None 表示每次随机
+        sizes: 每行代表的样本数（按组分层时为组大小），None 表示每行一个样本
+
+    Returns:
+        int8 数组，第 i 个样本所属子集的下标
+    """
+    n = matrix.shape[0]
+    ratios = np.asarray(ratios, dtype=np.float64)
+    ratios = ratios / ratios.sum()
+    rng = np.random.default_rng(seed)
+
+    presence = matrix > 0
+    assignment = np.full(n, -1, dtype=np.int8)
+    sizes = np.ones(n) if sizes is None else np.asarray(sizes, dtype=np.float64)
+    desired_samples = ratios * sizes.sum()
+    label_totals = presence.sum(axis=0)
+    desired = np.outer(ratios, label_totals)
+    remaining = label_totals.astype(np.int64)
+
+    # 样本 → 类别、类别 → 样本 两个方向的稀疏索引
+    rows, cols = np.nonzero(presence)
+    sample_offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n), out=sample_offsets[1:])
+    order = np.argsort(cols, kind="stable")
+    label_samples = rows[order]
+    label_offsets = np.zeros(matrix.shape[1] + 1, dtype=np.int64)
+    np.cumsum(np.bincount(cols, minlength=matrix.shape[1]), out=label_offsets[1:])
+
+    while True:
+        active = np.flatnonzero(remaining > 0)
+        if len(active) == 0:
+            break
+        # 剩余样本最少的类别优先，避免稀有类别被大类别"挤掉"
+        label = active[np.argmin(remaining[active])]
+        candidates = label_samples[label_offsets[label] : label_offsets[label + 1]]
+        candidates = candidates[assignment[candidates] < 0]
+        rng.shuffle(candidates)
+
+        for i in candidates:
+            need = desired[:, label]
+            best = np.flatnonzero(need == need.max())
+            if len(best) > 1:
+                fill = desired_samples[best]
+                best = best[fill == fill.max()]
+            split = best[0] if len(best) == 1 else rng.choice(best)
+
+            labels = cols[sample_offsets[i] : sample_offsets[i + 1]]
+            assignment[i] = split
+            desired_samples[split] -= sizes[i]
+            desired[split, labels] -= 1
+            remaining[labels] -= 1
+
+    # 没有任何目标的样本（背景图）按剩余名额分配
+    background = np.flatnonzero(assignment < 0)
+    rng.shuffle(background)
+    for i in background:
+        split = int(np.argmax(desired_samples))
+        assignment[i] = split
+        desired_samples[split] -= sizes[i]
+
+    return assignment
+
+
+def split_histogram(matrix, assignment, num_splits=len(SPLIT_NAMES)):
+    """各子集的类别目标数直方图
+
+    Returns:
+        子集数 × 类别数 的计数矩阵
+    """
+    return np.stack(
+        [matrix[assignment == s].sum(axis=0, dtype=np.int64) for s in range(num_splits)]
+    )
+
+
+def format_histogram(hist, class_names=None, split_names=SPLIT_NAMES, ratios=None):
+    """格式化各子集类别直方图（目标数及占该类别总数的百分比）
+
+    Args:
+        ratios: 各子集的划分比例，只对比例大于 0 的子集提示缺少类别；
+            None 时按直方图推断（没有任何目标的子集视为比例为 0）
+    """
+    totals = hist.sum(axis=0)
+    if ratios is None:
+        expected = hist.sum(axis=1) > 0
+    else:
+        expected = np.asarray(ratios, dtype=np.float64) > 1e-9
+    header = f"{'类别':<16}" + "".join(f"{name:>16}" for name in split_names)
+    lines = [header, "-" * len(header)]
+    for c in range(hist.shape[1]):
+        name = class_names[c] if class_names and c < len(class_names) else str(c)
+        cells = "".join(
+            f"{hist[s, c]:>8d} ({hist[s, c] / max(totals[c], 1) * 100:4.1f}%)"
+            for s in range(hist.shape[0])
+        )
+        lines.append(f"{name:<16}{cells}")
+        if totals[c] and (hist[expected, c] == 0).any():
+            lines[-1] += "  ⚠ 有子集缺少该类别"
+    return "\n".join(lines)
+
+
+def stratified_split_items(
+    items, label_paths, train_ratio, val_ratio, seed=None, cache_path=None, groups=None
+):
+    """按类别分布分层划分为训练集 / 验证集 / 测试集
+
+    Args:
+        items: 待划分的样本序列（文件名、路径或字典均可）
+        label_paths: 与 items 一一对应的 YOLO 标签文件路径
+        train_ratio: 训练集比例（0-1）
+        val_ratio: 验证集比例（0-1），测试集取剩余全部
+        seed: 随机种子，None 表示每次随机
+        cache_path: 标签解析缓存路径，None 表示不缓存
+        groups: 与 items 一一对应的组号，指定时按组分层（同组样本进入同一子集）
+
+    Returns:
+        (训练集列表, 验证集列表, 测试集列表, 各子集类别直方图)
+    """
+    items = list(items)
+    offsets, classes = load_label_classes(label_paths, cache_path)
+    matrix = class_matrix(offsets, classes)
+    test_ratio = max(0.0, 1.0 - train_ratio - val_ratio)
+    ratios = (train_ratio, val_ratio, test_ratio)
+    if groups is None:
+        assignment = iterative_stratify(matrix, ratios, seed)
+    else:
+        # 把样本计数矩阵按组求和，以组为单位分层，再展开回样本
+        groups = np.asarray(groups, dtype=np.int64)
+        sizes = np.bincount(groups)
+        group_matrix = np.zeros((len(sizes), matrix.shape[1]), dtype=np.int64)
+        np.add.at(group_matrix, groups, matrix)
+        assignment = iterative_stratify(group_matrix, ratios, seed, sizes=sizes)[groups]
+    splits = tuple(
+        [items[i] for i in np.flatnonzero(assignment == s)] for s in range(3)
+    )
+    return splits + (split_histogram(matrix, assignment),)
@@ -15,7 +15,7 @@
 
 工作流程：
 1. 扫描混合文件夹，识别图像和标签
-2. 匹配图像和标签文件
+2. 匹配图像和标签文件（可选：检查 / 修复标签内容）
 3. 按比例随机划分数据集
 4. 复制到标准 YOLO 目录结构
 5. 生成 dataset.yaml 配置文件
@@ -23,8 +23,6 @@
 
 import os
 import sys
-import shutil
-import random
 import yaml
 import subprocess
 from PyQt5.QtWidgets import (
@@ -47,6 +45,23 @@ from PyQt5.QtWidgets import (
 from PyQt5.QtCore import QThread, pyqtSignal, QProcess
 from PyQt5.QtGui import QFont
 
+from grouping import (
+    DEFAULT_MAX_DISTANCE,
+    GROUP_MODE_NAMES,
+    GROUP_MODES,
+    HASH_CACHE_NAME,
+    assign_groups,
+)
+from dataset_index import build_index
+from file_lists import dataset_yaml_data, write_file_lists
+from incremental import MANIFEST_NAME, sync_split
+from label_check import FIX_MODES, check_labels, load_class_count
+from label_store import LABEL_STORE_NAME, write_label_store
+from shards import DEFAULT_SHARD_SIZE, SHARD_DIR_NAME, write_shards
+from split_core import split_counts, split_groups, split_items, hash_split_items
+from stratify import LABEL_CACHE_NAME, format_histogram, stratified_split_items
+from transfer import TRANSFER_MODE_NAMES, TRANSFER_MODES, transfer_files
+
 
 class DatasetProcessor(QThread):
     """后台工作线程，执行数据集整理和划分"""
@@ -55,7 +70,24 @@ class DatasetProcessor(QThread):
     finished = pyqtSignal(bool, str)  # 完成信号 (成功/失败, 消息)
 
     def __init__(
-        self, source_dir, output_dir, class_file, train_ratio, val_ratio, test_ratio
+        self,
+        source_dir,
+        output_dir,
+        class_file,
+        train_ratio,
+        val_ratio,
+        test_ratio,
+        seed=None,
+        transfer_mode="copy",
+        stratify=False,
+        group_mode=None,
+        group_arg=None,
+        incremental=False,
+        list_only=False,
+        label_check=False,
+        label_fix=False,
+        label_store=False,
+        shard_size=None,
     ):
         super().__init__()
         self.source_dir = source_dir
@@ -64,6 +96,17 @@ class DatasetProcessor(QThread):
         self.train_ratio = train_ratio
         self.val_ratio = val_ratio
         self.test_ratio = test_ratio
+        self.seed = seed
+        self.transfer_mode = transfer_mode
+        self.stratify = stratify
+        self.group_mode = group_mode
+        self.group_arg = group_arg
+        self.incremental = incremental
+        self.list_only = list_only
+        self.label_check = label_check or label_fix
+        self.label_fix = label_fix
+        self.label_store = label_store
+        self.shard_size = shard_size
 
     def run(self):
         """执行完整的数据集处理流程"""
@@ -74,25 +117,10 @@ class DatasetProcessor(QThread):
             self.progress.emit("=" * 60 + "\n")
             self.progress.emit(f"源文件夹: {self.source_dir}\n\n")
 
-            image_extensions = {".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff"}
-            label_extension = ".txt"
-
-            image_files = {}  # {文件名(无扩展名): 完整路径}
-            label_files = {}  # {文件名(无扩展名): 完整路径}
-
-            for filename in os.listdir(self.source_dir):
-                file_path = os.path.join(self.source_dir, filename)
-
-                if os.path.isdir(file_path):
-                    continue
-
-                name_without_ext = os.path.splitext(filename)[0]
-                ext = os.path.splitext(filename)[1].lower()
-
-                if ext in image_extensions:
-                    image_files[name_without_ext] = file_path
-                elif ext == label_extension:
-                    label_files[name_without_ext] = file_path
+            # 随后要复制 / 移动文件，不使用索引缓存（缓存只按文件夹 mtime 校验）
+            index = build_index(self.source_dir, use_cache=False)
+            image_files = index.files("image")  # {文件名(无扩展名): 完整路径}
+            label_files = index.files("label")  # {文件名(无扩展名): 完整路径}
 
             self.progress.emit(f"✓ 找到 {len(image_files)} 个图像文件\n")
             self.progress.emit(f"✓ 找到 {len(label_files)} 个标签文件\n\n")
@@ -124,74 +152,228 @@ class DatasetProcessor(QThread):
             if orphan_label > 0:
                 self.progress.emit(f"⚠ 警告: {orphan_label} 个标签没有对应图像\n")
 
+            # 可选：划分前检查标签内容（类别ID按 classes.txt 检查）
+            if self.label_check:
+                self.progress.emit("\n正在检查标签内容...\n")
+                report = check_labels(
+                    [pair["label"] for pair in matched_pairs],
+                    num_classes=load_class_count(self.class_file),
+                    fix=FIX_MODES if self.label_fix else (),
+                )
+                self.progress.emit(report.format() + "\n")
+                if report.has_issues and not self.label_fix:
+                    self.progress.emit("⚠ 标签存在问题，继续处理（可勾选“自动修复标签”）\n")
+
             # 步骤2: 划分数据集
             self.progress.emit("\n" + "=" * 60 + "\n")
             self.progress.emit("步骤 2/4: 划分数据集\n")
             self.progress.emit("=" * 60 + "\n")
 
             total = len(matched_pairs)
-            num_train = int(total * self.train_ratio)
-            num_val = int(total * self.val_ratio)
-            num_test = total - num_train - num_val
+            num_train, num_val, num_test = split_counts(
+                total, self.train_ratio, self.val_ratio
+            )
 
             self.progress.emit(f"总样本数: {total}\n")
             self.progress.emit(f"训练集: {num_train} ({self.train_ratio*100:.1f}%)\n")
             self.progress.emit(f"验证集: {num_val} ({self.val_ratio*100:.1f}%)\n")
             self.progress.emit(f"测试集: {num_test} ({self.test_ratio*100:.1f}%)\n\n")
 
-            # 随机打乱并划分
-            random.shuffle(matched_pairs)
-            train_pairs = matched_pairs[:num_train]
-            val_pairs = matched_pairs[num_train : num_train + num_val]
-            test_pairs = matched_pairs[num_train + num_val :]
+            if self.incremental:
+                # 增量模式按名称哈希分桶，已有样本的归属在多次运行间保持不变
+                if self.stratify or self.group_mode:
+                    self.progress.emit("⚠ 增量模式按名称哈希划分，忽略分层 / 分组设置\n")
+                train_pairs, val_pairs, test_pairs = hash_split_items(
+                    matched_pairs,
+                    [pair["name"] for pair in matched_pairs],
+                    self.train_ratio,
+                    self.val_ratio,
+                )
+                self.progress.emit(
+                    f"实际划分: 训练集 {len(train_pairs)} / 验证集 {len(val_pairs)} / "
+                    f"测试集 {len(test_pairs)}\n\n"
+                )
+            else:
+                # 分组：同一组（如同一段视频）的样本整体进入同一个子集
+                groups = None
+                if self.group_mode:
+                    self.progress.emit(
+                        f"正在按{GROUP_MODE_NAMES[self.group_mode]}分组...\n"
+                    )
+                    groups = assign_groups(
+                        [pair["image"] for pair in matched_pairs],
+                        self.group_mode,
+                        pattern=self.group_arg if self.group_mode == "regex" else None,
+                        manifest=self.group_arg if self.group_mode == "manifest" else None,
+                        max_distance=(
+                            int(self.group_arg)
+                            if self.group_mode == "phash" and self.group_arg
+                            else DEFAULT_MAX_DISTANCE
+                        ),
+                        cache_path=os.path.join(self.source_dir, HASH_CACHE_NAME),
+                    )
+                    self.progress.emit(f"✓ 共 {len(set(groups.tolist()))} 个分组\n\n")
+
+                if self.stratify:
+                    # 按类别分布分层划分，并报告各子集的类别直方图
+                    self.progress.emit("正在解析标签并按类别分层划分...\n")
+                    train_pairs, val_pairs, test_pairs, hist = stratified_split_items(
+                        matched_pairs,
+                        [pair["label"] for pair in matched_pairs],
+                        self.train_ratio,
+                        self.val_ratio,
+                        seed=self.seed,
+                        cache_path=os.path.join(self.source_dir, LABEL_CACHE_NAME),
+                        groups=groups,
+                    )
+                    try:
+                        with open(self.class_file, "r", encoding="utf-8") as f:
+                            class_names = [line.strip() for line in f if line.strip()]
+                    except OSError:
+                        class_names = None
+                    self.progress.emit(
+                        f"实际划分: 训练集 {len(train_pairs)} / 验证集 {len(val_pairs)} / "
+                        f"测试集 {len(test_pairs)}\n\n"
+                    )
+                    self.progress.emit(
+                        format_histogram(
+                            hist,
+                            class_names,
+                            ratios=(self.train_ratio, self.val_ratio, self.test_ratio),
+                        )
+                        + "\n\n"
+                    )
+                elif groups is not None:
+                    # 按组随机划分
+                    train_pairs, val_pairs, test_pairs = split_groups(
+                        matched_pairs, groups, self.train_ratio, self.val_ratio, seed=self.seed
+                    )
+                    self.progress.emit(
+                        f"实际划分: 训练集 {len(train_pairs)} / 验证集 {len(val_pairs)} / "
+                        f"测试集 {len(test_pairs)}\n\n"
+                    )
+                else:
+                    # 随机打乱并划分
+                    train_pairs, val_pairs, test_pairs = split_items(
+                        matched_pairs, self.train_ratio, self.val_ratio, seed=self.seed
+                    )
 
             # 步骤3: 创建目录结构并复制文件
             self.progress.emit("=" * 60 + "\n")
             self.progress.emit("步骤 3/4: 创建 YOLO 标准目录结构\n")
             self.progress.emit("=" * 60 + "\n")
 
-            # 创建目录
-            images_dir = os.path.join(self.output_dir, "images")
-            labels_dir = os.path.join(self.output_dir, "labels")
-
-            img_train = os.path.join(images_dir, "train")
-            img_val = os.path.join(images_dir, "val")
-            img_test = os.path.join(images_dir, "test")
-
-            label_train = os.path.join(labels_dir, "train")
-            label_val = os.path.join(labels_dir, "val")
-            label_test = os.path.join(labels_dir, "test")
-
-            for path in [
-                img_train,
-                img_val,
-                img_test,
-                label_train,
-                label_val,
-                label_test,
-            ]:
-                os.makedirs(path, exist_ok=True)
-
-            self.progress.emit(f"✓ 创建目录结构完成\n\n")
-            self.progress.emit("正在复制文件...\n")
-
-            # 复制文件
-            def copy_pairs(pairs, img_dest, label_dest, dataset_name):
-                for i, pair in enumerate(pairs, 1):
-                    img_name = os.path.basename(pair["image"])
-                    label_name = os.path.basename(pair["label"])
-
-                    shutil.copy2(pair["image"], os.path.join(img_dest, img_name))
-                    shutil.copy2(pair["label"], os.path.join(label_dest, label_name))
-
-                    if i % 50 == 0 or i == len(pairs):
-                        self.progress.emit(f"  {dataset_name}: {i}/{len(pairs)}\n")
+            if self.list_only:
+                # 只写出 train.txt / val.txt / test.txt，不复制任何文件
+                counts, linked = write_file_lists(
+                    self.output_dir,
+                    {
+                        "train": [(p["image"], p["label"]) for p in train_pairs],
+                        "val": [(p["image"], p["label"]) for p in val_pairs],
+                        "test": [(p["image"], p["label"]) for p in test_pairs],
+                    },
+                )
+                self.progress.emit(
+                    f"✓ 已生成文件列表: train.txt {counts['train']} / "
+                    f"val.txt {counts['val']} / test.txt {counts['test']}\n"
+                )
+                if linked:
+                    self.progress.emit(
+                        f"  {linked} 个样本的标签不在 Ultralytics 推导位置，"
+                        f"已在 links/ 下建立链接\n"
+                    )
+            else:
+                # 创建目录
+                images_dir = os.path.join(self.output_dir, "images")
+                labels_dir = os.path.join(self.output_dir, "labels")
+
+                img_train = os.path.join(images_dir, "train")
+                img_val = os.path.join(images_dir, "val")
+                img_test = os.path.join(images_dir, "test")
+
+                label_train = os.path.join(labels_dir, "train")
+                label_val = os.path.join(labels_dir, "val")
+                label_test = os.path.join(labels_dir, "test")
+
+                for path in [
+                    img_train,
+                    img_val,
+                    img_test,
+                    label_train,
+                    label_val,
+                    label_test,
+                ]:
+                    os.makedirs(path, exist_ok=True)
+
+                self.progress.emit(f"✓ 创建目录结构完成\n\n")
+                if self.incremental:
+                    # 只同步新增 / 变化 / 换子集 / 已删除的样本
+                    self.progress.emit("正在对比划分清单，增量同步文件...\n")
+                    assignments = (
+                        [(pair, "train") for pair in train_pairs]
+                        + [(pair, "val") for pair in val_pairs]
+                        + [(pair, "test") for pair in test_pairs]
+                    )
+                    report = sync_split(
+                        assignments,
+                        self.output_dir,
+                        (self.train_ratio, self.val_ratio, self.test_ratio),
+                        transfer_mode=self.transfer_mode,
+                        progress_callback=lambda st: self.progress.emit(f"  {st.format()}\n"),
+                    )
+                    self.progress.emit(f"  {report.format()}\n")
+                else:
+                    # 全量输出后旧的增量清单不再可信
+                    manifest_path = os.path.join(self.output_dir, MANIFEST_NAME)
+                    if os.path.exists(manifest_path):
+                        os.remove(manifest_path)
+
+                    mode_name = TRANSFER_MODE_NAMES[self.transfer_mode]
+                    self.progress.emit(f"正在{mode_name}文件...\n")
+
+                    # 三个子集的图像和标签合并为一批，由传输引擎并行处理
+                    jobs = []
+                    for pairs, img_dest, label_dest in (
+                        (train_pairs, img_train, label_train),
+                        (val_pairs, img_val, label_val),
+                        (test_pairs, img_test, label_test),
+                    ):
+                        for pair in pairs:
+                            img_name = os.path.basename(pair["image"])
+                            label_name = os.path.basename(pair["label"])
+                            jobs.append((pair["image"], os.path.join(img_dest, img_name)))
+                            jobs.append((pair["label"], os.path.join(label_dest, label_name)))
+
+                    stats = transfer_files(
+                        jobs,
+                        mode=self.transfer_mode,
+                        progress_callback=lambda st: self.progress.emit(f"  {st.format()}\n"),
+                    )
+                    self.progress.emit(
+                        f"  共 {stats.bytes / (1024 * 1024):.1f} MB，耗时 {stats.elapsed:.2f}s\n"
+                    )
 
-            copy_pairs(train_pairs, img_train, label_train, "训练集")
-            copy_pairs(val_pairs, img_val, label_val, "验证集")
-            copy_pairs(test_pairs, img_test, label_test, "测试集")
+                self.progress.emit("\n✓ 文件复制完成\n")
 
-            self.progress.emit("\n✓ 文件复制完成\n")
+            # 可选：每个子集另外打包为 tar 分片（WebDataset 格式），从源文件读取
+            if self.shard_size:
+                self.progress.emit(
+                    f"\n正在导出 tar 分片（每片不超过 {self.shard_size // (1024 * 1024)} MB）...\n"
+                )
+                shard_counts = write_shards(
+                    self.output_dir,
+                    {
+                        "train": [(p["image"], p["label"]) for p in train_pairs],
+                        "val": [(p["image"], p["label"]) for p in val_pairs],
+                        "test": [(p["image"], p["label"]) for p in test_pairs],
+                    },
+                    max_shard_bytes=self.shard_size,
+                    progress_callback=lambda st: self.progress.emit(f"  {st.format()}\n"),
+                )
+                self.progress.emit(
+                    f"✓ 分片已写入 {SHARD_DIR_NAME}/: train {shard_counts['train']} 个 / "
+                    f"val {shard_counts['val']} 个 / test {shard_counts['test']} 个\n"
+                )
 
             # 步骤4: 生成 YAML 配置文件
             self.progress.emit("\n" + "=" * 60 + "\n")
@@ -207,14 +389,8 @@ class DatasetProcessor(QThread):
                 self.finished.emit(False, f"读取类别文件失败: {e}")
                 return
 
-            # 生成 YAML
-            yaml_data = {
-                "path": os.path.normpath(self.output_dir),
-                "train": "images/train",
-                "val": "images/val",
-                "test": "images/test",
-                "names": {i: cat for i, cat in enumerate(categories)},
-            }
+            # 生成 YAML（文件列表模式下 train / val / test 指向 .txt 列表）
+            yaml_data = dataset_yaml_data(self.output_dir, categories, self.list_only)
 
             yaml_file = os.path.join(self.output_dir, "dataset.yaml")
             with open(yaml_file, "w", encoding="utf-8") as f:
@@ -227,6 +403,29 @@ class DatasetProcessor(QThread):
                 )
 
             self.progress.emit(f"✓ YAML 文件已生成: {yaml_file}\n")
+
+            # 可选：在 dataset.yaml 旁打包标签缓存，训练时无需逐个读取 .txt
+            if self.label_store:
+                splits = {}
+                for split, pairs in (
+                    ("train", train_pairs),
+                    ("val", val_pairs),
+                    ("test", test_pairs),
+                ):
+                    if self.list_only:
+                        splits[split] = [(p["image"], p["label"]) for p in pairs]
+                    else:
+                        splits[split] = [
+                            (
+                                os.path.join(self.output_dir, "images", split, os.path.basename(p["image"])),
+                                os.path.join(self.output_dir, "labels", split, os.path.basename(p["label"])),
+                            )
+                            for p in pairs
+                        ]
+                num_images, num_instances = write_label_store(self.output_dir, splits)
+                self.progress.emit(
+                    f"✓ 标签缓存已生成: {LABEL_STORE_NAME}/（{num_images} 张图像，{num_instances} 个目标）\n"
+                )
             self.progress.emit(f"\n类别数量: {len(categories)}\n")
             for i, cat in enumerate(categories):
                 self.progress.emit(f"  {i}: {cat}\n")
@@ -236,9 +435,9 @@ class DatasetProcessor(QThread):
             self.progress.emit("✓ 数据集处理完成！\n")
             self.progress.emit("=" * 60 + "\n")
             self.progress.emit(f"\n输出目录: {self.output_dir}\n")
-            self.progress.emit(f"训练集: {num_train} 张\n")
-            self.progress.emit(f"验证集: {num_val} 张\n")
-            self.progress.emit(f"测试集: {num_test} 张\n")
+            self.progress.emit(f"训练集: {len(train_pairs)} 张\n")
+            self.progress.emit(f"验证集: {len(val_pairs)} 张\n")
+            self.progress.emit(f"测试集: {len(test_pairs)} 张\n")
             self.progress.emit(f"\n可以使用以下命令开始训练:\n")
             self.progress.emit(
                 f"yolo train data={yaml_file} model=yolov8n.pt epochs=100\n"
@@ -396,6 +595,60 @@ class YOLODatasetApp(QWidget):
         output_dir_layout.addWidget(self.output_btn)
         output_layout.addLayout(output_dir_layout)
 
+        # 文件传输方式
+        mode_layout = QHBoxLayout()
+        mode_layout.addWidget(QLabel("文件传输方式:"))
+        self.transfer_combo = QComboBox()
+        for mode in TRANSFER_MODES:
+            if mode != "move":
+                self.transfer_combo.addItem(TRANSFER_MODE_NAMES[mode], mode)
+        self.transfer_combo.setToolTip("硬链接/reflink 不占用额外磁盘空间，不支持时自动回退为复制")
+        self.transfer_combo.setMaximumWidth(150)
+        mode_layout.addWidget(self.transfer_combo)
+        self.list_only_checkbox = QCheckBox("仅生成文件列表（不复制文件）")
+        self.list_only_checkbox.setToolTip(
+            "写出 train.txt / val.txt / test.txt（图像绝对路径）和 dataset.yaml，不复制图像"
+        )
+        self.list_only_checkbox.toggled.connect(
+            lambda checked: self.transfer_combo.setEnabled(not checked)
+        )
+        mode_layout.addWidget(self.list_only_checkbox)
+        self.label_check_checkbox = QCheckBox("检查标签")
+        self.label_check_checkbox.setToolTip(
+            "划分前检查格式错误、类别ID越界、坐标超出 [0, 1]、零面积框和重复行"
+        )
+        mode_layout.addWidget(self.label_check_checkbox)
+        self.label_fix_checkbox = QCheckBox("自动修复标签")
+        self.label_fix_checkbox.setToolTip(
+            "裁剪越界坐标、删除重复行和无法修复的行（直接修改源标签文件）"
+        )
+        mode_layout.addWidget(self.label_fix_checkbox)
+        self.label_store_checkbox = QCheckBox("生成标签缓存")
+        self.label_store_checkbox.setToolTip(
+            "在 dataset.yaml 旁写出 label_store/（所有标签打包为可内存映射的数组）"
+        )
+        mode_layout.addWidget(self.label_store_checkbox)
+        mode_layout.addStretch()
+        output_layout.addLayout(mode_layout)
+
+        # tar 分片导出
+        shard_layout = QHBoxLayout()
+        self.shard_checkbox = QCheckBox("导出 tar 分片（WebDataset）")
+        self.shard_checkbox.setToolTip(
+            "每个子集另外打包为 shards/{子集}-000000.tar 等分片，并写出样本偏移索引"
+        )
+        shard_layout.addWidget(self.shard_checkbox)
+        shard_layout.addWidget(QLabel("分片大小:"))
+        self.shard_size_spin = QSpinBox()
+        self.shard_size_spin.setRange(16, 16384)
+        self.shard_size_spin.setValue(DEFAULT_SHARD_SIZE // (1024 * 1024))
+        self.shard_size_spin.setSuffix(" MB")
+        self.shard_size_spin.setEnabled(False)
+        self.shard_checkbox.toggled.connect(self.shard_size_spin.setEnabled)
+        shard_layout.addWidget(self.shard_size_spin)
+        shard_layout.addStretch()
+        output_layout.addLayout(shard_layout)
+
         output_group.setLayout(output_layout)
         layout.addWidget(output_group)
 
@@ -418,6 +671,30 @@ class YOLODatasetApp(QWidget):
         self.test_input.setMaximumWidth(80)
         ratio_layout.addWidget(self.test_input)
 
+        self.stratify_checkbox = QCheckBox("按类别分层划分")
+        self.stratify_checkbox.setToolTip(
+            "读取 YOLO 标签，使每个类别在训练/验证/测试集中的占比都接近划分比例"
+        )
+        ratio_layout.addWidget(self.stratify_checkbox)
+
+        ratio_layout.addWidget(QLabel("分组:"))
+        self.group_combo = QComboBox()
+        self.group_combo.addItem("不分组", None)
+        for group_mode in GROUP_MODES:
+            self.group_combo.addItem(GROUP_MODE_NAMES[group_mode], group_mode)
+        self.group_combo.setToolTip("同一组（如同一段视频的帧）的样本整体进入同一个子集")
+        ratio_layout.addWidget(self.group_combo)
+        self.group_arg_input = QLineEdit()
+        self.group_arg_input.setPlaceholderText("正则 / 清单路径 / 距离阈值")
+        self.group_arg_input.setMaximumWidth(180)
+        ratio_layout.addWidget(self.group_arg_input)
+
+        self.incremental_checkbox = QCheckBox("增量更新")
+        self.incremental_checkbox.setToolTip(
+            "按名称哈希稳定划分，只复制新增或内容变化的文件（记录在 split_manifest.json）"
+        )
+        ratio_layout.addWidget(self.incremental_checkbox)
+
         ratio_layout.addStretch()
         ratio_group.setLayout(ratio_layout)
         layout.addWidget(ratio_group)
@@ -817,7 +1094,26 @@ class YOLODatasetApp(QWidget):
 
         # 创建并启动工作线程
         self.worker = DatasetProcessor(
-            source_dir, output_dir, class_file, train_ratio, val_ratio, test_ratio
+            source_dir,
+            output_dir,
+            class_file,
+            train_ratio,
+            val_ratio,
+            test_ratio,
+            transfer_mode=self.transfer_combo.currentData(),
+            stratify=self.stratify_checkbox.isChecked(),
+            group_mode=self.group_combo.currentData(),
+            group_arg=self.group_arg_input.text().strip() or None,
+            incremental=self.incremental_checkbox.isChecked(),
+            list_only=self.list_only_checkbox.isChecked(),
+            label_check=self.label_check_checkbox.isChecked(),
+            label_fix=self.label_fix_checkbox.isChecked(),
+            label_store=self.label_store_checkbox.isChecked(),
+            shard_size=(
+                self.shard_size_spin.value() * 1024 * 1024
+                if self.shard_checkbox.isChecked()
+                else None
+            ),
         )
         self.worker.progress.connect(self.update_log)
         self.worker.finished.connect(self.on_finished)
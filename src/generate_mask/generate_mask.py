@@ -1,54 +1,433 @@
+"""LabelMe JSON → 掩码图像
+
+功能说明：
+根据 LabelMe 标注（格式见同目录下的 4.json）生成掩码。支持单个文件和整个文件夹批量处理。
+
+主要特性：
+- 掩码尺寸直接取 JSON 中的 imageHeight / imageWidth，不再解码原图（缺失时才读取原图）
+- 语义掩码：未指定类别文件时所有目标填充为 255；指定 classes.txt 时像素值为 类别ID + 1，
+  0 为背景
+- 实例掩码（uint16）：每个目标一个编号（1, 2, ...），group_id 相同的形状属于同一实例
+- 支持 polygon / rectangle / circle / line / linestrip / point
+- 批量模式用进程池并行处理；输出为逐张 PNG、打包为一个可内存映射的 .npy 数组，
+  或游程编码（COCO RLE，见 mask_rle.py）保存为一个 JSON
+- export_coco：整个文件夹导出为 COCO 格式 JSON，每个目标只在其外接框内光栅化后直接
+  编码为 RLE，不创建整幅画布
+"""
+
 import json
-import numpy as np
-import cv2
 import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import cv2
+import numpy as np
+
+import mask_rle
+
+MASK_KINDS = ("semantic", "instance")
+OUTPUT_FORMATS = ("png", "npy", "rle")
+
+# rle 格式的输出文件名
+RLE_FILE_NAME = "masks_rle.json"
+
+# 线段类形状的绘制宽度（像素），点绘制为该直径的圆
+LINE_WIDTH = 3
 
 
 # 读取 JSON 文件
 def load_json(json_path):
-    with open(json_path, "r") as f:
+    with open(json_path, "r", encoding="utf-8") as f:
         data = json.load(f)
     return data
 
 
-# 创建掩码图像
-def create_mask(json_data, image_shape):
+# 读取类别文件：{类别名: 类别ID}
+def load_class_names(class_file):
+    with open(class_file, "r", encoding="utf-8") as f:
+        names = [line.strip() for line in f if line.strip()]
+    return {name: i for i, name in enumerate(names)}
+
+
+# 掩码尺寸 (高, 宽)：优先使用 JSON 中记录的尺寸
+def mask_shape(json_data, image_dir=None):
+    height, width = json_data.get("imageHeight"), json_data.get("imageWidth")
+    if height and width:
+        return height, width
+    image_path = os.path.join(image_dir or "", json_data["imagePath"])
+    image = cv2.imread(image_path)
+    if image is None:
+        raise ValueError(f"无法读取图像：{image_path}")
+    return image.shape[:2]
+
+
+# 在掩码上绘制一个形状
+def draw_shape(mask, shape, color, line_width=LINE_WIDTH):
+    kind = shape.get("shape_type") or "polygon"
+    points = np.array(shape["points"], dtype=np.float64).reshape(-1, 2)
+    pts = np.round(points).astype(np.int32)
+    if kind == "polygon" and len(pts) >= 3:
+        cv2.fillPoly(mask, [pts], color=color)
+    elif kind == "rectangle" and len(pts) >= 2:
+        cv2.rectangle(mask, tuple(pts[0]), tuple(pts[1]), color=color, thickness=-1)
+    elif kind == "circle" and len(pts) >= 2:
+        radius = int(round(np.hypot(*(points[1] - points[0]))))
+        cv2.circle(mask, tuple(pts[0]), radius, color=color, thickness=-1)
+    elif kind in ("line", "linestrip") and len(pts) >= 2:
+        cv2.polylines(mask, [pts], isClosed=False, color=color, thickness=line_width)
+    elif kind in ("point", "points") and len(pts) >= 1:
+        for p in pts:
+            cv2.circle(mask, tuple(p), max(line_width // 2, 1), color=color, thickness=-1)
+    else:
+        return False
+    return True
+
+
+# 创建语义掩码：class_ids 为 None 时所有目标填充为 255，否则为 类别ID + 1
+def create_mask(json_data, image_shape, class_ids=None):
     mask = np.zeros(
         image_shape[:2], dtype=np.uint8
     )  # 创建与原图像大小相同的黑色掩码图像
 
     for shape in json_data["shapes"]:
-        if shape["shape_type"] == "polygon":
-            points = np.array(shape["points"], dtype=np.int32)
-            cv2.fillPoly(mask, [points], color=255)  # 用白色填充多边形
+        if class_ids is None:
+            color = 255
+        elif shape["label"] in class_ids:
+            color = class_ids[shape["label"]] + 1
+        else:
+            continue
+        draw_shape(mask, shape, color)
+
+    return mask
 
+
+# 创建实例掩码（uint16）：每个目标一个编号，group_id 相同的形状共用编号
+def create_instance_mask(json_data, image_shape, class_ids=None):
+    mask = np.zeros(image_shape[:2], dtype=np.uint16)
+    groups = {}
+    for shape in json_data["shapes"]:
+        if class_ids is not None and shape["label"] not in class_ids:
+            continue
+        group_id = shape.get("group_id")
+        if group_id is None:
+            instance = len(groups) + 1
+            groups[("shape", id(shape))] = instance
+        else:
+            key = ("group", shape["label"], group_id)
+            instance = groups.setdefault(key, len(groups) + 1)
+        draw_shape(mask, shape, int(instance))
     return mask
 
 
-# 主函数：读取 JSON 和原图像，生成掩码
+# 处理一个 JSON：返回 {掩码类型: 掩码}
+def render_masks(json_path, kinds=("semantic",), class_ids=None):
+    json_data = load_json(json_path)
+    shape = mask_shape(json_data, os.path.dirname(json_path))
+    masks = {}
+    if "semantic" in kinds:
+        masks["semantic"] = create_mask(json_data, shape, class_ids)
+    if "instance" in kinds:
+        masks["instance"] = create_instance_mask(json_data, shape, class_ids)
+    return masks
+
+
+def _png_job(json_path, output_dir, kinds, class_ids):
+    """进程池任务：生成掩码并写为 PNG（实例掩码为 16 位 PNG）"""
+    try:
+        stem = os.path.splitext(os.path.basename(json_path))[0]
+        for kind, mask in render_masks(json_path, kinds, class_ids).items():
+            cv2.imwrite(os.path.join(output_dir, kind, f"{stem}.png"), mask)
+        return None
+    except (OSError, ValueError, KeyError) as e:
+        return f"{json_path}: {e}"
+
+
+def _rle_job(json_path, kinds, class_ids):
+    """进程池任务：生成掩码并编码为 ([高, 宽], {掩码类型: {像素值: RLE}})"""
+    try:
+        masks = render_masks(json_path, kinds, class_ids)
+        size = list(next(iter(masks.values())).shape)
+        return size, {kind: mask_rle.encode_labels(mask) for kind, mask in masks.items()}, None
+    except (OSError, ValueError, KeyError) as e:
+        return None, None, f"{json_path}: {e}"
+
+
+def _npy_job(job, output_dir, kinds, class_ids, shape):
+    """进程池任务：生成掩码并写入打包数组的第 i 个位置"""
+    i, json_path = job
+    try:
+        for kind, mask in render_masks(json_path, kinds, class_ids).items():
+            if mask.shape != shape:
+                return f"{json_path}: 尺寸 {mask.shape} 与第一张 {shape} 不一致"
+            array = np.load(os.path.join(output_dir, f"{kind}.npy"), mmap_mode="r+")
+            array[i] = mask
+            array.flush()
+            del array
+        return None
+    except (OSError, ValueError, KeyError) as e:
+        return f"{json_path}: {e}"
+
+
+def generate_masks(
+    json_dir,
+    output_dir,
+    class_file=None,
+    kinds=("semantic",),
+    output_format="png",
+    max_workers=None,
+):
+    """批量生成掩码
+
+    Args:
+        json_dir: LabelMe JSON 文件夹
+        output_dir: 输出文件夹；png 格式写入 {掩码类型}/{文件名}.png，
+            npy 格式写入 {掩码类型}.npy（N × H × W）和 index.json（第 i 张对应的 JSON 文件名），
+            rle 格式写入 masks_rle.json（{"images": [JSON 文件名], "sizes": [[高, 宽]],
+            掩码类型: [{像素值: RLE}]}，用 mask_rle.decode_labels 还原）
+        class_file: classes.txt，None 表示所有目标填充为 255（实例掩码不受影响）
+        kinds: 要生成的掩码类型，见 MASK_KINDS
+        output_format: "png"、"npy"（要求所有图像尺寸相同）或 "rle"
+        max_workers: 进程数，默认为 CPU 核数
+
+    Returns:
+        (处理的 JSON 数, [错误信息])
+    """
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"不支持的输出格式: {output_format}")
+    json_files = sorted(
+        os.path.join(json_dir, name)
+        for name in os.listdir(json_dir)
+        if name.lower().endswith(".json")
+    )
+    if not json_files:
+        return 0, []
+    class_ids = load_class_names(class_file) if class_file else None
+    max_workers = max_workers or os.cpu_count() or 4
+    chunksize = max(1, min(64, len(json_files) // (max_workers * 8)))
+    os.makedirs(output_dir, exist_ok=True)
+
+    if output_format == "png":
+        for kind in kinds:
+            os.makedirs(os.path.join(output_dir, kind), exist_ok=True)
+        worker = partial(_png_job, output_dir=output_dir, kinds=kinds, class_ids=class_ids)
+        jobs = json_files
+    elif output_format == "rle":
+        worker = partial(_rle_job, kinds=kinds, class_ids=class_ids)
+        result = {"images": [os.path.basename(p) for p in json_files], "sizes": []}
+        result.update({kind: [] for kind in kinds})
+        errors = []
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            for size, rles, error in executor.map(worker, json_files, chunksize=chunksize):
+                if error:
+                    errors.append(error)
+                result["sizes"].append(size or [0, 0])
+                for kind in kinds:
+                    result[kind].append(rles[kind] if rles else {})
+        with open(os.path.join(output_dir, RLE_FILE_NAME), "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, separators=(",", ":"))
+        return len(json_files), errors
+    else:
+        # 以第一张的尺寸预先创建打包数组，各进程按下标写入
+        shape = tuple(mask_shape(load_json(json_files[0]), json_dir))
+        for kind in kinds:
+            dtype = np.uint16 if kind == "instance" else np.uint8
+            np.lib.format.open_memmap(
+                os.path.join(output_dir, f"{kind}.npy"),
+                mode="w+",
+                dtype=dtype,
+                shape=(len(json_files),) + shape,
+            ).flush()
+        with open(os.path.join(output_dir, "index.json"), "w", encoding="utf-8") as f:
+            json.dump([os.path.basename(p) for p in json_files], f, ensure_ascii=False)
+        worker = partial(
+            _npy_job, output_dir=output_dir, kinds=kinds, class_ids=class_ids, shape=shape
+        )
+        jobs = list(enumerate(json_files))
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        errors = [e for e in executor.map(worker, jobs, chunksize=chunksize) if e]
+    return len(json_files), errors
+
+
+# 单个形状 → 整幅图像的 RLE：只在形状的外接框内光栅化
+def shape_to_rle(shape, height, width, line_width=LINE_WIDTH):
+    points = np.array(shape["points"], dtype=np.float64).reshape(-1, 2)
+    if not len(points):
+        return None
+    kind = shape.get("shape_type") or "polygon"
+    if kind == "circle" and len(points) >= 2:
+        radius = np.ceil(np.hypot(*(points[1] - points[0]))) + 1
+        lo, hi = points[0] - radius, points[0] + radius
+    else:
+        lo, hi = points.min(axis=0) - line_width, points.max(axis=0) + line_width
+    x0, y0 = max(int(np.floor(lo[0])), 0), max(int(np.floor(lo[1])), 0)
+    x1, y1 = min(int(np.ceil(hi[0])) + 1, width), min(int(np.ceil(hi[1])) + 1, height)
+    if x1 <= x0 or y1 <= y0:
+        return None
+    local = np.zeros((y1 - y0, x1 - x0), dtype=np.uint8)
+    shifted = dict(shape, points=(points - (x0, y0)).tolist())
+    if not draw_shape(local, shifted, 1, line_width):
+        return None
+    return mask_rle.crop_to_rle(local, x0, y0, height, width)
+
+
+def _coco_job(json_path, class_ids):
+    """进程池任务：一个 JSON → (图像记录, [标注], 未知标签列表, 错误信息)"""
+    try:
+        json_data = load_json(json_path)
+        height, width = mask_shape(json_data, os.path.dirname(json_path))
+        image = {"file_name": json_data["imagePath"], "height": height, "width": width}
+        annotations, unknown = [], []
+        for shape in json_data["shapes"]:
+            if shape["label"] not in class_ids:
+                unknown.append(shape["label"])
+                continue
+            rle = shape_to_rle(shape, height, width)
+            if rle is None or mask_rle.area(rle) == 0:
+                continue
+            annotations.append(
+                {
+                    "category_id": class_ids[shape["label"]] + 1,
+                    "segmentation": mask_rle.compress(rle),
+                    "area": mask_rle.area(rle),
+                    "bbox": mask_rle.to_bbox(rle),
+                    "iscrowd": 0,
+                }
+            )
+        return image, annotations, unknown, None
+    except (OSError, ValueError, KeyError) as e:
+        return None, [], [], f"{json_path}: {e}"
+
+
+def export_coco(json_dir, output_path, class_file, max_workers=None):
+    """把文件夹中的 LabelMe JSON 导出为一个 COCO 格式 JSON（分割为压缩 RLE）
+
+    Args:
+        json_dir: LabelMe JSON 文件夹
+        output_path: 输出的 COCO JSON 路径
+        class_file: classes.txt，category_id 为 类别ID + 1
+        max_workers: 进程数，默认为 CPU 核数
+
+    Returns:
+        (图像数, 标注数, {未知标签: 次数}, [错误信息])
+    """
+    json_files = sorted(
+        os.path.join(json_dir, name)
+        for name in os.listdir(json_dir)
+        if name.lower().endswith(".json")
+    )
+    class_ids = load_class_names(class_file)
+    max_workers = max_workers or os.cpu_count() or 4
+    chunksize = max(1, min(64, len(json_files) // (max_workers * 8)))
+
+    images, annotations, unknown, errors = [], [], {}, []
+    worker = partial(_coco_job, class_ids=class_ids)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        for image, anns, labels, error in executor.map(worker, json_files, chunksize=chunksize):
+            if error:
+                errors.append(error)
+                continue
+            image["id"] = len(images) + 1
+            images.append(image)
+            for ann in anns:
+                ann["id"] = len(annotations) + 1
+                ann["image_id"] = image["id"]
+                annotations.append(ann)
+            for label in labels:
+                unknown[label] = unknown.get(label, 0) + 1
+
+    categories = [{"id": i + 1, "name": name} for name, i in class_ids.items()]
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(
+            {"images": images, "annotations": annotations, "categories": categories},
+            f,
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+    return len(images), len(annotations), unknown, errors
+
+
+# 主函数：读取 JSON，生成掩码
 def main(json_path, image_dir, save_mask_path):
     # 读取 JSON 文件数据
     json_data = load_json(json_path)
 
-    # 读取原始图像
-    image_path = os.path.join(image_dir, json_data["imagePath"])
-    image = cv2.imread(image_path)
-
-    if image is None:
-        print(f"无法读取图像：{image_path}")
+    # 掩码尺寸取自 JSON，缺失时才读取原始图像
+    try:
+        image_shape = mask_shape(json_data, image_dir)
+    except ValueError as e:
+        print(e)
         return
 
     # 根据 JSON 标注数据创建掩码
-    mask = create_mask(json_data, image.shape)
+    mask = create_mask(json_data, image_shape)
 
     # 保存生成的掩码图像
     cv2.imwrite(save_mask_path, mask)
     print(f"掩码图像已保存至：{save_mask_path}")
 
 
-# 示例使用
-json_file_path = "F:/0.Temporary_Project/Lab/generate_mask/4.json"
-image_directory = "F:/0.Temporary_Project/Lab/generate_mask"
-save_mask_file = "path_to_save_mask.png"
+# ==================== 主程序入口 ====================
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="LabelMe JSON → 掩码图像",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+使用示例:
+  # 单个文件（所有目标填充为 255）
+  python generate_mask.py -j 4.json -o 4_mask.png
+
+  # 批量：按类别编号的语义掩码 + 实例掩码，逐张 PNG
+  python generate_mask.py -i E:/labelme_data -o E:/masks -c classes.txt --kinds semantic instance
+
+  # 批量：打包为 semantic.npy（可用 np.load(..., mmap_mode="r") 读取）
+  python generate_mask.py -i E:/labelme_data -o E:/masks -c classes.txt --format npy
+
+  # 批量：游程编码，保存为 masks_rle.json
+  python generate_mask.py -i E:/labelme_data -o E:/masks -c classes.txt --format rle
+
+  # 导出 COCO 格式（分割为 RLE）
+  python generate_mask.py -i E:/labelme_data -o E:/annotations.json -c classes.txt --coco
+        """,
+    )
+    parser.add_argument("-j", "--json", default=None, help="单个 JSON 文件")
+    parser.add_argument("-i", "--input", default=None, help="JSON 文件夹（批量模式）")
+    parser.add_argument("-o", "--output", required=True, help="输出文件（单个）或文件夹（批量）")
+    parser.add_argument("--image-dir", default=None, help="原图文件夹（JSON 中没有尺寸时使用）")
+    parser.add_argument("-c", "--classes", default=None, help="classes.txt（按类别编号）")
+    parser.add_argument(
+        "--kinds", nargs="+", choices=MASK_KINDS, default=["semantic"], help="掩码类型"
+    )
+    parser.add_argument(
+        "--format", choices=OUTPUT_FORMATS, default="png", help="批量输出格式（默认 png）"
+    )
+    parser.add_argument(
+        "--coco", action="store_true", help="批量导出为 COCO 格式 JSON（需要 -c）"
+    )
+    parser.add_argument("-w", "--workers", type=int, default=None, help="进程数")
+    args = parser.parse_args()
 
-main(json_file_path, image_directory, save_mask_file)
+    if args.input and args.coco:
+        if not args.classes:
+            parser.error("--coco 需要指定 -c 类别文件")
+        num_images, num_annotations, unknown, errors = export_coco(
+            args.input, args.output, args.classes, args.workers
+        )
+        for message in errors:
+            print(message)
+        for label, count in unknown.items():
+            print(f"不在类别文件中的标签（已跳过）: {label} × {count}")
+        print(f"已导出 {num_images} 张图像、{num_annotations} 个标注至：{args.output}")
+    elif args.input:
+        count, errors = generate_masks(
+            args.input, args.output, args.classes, args.kinds, args.format, args.workers
+        )
+        for message in errors:
+            print(message)
+        print(f"已处理 {count} 个 JSON，失败 {len(errors)} 个，输出至：{args.output}")
+    elif args.json:
+        main(args.json, args.image_dir or os.path.dirname(args.json), args.output)
+    else:
+        parser.error("请指定 -j（单个文件）或 -i（批量）")
@@ -0,0 +1,206 @@
+"""掩码的游程编码（COCO RLE）
+
+功能说明：
+逐张保存全尺寸 PNG 掩码写入、读取都慢，文件也大。这里实现与 pycocotools 兼容的
+COCO RLE：按列优先（Fortran 顺序）展开二值掩码，counts 为交替的 0 / 1 游程长度
+（第一个游程总是 0，可以为 0 长度）；压缩格式的 counts 为 COCO 的字符串编码。
+
+主要特性：
+- encode / decode 全部向量化（np.flatnonzero 找游程边界，np.repeat 还原）
+- crop_to_rle：只把目标外接框内的小掩码转换为整幅图像的 RLE，不需要创建整幅画布
+- encode_labels / decode_labels：类别编号掩码、实例掩码按像素值拆成多个 RLE
+- area / to_bbox 直接在游程上计算，不解码
+"""
+
+import numpy as np
+
+
+def _runs_to_counts(starts, ends, total):
+    """由前景游程 [starts[i], ends[i]) 计算 counts"""
+    starts = np.asarray(starts, dtype=np.int64)
+    ends = np.asarray(ends, dtype=np.int64)
+    if len(starts):
+        # 首尾相接的游程（跨列连续）合并
+        keep_start = np.ones(len(starts), dtype=bool)
+        keep_end = np.ones(len(ends), dtype=bool)
+        touching = starts[1:] == ends[:-1]
+        keep_start[1:] = ~touching
+        keep_end[:-1] = ~touching
+        starts, ends = starts[keep_start], ends[keep_end]
+    boundaries = np.empty(2 * len(starts) + 2, dtype=np.int64)
+    boundaries[0] = 0
+    boundaries[1:-1:2] = starts
+    boundaries[2:-1:2] = ends
+    boundaries[-1] = total
+    counts = np.diff(boundaries)
+    # 前景延伸到最后一个像素时不保留末尾的 0 长度游程（与 pycocotools 一致）
+    if len(counts) > 1 and counts[-1] == 0:
+        counts = counts[:-1]
+    return counts
+
+
+def encode(mask):
+    """二值掩码（H × W，非 0 为前景）→ RLE {"size": [H, W], "counts": [int]}"""
+    mask = np.asarray(mask)
+    height, width = mask.shape[:2]
+    flat = mask.ravel(order="F") != 0
+    changes = np.flatnonzero(flat[1:] != flat[:-1]) + 1
+    boundaries = np.concatenate(([0], changes, [flat.size]))
+    counts = np.diff(boundaries)
+    if flat.size and flat[0]:
+        counts = np.concatenate(([0], counts))
+    return {"size": [height, width], "counts": counts.tolist()}
+
+
+def decode(rle):
+    """RLE（counts 为列表或压缩字符串）→ uint8 二值掩码（H × W）"""
+    height, width = rle["size"]
+    counts = rle["counts"]
+    if isinstance(counts, (str, bytes)):
+        counts = from_string(counts)
+    counts = np.asarray(counts, dtype=np.int64)
+    values = np.arange(len(counts), dtype=np.uint8) & 1
+    flat = np.repeat(values, counts)
+    return flat.reshape(width, height).T.copy()
+
+
+def crop_to_rle(local_mask, x0, y0, height, width):
+    """外接框内的小掩码 → 整幅图像（height × width）的 RLE
+
+    Args:
+        local_mask: 外接框内的掩码（h × w，非 0 为前景）
+        x0, y0: 外接框左上角在整幅图像中的坐标（小掩码须完全位于图像内）
+        height, width: 整幅图像尺寸
+    """
+    local = np.asarray(local_mask) != 0
+    h, w = local.shape
+    # 上下各补一行 0，游程不会跨列
+    padded = np.zeros((h + 2, w), dtype=np.int8)
+    padded[1:-1] = local
+    diff = np.diff(padded, axis=0)  # (h + 1) × w
+    # 按列优先排序：先列号再行号
+    start_cols, start_rows = np.nonzero(diff.T == 1)
+    end_cols, end_rows = np.nonzero(diff.T == -1)
+    starts = (start_cols + x0) * height + start_rows + y0
+    ends = (end_cols + x0) * height + end_rows + y0
+    counts = _runs_to_counts(starts, ends, height * width)
+    return {"size": [height, width], "counts": counts.tolist()}
+
+
+def to_string(counts):
+    """counts 列表 → COCO 压缩字符串"""
+    chars = []
+    for i, x in enumerate(counts):
+        x = int(x)
+        if i > 2:
+            x -= int(counts[i - 2])
+        more = True
+        while more:
+            c = x & 0x1F
+            x >>= 5
+            more = x != -1 if c & 0x10 else x != 0
+            if more:
+                c |= 0x20
+            chars.append(chr(c + 48))
+    return "".join(chars)
+
+
+def from_string(text):
+    """COCO 压缩字符串 → counts 列表"""
+    if isinstance(text, bytes):
+        text = text.decode("ascii")
+    counts = []
+    p = 0
+    while p < len(text):
+        x = k = 0
+        more = True
+        while more:
+            c = ord(text[p]) - 48
+            x |= (c & 0x1F) << (5 * k)
+            more = c & 0x20
+            p += 1
+            k += 1
+            if not more and c & 0x10:
+                x |= -1 << (5 * k)
+        if len(counts) > 2:
+            x += counts[-2]
+        counts.append(x)
+    return counts
+
+
+def compress(rle):
+    """counts 为列表的 RLE → 压缩格式（counts 为字符串）"""
+    counts = rle["counts"]
+    if isinstance(counts, str):
+        return rle
+    return {"size": list(rle["size"]), "counts": to_string(counts)}
+
+
+def area(rle):
+    """前景像素数"""
+    counts = rle["counts"]
+    if isinstance(counts, (str, bytes)):
+        counts = from_string(counts)
+    return int(sum(counts[1::2]))
+
+
+def to_bbox(rle):
+    """前景外接框 [x, y, w, h]，没有前景时为 [0, 0, 0, 0]"""
+    height, _ = rle["size"]
+    counts = rle["counts"]
+    if isinstance(counts, (str, bytes)):
+        counts = from_string(counts)
+    counts = np.asarray(counts, dtype=np.int64)
+    ends = np.cumsum(counts)
+    starts = ends - counts
+    fg = (np.arange(len(counts)) & 1) == 1
+    fg &= counts > 0
+    if not fg.any():
+        return [0, 0, 0, 0]
+    first, last = starts[fg], ends[fg] - 1
+    cols_first, rows_first = first // height, first % height
+    cols_last, rows_last = last // height, last % height
+    x0, x1 = int(cols_first.min()), int(cols_last.max())
+    # 跨列的游程覆盖整列
+    spans = cols_last > cols_first
+    y0 = 0 if spans.any() else int(rows_first.min())
+    y1 = height - 1 if spans.any() else int(rows_last.max())
+    return [x0, y0, x1 - x0 + 1, y1 - y0 + 1]
+
+
+def encode_labels(mask):
+    """多值掩码（类别编号或实例编号）→ {像素值: 压缩 RLE}，0 视为背景"""
+    mask = np.asarray(mask)
+    flat = mask.ravel(order="F")
+    height, width = mask.shape[:2]
+    # 一次找出所有游程，再按像素值分组
+    changes = np.flatnonzero(flat[1:] != flat[:-1]) + 1
+    starts = np.concatenate(([0], changes))
+    ends = np.concatenate((changes, [flat.size]))
+    values = flat[starts]
+    order = np.argsort(values, kind="stable")
+    sorted_values = values[order]
+    unique, first = np.unique(sorted_values, return_index=True)
+    bounds = np.append(first, len(order))
+    result = {}
+    for value, lo, hi in zip(unique.tolist(), bounds[:-1], bounds[1:]):
+        if value == 0:
+            continue
+        runs = order[lo:hi]
+        counts = _runs_to_counts(starts[runs], ends[runs], flat.size)
+        result[value] = {"size": [height, width], "counts": to_string(counts.tolist())}
+    return result
+
+
+def decode_labels(rles, size, dtype=np.uint16):
+    """encode_labels 的逆过程：{像素值: RLE} → 多值掩码
+
+    Args:
+        rles: encode_labels 的结果（从 JSON 读取时键为字符串）
+        size: 掩码尺寸 [H, W]（没有前景时 rles 为空，无法从中得到尺寸）
+        dtype: 输出掩码的类型
+    """
+    mask = np.zeros(tuple(size), dtype=dtype)
+    for value, rle in rles.items():
+        mask[decode(rle).astype(bool)] = int(value)
+    return mask